@@ -11,79 +11,485 @@
 # pip install matplotlib
 # =============================================================================
 
-from typing import List, Callable, Tuple
+from typing import List, Callable, Tuple, Iterator
 from datetime import date, datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, OrderedDict, deque, Counter
 import calendar
 import tkinter as tk
-from tkinter import messagebox, font, ttk, simpledialog
+from tkinter import messagebox, font, ttk, simpledialog, filedialog
 import json
 from pathlib import Path
 import platform
 import warnings
 import math
 import uuid
-
-# Matplotlib関連のライブラリ
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib import font_manager
-import matplotlib.animation as animation
+import sys
+import bisect
+import os
+import threading
+import sqlite3
+import queue
+import codecs
+import io
+import shutil
+import struct
+import mmap
+import copy
+import zlib
+import csv
+import re
+import heapq
+import itertools
+import hashlib
+import time
+import functools
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, CancelledError
+
+# Matplotlib関連のライブラリは、起動を速くするため最初にグラフを表示するときに読み込む(_load_matplotlib)
+
+# NumPyは任意。インストールされていれば複数月の集計をベクトル化して行う。読み込みは初めて使うときまで遅らせる
+np = None; _numpy_checked = False
+
+def _import_numpy() -> bool:
+    global np, _numpy_checked
+    if not _numpy_checked:
+        # TaskRunnerのワーカーが先読みしている途中でも、読み込みが終わるまで「NumPyなし」と判定しないようにする
+        try: import numpy as np
+        except ImportError: np = None
+        _numpy_checked = True
+    return np is not None
 
 # =============================================================================
 # ▼▼▼ クロスプラットフォーム対応 日本語フォント自動設定 ▼▼▼
 # =============================================================================
-def set_optimal_font_for_matplotlib():
-    font_name = None
+def _japanese_font_candidates() -> List[str]:
     os_name = platform.system()
-    if os_name == "Windows": font_candidates = ['Yu Gothic UI', 'Yu Gothic', 'Meiryo', 'MS Gothic']
-    elif os_name == "Darwin": font_candidates = ['Hiragino Sans', 'Hiragino Kaku Gothic ProN', 'System Font']
-    else: font_candidates = ['Noto Sans CJK JP', 'IPAexGothic', 'VL Gothic']
+    if os_name == "Windows": return ['Yu Gothic UI', 'Yu Gothic', 'Meiryo', 'MS Gothic']
+    elif os_name == "Darwin": return ['Hiragino Sans', 'Hiragino Kaku Gothic ProN', 'System Font']
+    return ['Noto Sans CJK JP', 'IPAexGothic', 'VL Gothic']
+
+def _find_matplotlib_font(font_manager) -> str:
+    font_candidates = _japanese_font_candidates()
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", UserWarning)
         for candidate in font_candidates:
             try:
-                if font_manager.findfont(candidate, fallback_to_default=False):
-                    font_name = candidate; break
+                if font_manager.findfont(candidate, fallback_to_default=False): return candidate
             except: continue
-    if font_name:
-        plt.rcParams['font.family'] = font_name
-        if os_name == "Darwin": plt.rcParams['font.sans-serif'] = [font_name, 'DejaVu Sans']
-        else: plt.rcParams['font.sans-serif'] = [font_name]
-    else:
-        plt.rcParams['font.family'] = 'sans-serif'
-        print("WARN: Preferred Japanese fonts not found. Falling back to default 'sans-serif'.")
-        print("      Consider installing one of: " + ", ".join(font_candidates))
-set_optimal_font_for_matplotlib()
+    print("WARN: Preferred Japanese fonts not found. Falling back to default 'sans-serif'.")
+    print("      Consider installing one of: " + ", ".join(font_candidates))
+    return 'sans-serif'
+
+_matplotlib_font_family = None
+
+def _prepare_matplotlib(font_name: str = None) -> str:
+    """
+    matplotlib(Tkに依存しない部分)を読み込み、日本語フォントを設定してフォント名を返す。
+    Tkに触れないので、TaskRunnerのワーカーで実行してよい。font_nameがなければフォントを探索する。
+    """
+    import matplotlib
+    from matplotlib import font_manager
+    import matplotlib.figure, matplotlib.backends.backend_agg  # ChartViewで使うモジュールも先に読み込んでおく
+    if not font_name: font_name = _find_matplotlib_font(font_manager)
+    matplotlib.rcParams['font.family'] = font_name
+    if font_name != 'sans-serif':
+        if platform.system() == "Darwin": matplotlib.rcParams['font.sans-serif'] = [font_name, 'DejaVu Sans']
+        else: matplotlib.rcParams['font.sans-serif'] = [font_name]
+    return font_name
+
+def _matplotlib_prepared(settings_manager: 'SettingsManager', font_name: str) -> str:
+    """_prepare_matplotlibの結果を記録する(Tkのスレッドで呼ぶ)。フォント名は設定の"font_family"に保存して次回以降は使い回す"""
+    global _matplotlib_font_family
+    if settings_manager.get("font_family") != font_name: settings_manager.set("font_family", font_name)
+    _matplotlib_font_family = font_name; return font_name
+
+def _load_matplotlib(settings_manager: 'SettingsManager') -> str:
+    """
+    matplotlibを読み込んで日本語フォントを設定し、フォント名を返す。2回目以降は何もしない。
+    フォントの探索(findfont)は初回起動時だけ行い、結果を設定の"font_family"に保存して次回以降は使い回す。
+    """
+    if _matplotlib_font_family is not None: return _matplotlib_font_family
+    return _matplotlib_prepared(settings_manager, _prepare_matplotlib(settings_manager.get("font_family")))
+
+def _tk_font_family(root: tk.Misc, settings_manager: 'SettingsManager') -> str:
+    """Tkの既定フォント。保存済みのフォントがあればそれを、なければTkで使える候補を選ぶ(matplotlibは読み込まない)"""
+    font_name = settings_manager.get("font_family")
+    if font_name and font_name != 'sans-serif': return font_name
+    available = set(font.families(root))
+    return next((candidate for candidate in _japanese_font_candidates() if candidate in available), font.nametofont("TkDefaultFont").cget("family"))
 # =============================================================================
 
 # =============================================================================
 # 0. ユーティリティクラス
 # =============================================================================
 class Tooltip:
-    def __init__(self, widget, text):
-        self.widget = widget; self.text = text; self.tooltip_window = None
-        self.widget.bind("<Enter>", self.show_tooltip); self.widget.bind("<Leave>", self.hide_tooltip)
+    """
+    マウスを乗せたときに文章を表示する。textは文字列か、文字列を返す関数(表示するときに初めて呼び、invalidateまで結果を使い回す)。
+    tagを指定すると、イベントはそのバインドタグに一度だけ結び付け、bind_widgetではタグを追加するだけにする。
+    """
+    def __init__(self, widget, text, tag: str = None):
+        self.widget = widget; self.text = text; self.tooltip_window = None; self.tag = tag; self._resolved_text = None
+        if tag is None: self.widget.bind("<Enter>", self.show_tooltip); self.widget.bind("<Leave>", self.hide_tooltip)
+        else: widget.bind_class(tag, "<Enter>", self.show_tooltip); widget.bind_class(tag, "<Leave>", self.hide_tooltip); self.bind_widget(widget)
     def bind_widget(self, child_widget):
+        if self.tag is not None: child_widget.bindtags((self.tag,) + child_widget.bindtags()); return
         child_widget.bind("<Enter>", self.show_tooltip); child_widget.bind("<Leave>", self.hide_tooltip)
+    def invalidate(self): self._resolved_text = None
+    def _current_text(self) -> str:
+        if not callable(self.text): return self.text
+        if self._resolved_text is None: self._resolved_text = self.text()
+        return self._resolved_text
     def show_tooltip(self, event=None):
-        if self.tooltip_window or not self.text: return
+        if self.tooltip_window: return
+        text = self._current_text()
+        if not text: return
         x, y, _, _ = self.widget.bbox("insert"); x += self.widget.winfo_rootx() + 25; y += self.widget.winfo_rooty() + 25
         self.tooltip_window = tw = tk.Toplevel(self.widget); tw.wm_overrideredirect(True); tw.wm_geometry(f"+{x}+{y}")
         tooltip_font_family = font.nametofont("TkDefaultFont").cget("family")
-        label = tk.Label(tw, text=self.text, justify=tk.LEFT, background="#ffffe0", relief=tk.SOLID, borderwidth=1, font=(tooltip_font_family, 9, "normal"))
+        label = tk.Label(tw, text=text, justify=tk.LEFT, background="#ffffe0", relief=tk.SOLID, borderwidth=1, font=(tooltip_font_family, 9, "normal"))
         label.pack(ipadx=5, ipady=3)
     def hide_tooltip(self, event=None):
         if self.tooltip_window: self.tooltip_window.destroy()
         self.tooltip_window = None
 
+BACKUP_GENERATIONS = 2
+
+def _backup_path(filepath: Path, generation: int) -> Path: return filepath.with_name(f"{filepath.name}.bak{generation}")
+
+def _fsync_directory(directory: Path):
+    # ファイル名の置き換えを確実に記録する(ディレクトリをopenできないWindowsでは不要)
+    if os.name != 'posix': return
+    fd = os.open(directory, os.O_RDONLY)
+    try: os.fsync(fd)
+    finally: os.close(fd)
+
+def _atomic_write(filepath: Path, data: bytes, generations: int = BACKUP_GENERATIONS):
+    """
+    一時ファイルに書き出してfsyncしてから置き換える。置き換え前のファイルは.bak1, .bak2…として
+    generations世代まで残すので、どの時点で中断しても直前までのいずれかの世代が必ず残る。
+    """
+    tmp_path = filepath.with_name(filepath.name + ".tmp")
+    with tmp_path.open('wb') as f: f.write(data); f.flush(); os.fsync(f.fileno())
+    if generations > 0 and filepath.exists():
+        for generation in range(generations, 1, -1):
+            if _backup_path(filepath, generation - 1).exists(): os.replace(_backup_path(filepath, generation - 1), _backup_path(filepath, generation))
+        os.replace(filepath, _backup_path(filepath, 1))
+    os.replace(tmp_path, filepath)
+    _fsync_directory(filepath.parent)
+
+def _load_newest_valid(filepath: Path, load: Callable[[Path], object]):
+    """
+    新しい世代から順に(書き込み直後に中断した一時ファイル、本体、.bak1、.bak2…)読み込みを試し、
+    最初に正しく読めた結果を返す。どの世代もなければFileNotFoundError、全て壊れていればValueErrorを送出する。
+    """
+    candidates = [filepath.with_name(filepath.name + ".tmp"), filepath] + [_backup_path(filepath, g) for g in range(1, BACKUP_GENERATIONS + 1)]
+    errors = []
+    for candidate in candidates:
+        try: result = load(candidate)
+        except FileNotFoundError: continue
+        except ValueError as e: errors.append(f"{candidate.name}: {e}"); continue
+        if errors: print(f"WARN: {filepath.name}が壊れていたため、{candidate.name}から復元しました ({'; '.join(errors)})")
+        return result
+    if errors: raise ValueError("; ".join(errors))
+    raise FileNotFoundError(filepath)
+
+def _quarantine_corrupt_file(filepath: Path):
+    """全ての世代が壊れていたファイルを、上書きされないよう別名で退避する"""
+    corrupt_path = filepath.with_name(f"{filepath.name}.corrupt-{datetime.now():%Y%m%d%H%M%S}")
+    try: os.replace(filepath, corrupt_path); print(f"WARN: {filepath.name}を読み込めなかったため、{corrupt_path.name}に退避しました")
+    except FileNotFoundError: pass
+
+# チェックサム付きJSON: {"crc32": "<本体のCRC32>", "data": <本体>}。ファイル全体としても有効なJSONになる
+_CHECKSUM_JSON_PREFIX = b'{"crc32": "'; _CHECKSUM_JSON_HEADER_LENGTH = len(b'{"crc32": "00000000", "data": ')
+
+def _dump_checksummed_json(obj, indent=None) -> bytes:
+    payload = json.dumps(obj, indent=indent, ensure_ascii=False).encode('utf-8')
+    return f'{{"crc32": "{zlib.crc32(payload):08x}", "data": '.encode('ascii') + payload + b"}"
+
+def _verify_checksummed_json(raw: bytes) -> bytes:
+    """チェックサムを検証してJSON本体を返す。チェックサムのない以前の形式はそのまま返す"""
+    if not raw.startswith(_CHECKSUM_JSON_PREFIX): return raw
+    payload = raw[_CHECKSUM_JSON_HEADER_LENGTH:-1]
+    if not raw.endswith(b"}") or f"{zlib.crc32(payload):08x}".encode('ascii') != raw[len(_CHECKSUM_JSON_PREFIX):len(_CHECKSUM_JSON_PREFIX) + 8]:
+        raise ValueError("チェックサムが一致しません")
+    return payload
+
+def _load_checksummed_json(filepath: Path): return json.loads(_verify_checksummed_json(filepath.read_bytes()))
+
+class WriteBehindSaver:
+    """
+    保存をまとめて行うための仕組み。mark_dirtyに渡された最新のデータだけを、
+    最初の要求からdelay秒後にワーカースレッドで1回だけ書き込む。delayが0以下なら即座に書き込む。
+    渡すデータは呼び出し側のスレッドで作った複製にしておくこと(書き込み中に変更されないように)。
+    """
+    def __init__(self, write: Callable[[object], None], delay: float = 0.5):
+        self._write = write; self.delay = delay
+        self._lock = threading.Lock(); self._write_lock = threading.Lock()
+        self._pending = None; self._has_pending = False; self._timer = None
+
+    def mark_dirty(self, data):
+        with self._lock:
+            self._pending = data; self._has_pending = True
+            if self._timer is None and self.delay > 0:
+                self._timer = threading.Timer(self.delay, self.flush); self._timer.daemon = True; self._timer.start()
+        if self.delay <= 0: self.flush()
+
+    @property
+    def has_pending(self) -> bool: return self._has_pending
+
+    def flush(self):
+        """保留中のデータがあれば、呼び出したスレッドで直ちに書き込む"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None: self._timer.cancel(); self._timer = None
+                if not self._has_pending: return
+                data, self._pending, self._has_pending = self._pending, None, False
+            try: self._write(data)
+            except OSError as e:
+                print(f"WARN: 保存に失敗しました: {e}")
+                # 次の保存で再試行する。その間により新しいデータが来ていればそちらを優先する
+                with self._lock:
+                    if not self._has_pending: self._pending, self._has_pending = data, True
+
+class TaskRunner:
+    """
+    Tkのメインループを止めずに処理を行うための実行基盤。I/Oはスレッドプールで、重い計算はcpu_workers>0なら
+    プロセスプールで(0ならI/Oと同じスレッドプールで)実行する。完了はスレッド安全なキューに積まれ、
+    schedulerのafterで定期的に取り出して、on_done/on_errorをTkのスレッドで呼ぶ。
+    ワーカーで実行する関数はTkのウィジェットや変数に触れてはならない(画面の更新はon_doneで行う)。
+    submitはTkのスレッドから呼ぶこと。プロセスプールに渡す関数と引数はpickleできる必要がある。
+    """
+    POLL_MS = 20
+    CLOSE_TIMEOUT = 2.0  # 終了時に実行中のタスクを待つ上限(秒)
+    def __init__(self, scheduler: tk.Misc, io_workers: int = 2, cpu_workers: int = 0):
+        self.scheduler = scheduler; self.cpu_workers = cpu_workers
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="kakeibo-io"); self._cpu_pool = None
+        # _futures: 結果をまだ取り出していないタスク(終了時に待つ対象)
+        self._results = queue.SimpleQueue(); self._futures = set(); self._poll_job = None; self._closed = False
+        # _streams: submit_io_streamのID -> 途中結果をTkのスレッドで受け取る関数。_closingはワーカー側のemitに終了を知らせる
+        self._streams: dict[int, Callable] = {}; self._stream_ids = itertools.count(); self._closing = threading.Event()
+
+    def submit_io(self, func: Callable, *args, on_done: Callable = None, on_error: Callable = None) -> Future:
+        return self._submit(self._io_pool, func, args, on_done, on_error)
+
+    def submit_cpu(self, func: Callable, *args, on_done: Callable = None, on_error: Callable = None) -> Future:
+        if self.cpu_workers <= 0: return self._submit(self._io_pool, func, args, on_done, on_error)
+        # プロセスの起動には時間がかかるので、初めて使うときに作る
+        if self._cpu_pool is None: self._cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+        return self._submit(self._cpu_pool, func, args, on_done, on_error)
+
+    def submit_io_stream(self, func: Callable, *args, on_item: Callable, on_done: Callable = None, on_error: Callable = None, max_pending: int = 2) -> Future:
+        """
+        funcをワーカーでfunc(*args, emit)として呼び、emit(item)で渡された途中結果を、渡された順にTkのスレッドでon_item(item)に渡す。
+        on_itemがまだ受け取っていない途中結果がmax_pending個あるとemitは待つので、ワーカーだけが先に進んで結果を溜め込むことはない。
+        on_itemが例外を送出するか、closeされると、次のemitがCancelledErrorを送出して処理を打ち切る(on_itemの例外はon_errorに渡す)。
+        """
+        if self._closed: raise RuntimeError("TaskRunnerは終了しています")
+        stream_id = next(self._stream_ids); slots = threading.Semaphore(max_pending); stop = threading.Event(); failure = []
+        # emitはワーカーのスレッドで呼ばれる。Tkやこのオブジェクトへの参照を持たないよう、キューとイベントだけを使う
+        results, closing, streams = self._results, self._closing, self._streams
+        def emit(item):
+            while not slots.acquire(timeout=0.1):
+                if stop.is_set() or closing.is_set(): raise CancelledError()
+            if stop.is_set() or closing.is_set(): slots.release(); raise CancelledError()
+            results.put((None, stream_id, item))
+        def deliver(item):
+            slots.release()
+            if stop.is_set(): return
+            try: on_item(item)
+            except Exception as e: failure.append(e); stop.set()
+        def finish(result=None, error=None):
+            del streams[stream_id]
+            if failure: error = failure[0]
+            if error is None:
+                if on_done: on_done(result)
+            elif on_error: on_error(error)
+            else: print(f"WARN: バックグラウンド処理に失敗しました: {error!r}")
+        streams[stream_id] = deliver
+        return self._submit(self._io_pool, func, args + (emit,), finish, lambda error: finish(error=error))
+
+    @property
+    def pending(self) -> int: return len(self._futures)
+
+    def _submit(self, pool, func: Callable, args: tuple, on_done: Callable, on_error: Callable) -> Future:
+        if self._closed: raise RuntimeError("TaskRunnerは終了しています")
+        future = pool.submit(func, *args); self._futures.add(future)
+        # 完了の通知はワーカーのスレッドで呼ばれる。schedulerへの参照を持たないよう、キューだけを渡す
+        results = self._results; future.add_done_callback(lambda f: results.put((f, on_done, on_error)))
+        if self._poll_job is None: self._poll_job = self.scheduler.after(self.POLL_MS, self.poll)
+        return future
+
+    def poll(self):
+        """完了したタスクのコールバックを呼ぶ。未完了のタスクが残っていれば次の確認を予約する"""
+        self._poll_job = None
+        if self._closed: return
+        while True:
+            try: future, on_done, on_error = self._results.get_nowait()
+            except queue.Empty: break
+            if future is None:  # submit_io_streamの途中結果(on_doneの位置にストリームのID、on_errorの位置に値が入っている)
+                deliver = self._streams.get(on_done)
+                if deliver: deliver(on_error)
+                continue
+            self._futures.discard(future)
+            # 取り消したタスクは呼び出し側が結果を必要としなくなったものなので、コールバックを呼ばず警告も出さない
+            if future.cancelled(): continue
+            try: result = future.result()
+            except (Exception, CancelledError) as e:
+                if on_error: on_error(e)
+                else: print(f"WARN: バックグラウンド処理に失敗しました: {e!r}")
+                continue
+            if on_done: on_done(result)
+        if self._futures and not self._closed: self._poll_job = self.scheduler.after(self.POLL_MS, self.poll)
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        新しいタスクを受け付けず、未着手のタスクを取り消し、実行中のタスクの完了をtimeout秒(既定はCLOSE_TIMEOUT)まで待つ。
+        残ったコールバックは呼ばない。全てのタスクが終わっていればTrueを返す(ウィンドウを閉じる処理が止まらないよう、待ちきれなくても戻る)。
+        """
+        self._closed = True; self._closing.set()
+        if self._poll_job is not None: self.scheduler.after_cancel(self._poll_job); self._poll_job = None
+        for pool in (self._io_pool, self._cpu_pool):
+            if pool is not None: pool.shutdown(wait=False, cancel_futures=True)
+        # shutdownで取り消したタスクはwaitでは完了扱いにならないので、待つ対象から除く
+        _, not_done = concurrent.futures.wait([f for f in self._futures if not f.cancelled()], timeout=self.CLOSE_TIMEOUT if timeout is None else timeout)
+        if not_done: print(f"WARN: 終了までに完了しなかったバックグラウンド処理があります ({len(not_done)}件)")
+        self._futures.clear(); self._streams.clear(); return not not_done
+
+class ChangeEvent:
+    """モデルの変更通知。kindは変更の種類、datesは影響を受けた日付、itemsは変更された取引やTodo"""
+    ADDED, DELETED, TOGGLED, UPDATED = "added", "deleted", "toggled", "updated"
+    def __init__(self, kind: str, dates, items=()): self.kind = kind; self.dates = frozenset(dates); self.items = tuple(items)
+    @property
+    def months(self) -> set: return {(d.year, d.month) for d in self.dates}
+    def __repr__(self): return f"ChangeEvent({self.kind!r}, {sorted(self.dates)!r})"
+
+class ChangeNotifier:
+    """subscribeで登録したコールバックへ、変更のたびにChangeEventを渡す。Ledger・TodoManagerが継承する"""
+    def subscribe(self, callback: Callable[[ChangeEvent], None]): self._listeners.append(callback)
+    def unsubscribe(self, callback: Callable[[ChangeEvent], None]): self._listeners.remove(callback)
+    def _notify(self, kind: str, dates, items=()):
+        if not self._listeners: return
+        event = ChangeEvent(kind, dates, items)
+        for callback in list(self._listeners): callback(event)
+
+# =============================================================================
+# ▼▼▼ パフォーマンス計測 ▼▼▼
+# =============================================================================
+PROFILE_ENV_VAR = "KAKEIBO_PROFILE"
+
+class _Histogram:
+    """所要時間の分布。バケツiには[2^(i-1), 2^i)µsの回数を数える(バケツ0は1µs未満)"""
+    __slots__ = ("count", "total", "max", "buckets")
+    BUCKETS = 32
+    def __init__(self): self.count = 0; self.total = 0.0; self.max = 0.0; self.buckets = [0] * self.BUCKETS
+    def add(self, seconds: float):
+        self.count += 1; self.total += seconds; self.max = max(self.max, seconds)
+        self.buckets[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+    @property
+    def mean(self) -> float: return self.total / self.count if self.count else 0.0
+    def percentile(self, p: float) -> float:
+        """p(0〜1)分位点の秒数。バケツの上端で近似し、最大値を超えないようにする"""
+        threshold = p * self.count; seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= threshold: return min((1 << i) / 1e6, self.max)
+        return self.max
+
+class Profiler:
+    """
+    任意で有効にする計測。有効な間だけ、@_profiledを付けた処理とTkのafterコールバックの所要時間をヒストグラムに集め、
+    ウィジェットの生成・破棄をクラスごとに数え、直近の区間をChrome trace-event形式で書き出せるように残す。
+    環境変数KAKEIBO_PROFILE=1か、設定画面の「パフォーマンス計測」で有効にする。無効なときの負担は属性の確認1回だけ。
+    """
+    MAX_TRACE_EVENTS = 100_000
+    def __init__(self):
+        self.enabled = False; self._lock = threading.Lock(); self._originals = {}; self._stats_providers: dict[str, Callable[[], dict]] = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms: dict[str, _Histogram] = defaultdict(_Histogram); self.widgets_created = defaultdict(int); self.widgets_destroyed = defaultdict(int)
+            self._events = deque(maxlen=self.MAX_TRACE_EVENTS); self._origin = time.perf_counter()
+
+    def enable(self):
+        """計測を始める。afterとウィジェットの生成・破棄を数えるため、tkinterのメソッドを差し替える"""
+        if self.enabled: return
+        profiler = self; original_after, original_setup, original_destroy = tk.Misc.after, tk.BaseWidget._setup, tk.BaseWidget.destroy
+        # after_idleはafter('idle', ...)を呼ぶので、afterだけを差し替えれば両方が計測される
+        def after(widget, ms, func=None, *args): return original_after(widget, ms) if func is None else original_after(widget, ms, profiler._timed_callback(func), *args)
+        def _setup(widget, master, cnf): profiler.widgets_created[type(widget).__name__] += 1; return original_setup(widget, master, cnf)
+        def destroy(widget): profiler.widgets_destroyed[type(widget).__name__] += 1; return original_destroy(widget)
+        self._originals = {(tk.Misc, "after"): original_after, (tk.BaseWidget, "_setup"): original_setup, (tk.BaseWidget, "destroy"): original_destroy}
+        tk.Misc.after, tk.BaseWidget._setup, tk.BaseWidget.destroy = after, _setup, destroy
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled: return
+        self.enabled = False
+        for (cls, name), original in self._originals.items(): setattr(cls, name, original)
+        self._originals = {}
+
+    def _timed_callback(self, func: Callable) -> Callable:
+        label = f"after:{getattr(func, '__qualname__', type(func).__name__)}"
+        def callback(*args):
+            started = time.perf_counter()
+            try: return func(*args)
+            finally: self.record(label, started, time.perf_counter())
+        return callback
+
+    def record(self, name: str, started: float, ended: float):
+        if not self.enabled: return
+        with self._lock: self.histograms[name].add(ended - started); self._events.append((name, started, ended - started, threading.get_ident()))
+
+    def register_stats(self, name: str, provider: Callable[[], dict]):
+        """キャッシュのヒット率など、計測パネルに並べて表示する統計を登録する"""
+        self._stats_providers[name] = provider
+
+    def summary(self) -> List[Tuple[str, _Histogram]]:
+        """合計時間の長い順の(処理名, ヒストグラム)"""
+        with self._lock: return sorted(self.histograms.items(), key=lambda item: item[1].total, reverse=True)
+
+    def extra_stats(self) -> dict[str, dict]: return {name: provider() for name, provider in self._stats_providers.items()}
+
+    def export_chrome_trace(self, filepath: Path):
+        """chrome://tracingやPerfettoで開けるtrace-event形式のJSONに、残っている区間とウィジェット数を書き出す"""
+        pid = os.getpid()
+        with self._lock: events = list(self._events); origin = self._origin
+        trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": threading.main_thread().ident, "args": {"name": "Tk"}}]
+        trace += [{"name": name, "cat": name.split(".")[0].split(":")[0], "ph": "X", "ts": (started - origin) * 1e6, "dur": duration * 1e6, "pid": pid, "tid": tid}
+                  for name, started, duration, tid in events]
+        live = {name: count - self.widgets_destroyed.get(name, 0) for name, count in self.widgets_created.items()}
+        trace.append({"name": "widgets", "ph": "C", "ts": (time.perf_counter() - origin) * 1e6, "pid": pid, "args": live})
+        _atomic_write(filepath, json.dumps({"traceEvents": trace, "displayTimeUnit": "ms"}, ensure_ascii=False).encode("utf-8"), generations=0)
+
+PROFILER = Profiler()
+if os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0"): PROFILER.enable()
+
+def _profiled(func: Callable) -> Callable:
+    """PROFILERが有効なとき、funcの所要時間を「クラス名.メソッド名」で記録する"""
+    label = func.__qualname__
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.enabled: return func(*args, **kwargs)
+        started = time.perf_counter()
+        try: return func(*args, **kwargs)
+        finally: PROFILER.record(label, started, time.perf_counter())
+    return wrapper
+
 class SettingsManager:
-    def __init__(self, filename="app_settings.json"):
+    def __init__(self, filename="app_settings.json", save_delay: float = None):
         self.filepath = Path.home() / ".simple_kakeibo" / filename; self.filepath.parent.mkdir(parents=True, exist_ok=True)
         # [MODIFIED] 収入カテゴリのデフォルト色もPCCSベースに更新
         self.defaults = {
             "app_theme": "default_light_gray",
+            "ledger_backend": "journal",
+            "ledger_backend_active": None,  # 取引が実際に保存されている形式(未設定ならledger_backendと同じ)
+            "streaming_load": True,
+            "save_delay_ms": 500,
+            "font_family": None,
+            "process_pool_workers": 0,
+            "profiling_enabled": False,
             "expense_colors": {
                 "食費": "#f3581f", "交通費": "#fca500", "家賃": "#007d9f",
                 "娯楽": "#d7003a", "日用品": "#a3d638", "交際費": "#c5398a", "その他": "#7f7f7f"
@@ -94,18 +500,23 @@ class SettingsManager:
             }
         }
         self.settings = self._load()
+        # 保存の待ち時間は指定がなければ自身の設定値を使う
+        self._saver = WriteBehindSaver(self._write, save_delay if save_delay is not None else self.get("save_delay_ms") / 1000)
+    @_profiled
     def _load(self):
         try:
-            with self.filepath.open('r', encoding='utf-8') as f:
-                loaded_settings = json.load(f)
-                for key, value in self.defaults.items(): loaded_settings.setdefault(key, value)
-                return loaded_settings
-        except (FileNotFoundError, json.JSONDecodeError): return self.defaults.copy()
+            loaded_settings = _load_newest_valid(self.filepath, _load_checksummed_json)
+            for key, value in self.defaults.items(): loaded_settings.setdefault(key, value)
+            return loaded_settings
+        except FileNotFoundError: return self.defaults.copy()
+        except ValueError: _quarantine_corrupt_file(self.filepath); return self.defaults.copy()
     def get(self, key): return self.settings.get(key, self.defaults.get(key))
     def set(self, key, value): self.settings[key] = value; self._save()
-    def _save(self):
-        with self.filepath.open('w', encoding='utf-8') as f: json.dump(self.settings, f, indent=4)
-        
+    @_profiled
+    def _save(self): self._saver.mark_dirty(copy.deepcopy(self.settings))
+    def _write(self, settings: dict): _atomic_write(self.filepath, _dump_checksummed_json(settings, indent=4))
+    def close(self): self._saver.flush()
+
     def get_colors(self, type: str) -> dict:
         key = f"{type}_colors"
         colors = self.defaults[key].copy()
@@ -129,7 +540,21 @@ class SettingsManager:
 # =============================================================================
 # 1. モデル (Model)
 # =============================================================================
+def _uuid_str_to_bytes(value) -> bytes:
+    """正規形(小文字・ハイフン区切り)のUUID文字列なら16バイトに変換し、それ以外はNoneを返す"""
+    if not isinstance(value, str) or len(value) != 36 or value[8] != '-' or value[13] != '-' or value[18] != '-' or value[23] != '-': return None
+    try: id_bytes = bytes.fromhex(value.replace('-', ''))
+    except ValueError: return None
+    return id_bytes if _uuid_bytes_to_str(id_bytes) == value else None
+
+def _uuid_bytes_to_str(id_bytes: bytes) -> str:
+    h = id_bytes.hex(); return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
 class Transaction:
+    # 大量の履歴を保持するため、__dict__を持たないコンパクトな表現にする。
+    # 日付は序数(int)、IDはUUIDの16バイト、カテゴリはインターンした文字列で持つ。
+    __slots__ = ("_id_bytes", "amount", "category", "date_ordinal", "type")
+
     def __init__(self, amount: int, category: str, transaction_date: date, type: str, id: str = None):
         if not isinstance(amount, int) or amount <= 0: raise ValueError("金額は正の整数で入力してください。")
         if not category or not category.strip(): raise ValueError("カテゴリは空にできません。")
@@ -137,7 +562,28 @@ class Transaction:
         if type not in ['income', 'expense']: raise ValueError("取引種別は 'income' または 'expense' である必要があります。")
         
         self.id = id if id is not None else str(uuid.uuid4())
-        self.amount = amount; self.category = category.strip(); self.transaction_date = transaction_date; self.type = type
+        self.amount = amount; self.category = sys.intern(category.strip()); self.transaction_date = transaction_date; self.type = sys.intern(type)
+
+    @property
+    def id(self) -> str:
+        id_bytes = self._id_bytes
+        return _uuid_bytes_to_str(id_bytes) if isinstance(id_bytes, bytes) else id_bytes
+    @id.setter
+    def id(self, value: str):
+        # UUIDの16バイトはそのまま、UUID形式でないIDは文字列のまま保持する
+        if isinstance(value, bytes) and len(value) == 16: self._id_bytes = value; return
+        id_bytes = _uuid_str_to_bytes(value); self._id_bytes = id_bytes if id_bytes is not None else value
+
+    @classmethod
+    def _from_trusted(cls, id_bytes, amount: int, category: str, date_ordinal: int, type: str) -> 'Transaction':
+        """自分で書き出したバイナリスナップショットの行から、検証を省いて生成する"""
+        tx = object.__new__(cls); tx._id_bytes = id_bytes; tx.amount = amount; tx.category = category; tx.date_ordinal = date_ordinal; tx.type = type
+        return tx
+
+    @property
+    def transaction_date(self) -> date: return date.fromordinal(self.date_ordinal)
+    @transaction_date.setter
+    def transaction_date(self, value: date): self.date_ordinal = value.toordinal()
         
     def to_card_data(self) -> dict:
         sign = "+" if self.type == 'income' else "-"; return {"date_str": f"{self.transaction_date.month}月{self.transaction_date.day}日", "category": self.category, "amount_str": f"{sign}¥{self.amount:,}", "type": self.type}
@@ -161,52 +607,1159 @@ class Transaction:
             type=data["type"]
         )
 
-class Ledger:
-    def __init__(self):
+def _tx_sort_key(tx: 'Transaction') -> int: return -tx.date_ordinal
+
+def _desc_date_range(items: list, start: date, end: date, key: Callable) -> Tuple[int, int]:
+    """日付の降順に並んだリストから、start〜end(両端を含む)に該当する添字の範囲を二分探索で求める"""
+    return bisect.bisect_left(items, -end.toordinal(), key=key), bisect.bisect_right(items, -start.toordinal(), key=key)
+
+def _transaction_id_key(tx_id):
+    """取引IDを、Transaction._id_bytesと同じ形(UUIDなら16バイト、それ以外は文字列)にする"""
+    if isinstance(tx_id, bytes): return tx_id
+    id_bytes = _uuid_str_to_bytes(tx_id); return id_bytes if id_bytes is not None else tx_id
+
+class LedgerStorage:
+    """Ledgerの永続化バックエンドの基底クラス。変更の記録方法をサブクラスで差し替える。"""
+    def load(self) -> List[Transaction]: raise NotImplementedError
+    def save(self, transactions: List[Transaction]): raise NotImplementedError
+    def record_add(self, transaction: Transaction, transactions: List[Transaction]): self.save(transactions)
+    def record_add_many(self, added: List[Transaction], transactions: List[Transaction]): self.save(transactions)
+    def record_delete(self, deleted: List[Transaction], transactions: List[Transaction]): self.save(transactions)
+    def load_streaming(self, cutoff: date) -> Tuple[List[Transaction], Iterator[Tuple[List[Transaction], float]]]:
+        """cutoff以降の取引を先に返し、残りは(取引のバッチ, 読み込み済みの割合)のイテレータで返す。既定では全件を先に読む"""
+        return self.load(), iter(())
+    def record_update(self, transaction: Transaction, transactions: List[Transaction]): self.save(transactions)
+    def close(self): pass
+
+def _read_transactions_json(filepath: Path) -> List[Transaction]:
+    return [Transaction.from_dict(item) for item in _load_checksummed_json(filepath)]
+
+def _write_transactions_json(filepath: Path, transactions: List[Transaction], indent=None, checksum: bool = True):
+    """保存用はチェックサム付きで世代管理する。書き出し(export)用は素のJSON配列にする"""
+    data = [tx.to_dict() for tx in transactions]
+    if checksum: _atomic_write(filepath, _dump_checksummed_json(data, indent))
+    else: _atomic_write(filepath, json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8'), generations=0)
+
+def _verify_transactions_json_file(filepath: Path) -> Path:
+    """
+    段階的に読む前に、読む世代のファイルが壊れていないことを確かめる。チェックサム付きはCRC32で、
+    チェックサムのない以前の形式は全体をJSONとして解析して確かめる(途中で途切れたファイルを次の世代へ回すため)。
+    """
+    raw = filepath.read_bytes(); payload = _verify_checksummed_json(raw)
+    if payload is raw:
+        try: data = json.loads(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e: raise ValueError(f"JSONとして読めません: {e}") from e
+        if not isinstance(data, list): raise ValueError("取引の配列ではありません")
+    return filepath
+
+def _iter_json_array(filepath: Path, chunk_size: int = 1 << 16) -> Iterator[Tuple[dict, float]]:
+    """JSON配列のファイルを少しずつ読み、要素を(要素, 読み込み済みの割合)として1件ずつ返す"""
+    decoder = json.JSONDecoder(); text_decoder = codecs.getincrementaldecoder('utf-8')()
+    total_bytes = max(filepath.stat().st_size, 1); bytes_read = 0
+    with filepath.open('rb') as f:
+        # チェックサム付きの場合は見出し部分を読み飛ばす(検証は呼び出し側で事前に行う)
+        if f.read(len(_CHECKSUM_JSON_PREFIX)) == _CHECKSUM_JSON_PREFIX: f.seek(_CHECKSUM_JSON_HEADER_LENGTH); bytes_read = _CHECKSUM_JSON_HEADER_LENGTH
+        else: f.seek(0)
+        buffer, pos, at_eof, started = "", 0, False, False
+        while True:
+            # 空白と区切り文字を読み飛ばす
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,": pos += 1
+            if pos < len(buffer) and not started:
+                if buffer[pos] != "[": raise json.JSONDecodeError("JSON配列ではありません", buffer, pos)
+                started = True; pos += 1; continue
+            if pos < len(buffer) and buffer[pos] == "]": return
+            if pos < len(buffer):
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                    yield item, bytes_read / total_bytes; pos = end; continue
+                except json.JSONDecodeError:
+                    if at_eof: raise
+            elif at_eof:
+                raise json.JSONDecodeError("JSON配列が途中で終わっています", buffer, pos)
+            # 要素が途中で切れているので続きを読む
+            chunk = f.read(chunk_size); bytes_read += len(chunk); at_eof = not chunk
+            buffer = buffer[pos:] + text_decoder.decode(chunk, final=at_eof); pos = 0
+
+def _stream_transactions_json(filepath: Path, cutoff: date, batch_size: int = 5000) -> Tuple[List[Transaction], Iterator[Tuple[List[Transaction], float]]]:
+    """
+    日付の降順で保存されたtransactions.json形式のファイルを、cutoff以降の取引と残りのバッチに分けて読む。
+    残りのバッチは返されたイテレータを進めたときに初めて解析される。
+    """
+    rows = _iter_json_array(filepath); eager, cutoff_ordinal = [], cutoff.toordinal()
+    try:
+        for item, _ in rows:
+            tx = Transaction.from_dict(item)
+            if tx.date_ordinal < cutoff_ordinal: first_remaining = tx; break
+            eager.append(tx)
+        else: return eager, iter(())
+    except FileNotFoundError: return eager, iter(())
+    def remainder():
+        batch, progress = [first_remaining], 0.0
+        for item, progress in rows:
+            batch.append(Transaction.from_dict(item))
+            if len(batch) >= batch_size: yield batch, progress; batch = []
+        yield batch, 1.0
+    return eager, remainder()
+
+# --- バイナリスナップショット形式 ---
+#   ヘッダ | 固定長レコード × 件数 | 文字列テーブル(オフセット表 + UTF-8本体)
+# カテゴリやTodoの内容は文字列テーブルの番号で参照する。読み込みはmmap上で直接行う。
+class BinarySnapshotError(ValueError):
+    """バイナリスナップショットが壊れているか、未対応の版である"""
+
+SNAPSHOT_MAGIC = b"KKBS"; SNAPSHOT_VERSION = 2
+SNAPSHOT_KIND_LEDGER, SNAPSHOT_KIND_TODO = 1, 2
+_SNAPSHOT_HEADER_V1 = struct.Struct("<4sHBxIIQ")  # マジック, 版, 種類, レコード数, 文字列数, 文字列テーブルの位置
+_SNAPSHOT_HEADER = struct.Struct("<4sHBxIIQI4x")  # 版2: 上記 + ヘッダ以降のCRC32
+_LEDGER_RECORD = struct.Struct("<16sqiBBxxI")    # ID, 金額, 日付序数, 種別, フラグ, カテゴリ番号
+_TODO_RECORD = struct.Struct("<16siBBxxI")       # ID, 期日序数, 完了, フラグ, 内容番号
+_LEDGER_DATE_OFFSET = 24                         # _LEDGER_RECORD内の日付序数の位置
+_FLAG_ID_IN_STRINGS = 0x01                       # UUID形式でないIDを文字列テーブルに置いた
+_TX_TYPES = ('expense', 'income'); _TX_TYPE_CODES = {'expense': 0, 'income': 1}
+
+class _StringTable:
+    def __init__(self): self.index: dict[str, int] = {}
+    def add(self, text: str) -> int: return self.index.setdefault(text, len(self.index))
+    def encode(self) -> bytes:
+        blobs = [text.encode('utf-8') for text in self.index]; offsets = [0]
+        for blob in blobs: offsets.append(offsets[-1] + len(blob))
+        return struct.pack(f"<{len(offsets)}Q", *offsets) + b"".join(blobs)
+
+def _encode_snapshot_id(id_value, strings: _StringTable) -> Tuple[bytes, int]:
+    if isinstance(id_value, bytes): return id_value, 0
+    id_bytes = _uuid_str_to_bytes(id_value)
+    if id_bytes is not None: return id_bytes, 0
+    return struct.pack("<I12x", strings.add(id_value)), _FLAG_ID_IN_STRINGS
+
+def _decode_snapshot_id(id_bytes: bytes, flags: int, strings: List[str]):
+    return strings[struct.unpack_from("<I", id_bytes)[0]] if flags & _FLAG_ID_IN_STRINGS else id_bytes
+
+def _write_binary_snapshot(filepath: Path, kind: int, records: List[bytes], strings: _StringTable):
+    record_bytes = b"".join(records); body = record_bytes + strings.encode()
+    header = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, kind, len(records), len(strings.index), _SNAPSHOT_HEADER.size + len(record_bytes), zlib.crc32(body))
+    _atomic_write(filepath, header + body)
+
+class _BinarySnapshotReader:
+    """mmapしたスナップショットから、レコードを必要な範囲だけ取り出す"""
+    def __init__(self, filepath: Path, kind: int, record: struct.Struct):
+        self.record = record
+        with filepath.open('rb') as f:
+            try: self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: raise BinarySnapshotError("スナップショットが空です") from None
+        try:
+            magic, version = struct.unpack_from("<4sH", self._mm)
+            if magic != SNAPSHOT_MAGIC: raise BinarySnapshotError("スナップショットの形式が異なります")
+            if version > SNAPSHOT_VERSION: raise BinarySnapshotError(f"未対応のスナップショットの版です: {version}")
+            header = _SNAPSHOT_HEADER_V1 if version == 1 else _SNAPSHOT_HEADER; self._base = header.size
+            if len(self._mm) < header.size: raise BinarySnapshotError("ヘッダが不完全です")
+            _, _, file_kind, self.count, string_count, strings_offset, *checksum = header.unpack_from(self._mm)
+            if file_kind != kind: raise BinarySnapshotError("スナップショットの形式が異なります")
+            if checksum:
+                with memoryview(self._mm) as view, view[header.size:] as body:
+                    if zlib.crc32(body) != checksum[0]: raise BinarySnapshotError("チェックサムが一致しません")
+            if strings_offset != header.size + self.count * record.size: raise BinarySnapshotError("レコード領域の長さが一致しません")
+            offsets_end = strings_offset + (string_count + 1) * 8
+            offsets = struct.unpack_from(f"<{string_count + 1}Q", self._mm, strings_offset)
+            if offsets_end + offsets[-1] > len(self._mm): raise BinarySnapshotError("文字列テーブルが途中で切れています")
+            with memoryview(self._mm) as view:
+                self.strings = [sys.intern(str(view[offsets_end + start:offsets_end + end], 'utf-8')) for start, end in zip(offsets, offsets[1:])]
+        except (struct.error, UnicodeDecodeError) as e: self.close(); raise BinarySnapshotError(str(e)) from e
+        except BinarySnapshotError: self.close(); raise
+
+    def rows(self, start: int, stop: int) -> List[tuple]:
+        base = self._base
+        with memoryview(self._mm) as view, view[base + start * self.record.size:base + stop * self.record.size] as chunk:
+            return list(self.record.iter_unpack(chunk))
+
+    def first_index_before(self, ordinal: int) -> int:
+        """日付の降順に並んだ台帳レコードから、日付序数がordinal未満になる最初の位置を二分探索する"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if struct.unpack_from("<i", self._mm, self._base + mid * self.record.size + _LEDGER_DATE_OFFSET)[0] < ordinal: hi = mid
+            else: lo = mid + 1
+        return lo
+
+    def close(self): self._mm.close()
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+def _write_ledger_snapshot(filepath: Path, transactions: List[Transaction]):
+    strings = _StringTable(); pack = _LEDGER_RECORD.pack; records = []
+    for tx in transactions:
+        id_bytes, flags = _encode_snapshot_id(tx._id_bytes, strings)
+        records.append(pack(id_bytes, tx.amount, tx.date_ordinal, _TX_TYPE_CODES[tx.type], flags, strings.add(tx.category)))
+    _write_binary_snapshot(filepath, SNAPSHOT_KIND_LEDGER, records, strings)
+
+def _ledger_rows_to_transactions(rows: List[tuple], strings: List[str]) -> List[Transaction]:
+    from_trusted = Transaction._from_trusted
+    return [from_trusted(_decode_snapshot_id(id_bytes, flags, strings) if flags else id_bytes, amount, strings[category], ordinal, _TX_TYPES[type_code])
+            for id_bytes, amount, ordinal, type_code, flags, category in rows]
+
+def _read_ledger_snapshot(filepath: Path) -> List[Transaction]:
+    with _BinarySnapshotReader(filepath, SNAPSHOT_KIND_LEDGER, _LEDGER_RECORD) as reader:
+        return _ledger_rows_to_transactions(reader.rows(0, reader.count), reader.strings)
+
+def _stream_ledger_snapshot(filepath: Path, cutoff: date, batch_size: int = 20000) -> Tuple[List[Transaction], Iterator[Tuple[List[Transaction], float]]]:
+    """_stream_transactions_jsonのバイナリ版。cutoffの位置は二分探索で求める"""
+    try: reader = _load_newest_valid(filepath, lambda path: _BinarySnapshotReader(path, SNAPSHOT_KIND_LEDGER, _LEDGER_RECORD))
+    except FileNotFoundError: return [], iter(())
+    except ValueError: _quarantine_corrupt_file(filepath); return [], iter(())
+    split = reader.first_index_before(cutoff.toordinal())
+    eager = _ledger_rows_to_transactions(reader.rows(0, split), reader.strings)
+    def remainder():
+        with reader:
+            for start in range(split, reader.count, batch_size):
+                stop = min(start + batch_size, reader.count)
+                yield _ledger_rows_to_transactions(reader.rows(start, stop), reader.strings), stop / reader.count
+    if split == reader.count: reader.close(); return eager, iter(())
+    return eager, remainder()
+
+def _write_todo_snapshot(filepath: Path, todos: List['TodoItem']):
+    strings = _StringTable(); records = []
+    for todo in todos:
+        id_bytes, flags = _encode_snapshot_id(todo.id, strings)
+        records.append(_TODO_RECORD.pack(id_bytes, todo.due_date.toordinal(), todo.is_completed, flags, strings.add(todo.content)))
+    _write_binary_snapshot(filepath, SNAPSHOT_KIND_TODO, records, strings)
+
+def _read_todo_snapshot(filepath: Path) -> List['TodoItem']:
+    with _BinarySnapshotReader(filepath, SNAPSHOT_KIND_TODO, _TODO_RECORD) as reader:
+        strings = reader.strings
+        return [TodoItem(id=_uuid_bytes_to_str(id_bytes) if not flags else _decode_snapshot_id(id_bytes, flags, strings),
+                         content=strings[content], due_date=date.fromordinal(ordinal), is_completed=bool(is_completed))
+                for id_bytes, ordinal, is_completed, flags, content in reader.rows(0, reader.count)]
+
+class JsonFileStorage(LedgerStorage):
+    """
+    transactions.json全体を書き直す。連続した変更はWriteBehindSaverで1回の書き込みにまとめる。
+    保存は {"crc32": ..., "data": [取引の配列]} のチェックサム付きの形式で行う。以前の版の素の配列のファイルもそのまま読めるが、
+    最初の保存で新しい形式に置き換わる(以前の版のアプリで開くには、Ledger.export_jsonで素の配列として書き出す)。
+    """
+    def __init__(self, filepath: Path, save_delay: float = 0.5):
+        self.filepath = filepath; self._saver = WriteBehindSaver(lambda transactions: _write_transactions_json(self.filepath, transactions, indent=4), save_delay)
+    def load(self) -> List[Transaction]:
+        try: return _load_newest_valid(self.filepath, _read_transactions_json)
+        except FileNotFoundError: return []
+        except ValueError: _quarantine_corrupt_file(self.filepath); return []
+    def save(self, transactions: List[Transaction]): self._saver.mark_dirty(list(transactions)); self._saver.flush()
+    def record_add(self, transaction: Transaction, transactions: List[Transaction]): self._saver.mark_dirty(list(transactions))
+    def record_add_many(self, added: List[Transaction], transactions: List[Transaction]): self._saver.mark_dirty(list(transactions))
+    def record_delete(self, deleted: List[Transaction], transactions: List[Transaction]): self._saver.mark_dirty(list(transactions))
+    def record_update(self, transaction: Transaction, transactions: List[Transaction]): self._saver.mark_dirty(list(transactions))
+    def close(self): self._saver.flush()
+    def load_streaming(self, cutoff: date):
+        # 解析は段階的に行うが、チェックサムの検証だけは先にファイル全体に対して行い、読む世代を決める
+        try: filepath = _load_newest_valid(self.filepath, _verify_transactions_json_file)
+        except FileNotFoundError: return [], iter(())
+        except ValueError: _quarantine_corrupt_file(self.filepath); return [], iter(())
+        return _stream_transactions_json(filepath, cutoff)
+
+class JournalStorage(LedgerStorage):
+    """
+    追記専用ジャーナル形式。追加・削除は1行のレコードとしてジャーナルに追記し、
+    一定件数ごとにバックグラウンドでバイナリスナップショットへ圧縮する。
+    読み込み時はスナップショットを読んでからジャーナルの残りを再生する。
+    """
+    def __init__(self, directory: Path, legacy_filepath: Path = None, compact_threshold: int = 500):
+        self.snapshot_path = directory / "ledger_snapshot.bin"
+        self.json_snapshot_path = directory / "ledger_snapshot.json"  # 以前の版のスナップショット
+        self.journal_path = directory / "ledger_journal.jsonl"
+        # 圧縮中のジャーナル。スナップショットの置き換えが完了するまで残しておく
+        self.compacting_path = directory / "ledger_journal.compacting.jsonl"
+        self.legacy_filepath = legacy_filepath; self.compact_threshold = compact_threshold
+        self._journal_file = None; self._journal_count = 0
+        self._lock = threading.Lock(); self._compaction_thread = None
+
+    def load(self) -> List[Transaction]:
+        self._wait_for_compaction()
+        if not self.snapshot_path.exists(): self._migrate_legacy_json()
+        try: by_id = {tx.id: tx for tx in _load_newest_valid(self.snapshot_path, _read_ledger_snapshot)}
+        except FileNotFoundError: by_id = {}
+        except ValueError: _quarantine_corrupt_file(self.snapshot_path); by_id = {}
+        self._journal_count = self._replay(self.compacting_path, by_id) + self._replay(self.journal_path, by_id)
+        return list(by_id.values())
+
+    def load_streaming(self, cutoff: date):
+        self._wait_for_compaction()
+        if not self.snapshot_path.exists(): self._migrate_legacy_json()
+        # ジャーナルは小さいので先に再生し、スナップショット側の行から上書き・削除済みのIDを除く
+        journal_by_id, touched_ids = {}, set()
+        self._journal_count = self._replay(self.compacting_path, journal_by_id, touched_ids) + self._replay(self.journal_path, journal_by_id, touched_ids)
+        eager, remainder = _stream_ledger_snapshot(self.snapshot_path, cutoff)
+        cutoff_ordinal = cutoff.toordinal()
+        eager = [tx for tx in eager if not touched_ids or tx.id not in touched_ids] + [tx for tx in journal_by_id.values() if tx.date_ordinal >= cutoff_ordinal]
+        def filtered_remainder():
+            for batch, progress in remainder: yield [tx for tx in batch if not touched_ids or tx.id not in touched_ids], progress
+            yield [tx for tx in journal_by_id.values() if tx.date_ordinal < cutoff_ordinal], 1.0
+        return eager, filtered_remainder()
+
+    def _migrate_legacy_json(self):
+        """
+        バイナリのスナップショットがなければ、以前の版のJSONスナップショットか、
+        (ジャーナルもまだない初回起動時は)transactions.jsonから作る。元のファイルはそのまま残す。
+        """
+        if self.json_snapshot_path.exists(): source = self.json_snapshot_path
+        elif self.legacy_filepath is not None and not self.journal_path.exists(): source = self.legacy_filepath
+        else: return
+        try: transactions = _read_transactions_json(source)
+        except (FileNotFoundError, ValueError): return
+        _write_ledger_snapshot(self.snapshot_path, sorted(transactions, key=_tx_sort_key))
+
+    @staticmethod
+    def _replay(path: Path, by_id: dict, touched_ids: set = None) -> int:
+        # 再生は冪等にしておく(圧縮途中でクラッシュした場合、同じレコードを二重に再生しうるため)
+        count = 0
+        try:
+            with path.open('r', encoding='utf-8') as f:
+                for line in f:
+                    try: record = json.loads(line)
+                    except json.JSONDecodeError: continue  # 書き込み途中で途切れた行は無視する
+                    if record["op"] in ("add", "update"):
+                        tx = Transaction.from_dict(record["tx"]); by_id[tx.id] = tx
+                        if touched_ids is not None: touched_ids.add(tx.id)
+                    elif record["op"] == "delete":
+                        for tx_id in record["ids"]:
+                            by_id.pop(tx_id, None)
+                            if touched_ids is not None: touched_ids.add(tx_id)
+                    count += 1
+        except FileNotFoundError: pass
+        return count
+
+    @staticmethod
+    def _open_for_append(path: Path):
+        # 前回の書き込みが行の途中で途切れていた場合は改行を補い、次のレコードが同じ行に連結されないようにする
+        f = path.open('a+b'); f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n": f.write(b"\n")
+        return io.TextIOWrapper(f, encoding='utf-8')
+
+    def _append(self, records: List[dict], transactions: List[Transaction]):
+        if self._journal_file is None: self._journal_file = self._open_for_append(self.journal_path)
+        self._journal_file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)); self._journal_file.flush()
+        self._journal_count += len(records)
+        # 一括取り込みでは1回に多くのレコードを追記するので、全件の書き直しが追記量に比例する程度に収まるよう、件数に応じて圧縮の間隔を広げる
+        if self._journal_count >= max(self.compact_threshold, len(transactions) // 4): self.compact(transactions)
+
+    def record_add(self, transaction: Transaction, transactions: List[Transaction]): self._append([{"op": "add", "tx": transaction.to_dict()}], transactions)
+    def record_add_many(self, added: List[Transaction], transactions: List[Transaction]): self._append([{"op": "add", "tx": tx.to_dict()} for tx in added], transactions)
+    def record_delete(self, deleted: List[Transaction], transactions: List[Transaction]): self._append([{"op": "delete", "ids": [tx.id for tx in deleted]}], transactions)
+    def record_update(self, transaction: Transaction, transactions: List[Transaction]): self._append([{"op": "update", "tx": transaction.to_dict()}], transactions)
+
+    def save(self, transactions: List[Transaction]):
+        """全件をスナップショットとして同期的に書き出し、ジャーナルを空にする"""
+        self._wait_for_compaction(); self._close_journal()
+        _write_ledger_snapshot(self.snapshot_path, transactions)
+        for path in (self.compacting_path, self.journal_path): path.unlink(missing_ok=True)
+        self._journal_count = 0
+
+    def compact(self, transactions: List[Transaction], background: bool = True):
+        with self._lock:
+            if self._compaction_thread is not None and self._compaction_thread.is_alive(): return
+            # 現在のジャーナルを退避し、以降の追記は新しいジャーナルへ行う
+            self._close_journal()
+            if self.journal_path.exists() and self.compacting_path.exists():
+                # 前回の圧縮が中断していた場合は、退避済みのジャーナルの後ろに連結する
+                with self._open_for_append(self.compacting_path) as dst, self.journal_path.open('r', encoding='utf-8') as src: shutil.copyfileobj(src, dst)
+                self.journal_path.unlink()
+            elif self.journal_path.exists(): os.replace(self.journal_path, self.compacting_path)
+            self._journal_count = 0
+            snapshot = list(transactions)
+            self._compaction_thread = threading.Thread(target=self._write_snapshot, args=(snapshot,), daemon=True)
+            self._compaction_thread.start()
+        if not background: self._wait_for_compaction()
+
+    def _write_snapshot(self, snapshot: List[Transaction]):
+        _write_ledger_snapshot(self.snapshot_path, snapshot)
+        self.compacting_path.unlink(missing_ok=True)
+
+    def _wait_for_compaction(self):
+        thread = self._compaction_thread
+        if thread is not None: thread.join()
+
+    def _close_journal(self):
+        if self._journal_file is not None: self._journal_file.close(); self._journal_file = None
+
+    def close(self): self._wait_for_compaction(); self._close_journal()
+
+def _month_bounds(year: int, month: int) -> Tuple[date, date]:
+    """その月の初日と末日"""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+def _month_keys_between(start: date, end: date) -> List[Tuple[int, int]]:
+    """start〜endが含まれる各月の(年, 月)を古い順に返す"""
+    first, last = start.year * 12 + start.month - 1, end.year * 12 + end.month - 1
+    return [(index // 12, index % 12 + 1) for index in range(first, last + 1)]
+
+def _month_index(day: date) -> int: return (day.year - 1970) * 12 + day.month - 1
+def _month_start(index: int) -> date: return date(1970 + index // 12, index % 12 + 1, 1)
+
+def _sorted_monthly_summaries(totals: dict) -> dict:
+    """{(年, 月): {種別: {カテゴリ: 合計}}} の各カテゴリを金額の大きい順に並べる"""
+    return {month_key: {type: dict(sorted(summary.items(), key=lambda item: item[1], reverse=True)) for type, summary in by_type.items()} for month_key, by_type in totals.items()}
+
+def _aggregate_monthly_rows(months: List[Tuple[int, int]], month_offsets, type_codes, category_codes, amounts, categories: List[str]) -> dict:
+    """
+    NumpyAggregationEngine.rows_for_monthsで切り出した行を月×種別×カテゴリごとに合計する。
+    Ledgerに触れないので、TaskRunnerのワーカー(スレッド・プロセス)で実行できる。
+    """
+    _import_numpy()
+    num_months, num_types, num_categories = len(months), len(NumpyAggregationEngine.TYPES), len(categories)
+    keys = (month_offsets * num_types + type_codes) * num_categories + category_codes
+    totals = np.zeros(num_months * num_types * num_categories, dtype=np.int64)
+    np.add.at(totals, keys, amounts)
+    totals = totals.reshape(num_months, num_types, num_categories)
+    result = {}
+    for month_offset, month_key in enumerate(months):
+        result[month_key] = {}
+        for type_code, type in enumerate(NumpyAggregationEngine.TYPES):
+            row = totals[month_offset, type_code]
+            result[month_key][type] = {categories[code]: int(row[code]) for code in np.flatnonzero(row)}
+    return _sorted_monthly_summaries(result)
+
+class NumpyAggregationEngine:
+    """
+    取引の金額・通算月・種別・カテゴリをNumPy配列として保持し、月×種別×カテゴリの合計をまとめて求める。
+    配列は最初に使うときに全件から作り、以降はLedgerの追加・削除のたびに1行ずつ更新する
+    (削除では末尾の行を空いた位置へ移すので、行の順序は取引の並びとは一致しない)。
+    """
+    TYPE_CODES = {'expense': 0, 'income': 1}; TYPES = ('expense', 'income')
+    _EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+    _MIN_CAPACITY = 1024
+
+    def __init__(self, transactions: List[Transaction]):
+        count = len(transactions); capacity = max(self._MIN_CAPACITY, count + count // 2)
+        self.categories: List[str] = []; self._category_codes: dict[str, int] = {}
+        # _rows: 取引ID -> 行番号、_row_ids: 行番号 -> 取引ID
+        self._row_ids = [tx._id_bytes for tx in transactions]; self._rows = dict(zip(self._row_ids, range(count))); self.size = count
+        self.amounts = np.zeros(capacity, dtype=np.int64); self.type_codes = np.zeros(capacity, dtype=np.int64)
+        self.category_codes = np.zeros(capacity, dtype=np.int64); self.month_indexes = np.zeros(capacity, dtype=np.int64)
+        self.amounts[:count] = np.fromiter((tx.amount for tx in transactions), dtype=np.int64, count=count)
+        self.type_codes[:count] = np.fromiter((self.TYPE_CODES[tx.type] for tx in transactions), dtype=np.int64, count=count)
+        self.category_codes[:count] = np.fromiter((self._category_code(tx.category) for tx in transactions), dtype=np.int64, count=count)
+        ordinals = np.fromiter((tx.date_ordinal for tx in transactions), dtype=np.int64, count=count)
+        # 日付序数を1970年1月からの通算月に変換する
+        self.month_indexes[:count] = (ordinals - self._EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_codes.get(category)
+        if code is None: code = self._category_codes[category] = len(self.categories); self.categories.append(category)
+        return code
+
+    def add(self, tx: Transaction):
+        row = self.size
+        if row == len(self.amounts):
+            for name in ("amounts", "type_codes", "category_codes", "month_indexes"):
+                column = getattr(self, name); grown = np.zeros(len(column) * 2, dtype=np.int64); grown[:row] = column; setattr(self, name, grown)
+        self.amounts[row] = tx.amount; self.type_codes[row] = self.TYPE_CODES[tx.type]
+        self.category_codes[row] = self._category_code(tx.category); self.month_indexes[row] = _month_index(tx.transaction_date)
+        self._rows[tx._id_bytes] = row; self._row_ids.append(tx._id_bytes); self.size += 1
+
+    def remove(self, tx: Transaction):
+        row = self._rows.pop(tx._id_bytes); last = self.size - 1
+        if row != last:
+            for column in (self.amounts, self.type_codes, self.category_codes, self.month_indexes): column[row] = column[last]
+            moved_id = self._row_ids[last]; self._row_ids[row] = moved_id; self._rows[moved_id] = row
+        self._row_ids.pop(); self.size = last
+
+    def rows_for_months(self, months: List[Tuple[int, int]]) -> tuple:
+        """monthsに含まれる行だけを切り出し、_aggregate_monthly_rowsの引数として返す(配列はコピーなので後から変更されない)"""
+        size = self.size; first = _month_index(date(*months[0], 1))
+        month_offsets = self.month_indexes[:size] - first
+        mask = (month_offsets >= 0) & (month_offsets < len(months))
+        return (list(months), month_offsets[mask], self.type_codes[:size][mask], self.category_codes[:size][mask], self.amounts[:size][mask], list(self.categories))
+
+class LedgerLoadError(RuntimeError):
+    """取引データの一部を読み込めなかった。読めた分だけで保存すると残りが失われるため、変更と保存を受け付けない"""
+
+class Ledger(ChangeNotifier):
+    def __init__(self, storage: LedgerStorage = None, streaming: bool = False):
+        self._listeners: List[Callable[[ChangeEvent], None]] = []
         self.filepath = Path.home() / ".simple_kakeibo" / "transactions.json"
         self.filepath.parent.mkdir(parents=True, exist_ok=True)
-        self._transactions: List[Transaction] = self._load()
-
+        self._storage = storage if storage is not None else JournalStorage(self.filepath.parent, legacy_filepath=self.filepath)
+        # load_error: 段階的な読み込みが途中で失敗したときの例外。あれば台帳は読み取り専用になる
+        self._loader_thread = None; self._pending_batches = queue.Queue(); self.load_progress = 1.0; self.load_error = None
+        self._transactions: List[Transaction] = self._load_streaming() if streaming else self._load()
+        # _month_versions: (年, 月, 種別) -> その月の取引が変わるたびに増える版数(作り直しても0には戻さない)
+        self._version = 0; self._month_versions: dict[Tuple[int, int, str], int] = defaultdict(int)
+        self._rebuild_indexes()
+
+    @_profiled
     def _load(self) -> List[Transaction]:
+        return sorted(self._storage.load(), key=lambda x: x.transaction_date, reverse=True)
+
+    @_profiled
+    def _save(self): self._finish_loading(); self._storage.save(self._transactions)
+
+    # --- 段階的な読み込み ---
+    # 起動時は前月と今月の取引だけを同期的に読み、残りはバックグラウンドスレッドで解析する。
+    # 解析済みのバッチはキューに積まれ、メインスレッドがmerge_pending_batchesで取り込む。
+    def _load_streaming(self) -> List[Transaction]:
+        cutoff = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+        try: eager, remainder = self._storage.load_streaming(cutoff)
+        except (json.JSONDecodeError, ValueError, KeyError) as e: self._record_load_error(e); return []
+        self.load_progress = 0.0
+        self._loader_thread = threading.Thread(target=self._read_remainder, args=(remainder,), daemon=True); self._loader_thread.start()
+        return sorted(eager, key=lambda x: x.transaction_date, reverse=True)
+
+    def _read_remainder(self, remainder: Iterator[Tuple[List[Transaction], float]]):
         try:
-            with self.filepath.open('r', encoding='utf-8') as f:
-                raw_data = json.load(f)
-                return [Transaction.from_dict(item) for item in raw_data]
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
-
-    def _save(self):
-        with self.filepath.open('w', encoding='utf-8') as f:
-            data_to_save = [tx.to_dict() for tx in self._transactions]
-            json.dump(data_to_save, f, indent=4, ensure_ascii=False)
-            
+            for batch in remainder: self._pending_batches.put(batch)
+        except (json.JSONDecodeError, ValueError, KeyError) as e: self._record_load_error(e)
+        finally: self._pending_batches.put(None)
+
+    def _record_load_error(self, error: Exception):
+        self.load_error = error; print(f"WARN: 取引データの読み込みを中断しました。データを保護するため変更と保存を停止します: {error}")
+
+    @property
+    def is_loading(self) -> bool: return self._loader_thread is not None
+
+    def _merge_batches(self, block: bool, max_batches: int = None):
+        merged = 0
+        while self._loader_thread is not None and (max_batches is None or merged < max_batches):
+            try: item = self._pending_batches.get(block=block)
+            except queue.Empty: return
+            if item is None: self._loader_thread.join(); self._loader_thread = None; self.load_progress = 1.0; return
+            batch, self.load_progress = item
+            # 残りの取引はほぼ全て既存の取引より古いため、挿入位置はリスト末尾付近になる
+            for tx in batch: bisect.insort_right(self._transactions, tx, key=_tx_sort_key); self._index_add(tx)
+            self._version += 1; merged += 1
+
+    def merge_pending_batches(self, max_batches: int = 4) -> bool:
+        """バックグラウンドで解析済みの取引を取り込む(メインスレッドから呼ぶ)。まだ読み込み中ならTrueを返す"""
+        self._merge_batches(block=False, max_batches=max_batches); return self.is_loading
+
+    def _finish_loading(self):
+        """
+        残りの読み込みを待って全件を取り込む。一部だけの状態で保存しないよう、変更系の操作の前に呼ぶ。
+        読み込みが途中で失敗していればLedgerLoadErrorを送出し、ファイルを読めた分だけで上書きしないようにする。
+        """
+        self._merge_batches(block=True)
+        if self.load_error is not None: raise LedgerLoadError(f"取引データの一部を読み込めなかったため、データを保護するために変更を保存できません。({self.load_error})")
+
+    # --- IDと日付のインデックスと月別集計 ---
+    # _by_id: Transaction._id_bytes -> 取引
+    # _by_date: 日付 -> その日の取引(全体の並び順と同じ順序)
+    # _month_totals: (年, 月, 種別) -> 合計金額
+    # _month_category_totals: (年, 月, 種別) -> {カテゴリ: 合計金額}
+    def _rebuild_indexes(self):
+        self._by_id: dict[object, Transaction] = {}
+        self._by_date: dict[date, List[Transaction]] = defaultdict(list)
+        self._month_totals: dict[Tuple[int, int, str], int] = defaultdict(int)
+        self._month_category_totals: dict[Tuple[int, int, str], dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # 集計用の配列は次に複数月の集計を求めるときに全件から作り直す
+        self._aggregation_engine = None
+        for tx in self._transactions: self._index_add(tx)
+
+    def _index_add(self, tx: Transaction):
+        self._by_date[tx.transaction_date].append(tx); self._by_id[tx._id_bytes] = tx; self._index_add_totals(tx)
+
+    def _index_add_totals(self, tx: Transaction):
+        key = (tx.transaction_date.year, tx.transaction_date.month, tx.type)
+        self._month_totals[key] += tx.amount; self._month_category_totals[key][tx.category] += tx.amount; self._month_versions[key] += 1
+        if self._aggregation_engine is not None: self._aggregation_engine.add(tx)
+
+    def _index_remove_totals(self, tx: Transaction):
+        key = (tx.transaction_date.year, tx.transaction_date.month, tx.type); self._month_versions[key] += 1
+        if self._aggregation_engine is not None: self._aggregation_engine.remove(tx)
+        self._month_totals[key] -= tx.amount
+        if self._month_totals[key] == 0: del self._month_totals[key]
+        category_totals = self._month_category_totals[key]; category_totals[tx.category] -= tx.amount
+        if category_totals[tx.category] == 0: del category_totals[tx.category]
+        if not category_totals: del self._month_category_totals[key]
+
+    def check_index_consistency(self) -> List[str]:
+        """インデックスと集計値を全件走査の結果と突き合わせ、食い違いの一覧を返す(空なら整合)"""
+        problems = []
+        expected_by_date = defaultdict(list); expected_totals = defaultdict(int); expected_category_totals = defaultdict(lambda: defaultdict(int))
+        for tx in self._transactions:
+            expected_by_date[tx.transaction_date].append(tx)
+            key = (tx.transaction_date.year, tx.transaction_date.month, tx.type)
+            expected_totals[key] += tx.amount; expected_category_totals[key][tx.category] += tx.amount
+        if {tx._id_bytes: tx for tx in self._transactions} != self._by_id: problems.append("IDインデックスの不一致")
+        for day in set(expected_by_date) | set(self._by_date):
+            if [tx.id for tx in expected_by_date.get(day, [])] != [tx.id for tx in self._by_date.get(day, [])]: problems.append(f"日付インデックスの不一致: {day}")
+        for key in set(expected_totals) | set(self._month_totals):
+            if expected_totals.get(key, 0) != self._month_totals.get(key, 0): problems.append(f"月別合計の不一致: {key}")
+        for key in set(expected_category_totals) | set(self._month_category_totals):
+            if dict(expected_category_totals.get(key, {})) != dict(self._month_category_totals.get(key, {})): problems.append(f"カテゴリ別合計の不一致: {key}")
+        return problems
+
+    def export_json(self, filepath: Path = None):
+        """従来のtransactions.json形式で全件を書き出す"""
+        self._finish_loading(); _write_transactions_json(filepath or self.filepath, self._transactions, indent=4, checksum=False)
+
+    def import_json(self, filepath: Path = None) -> int:
+        """transactions.json形式のファイルから、未登録のIDの取引だけを取り込む"""
+        self._finish_loading(); known_ids = {tx.id for tx in self._transactions}
+        return len(self.add_transactions([tx for tx in _read_transactions_json(filepath or self.filepath) if tx.id not in known_ids]))
+
+    def close(self): self._storage.close()
+
+    @property
+    def version(self) -> int: return self._version
+    def month_version(self, year: int, month: int) -> int:
+        """指定した月の取引が変わるたびに増える値。月単位のキャッシュの有効性の確認に使う"""
+        return self._month_versions.get((year, month, 'expense'), 0) + self._month_versions.get((year, month, 'income'), 0)
+
     def add_transaction(self, transaction: Transaction):
-        self._transactions.append(transaction)
-        self._transactions.sort(key=lambda x: x.transaction_date, reverse=True)
-        self._save()
+        self._finish_loading()
+        # 同じ日付の既存取引の後ろに挿入する(従来の追加+安定ソートと同じ並び)
+        bisect.insort_right(self._transactions, transaction, key=_tx_sort_key)
+        self._index_add(transaction); self._version += 1
+        self._storage.record_add(transaction, self._transactions)
+        self._notify(ChangeEvent.ADDED, [transaction.transaction_date], [transaction])
+
+    def add_transactions(self, transactions: List[Transaction], exclude: Callable = None) -> List[Transaction]:
+        """
+        複数の取引を1回の併合と1回の記録で追加し、追加した取引を返す(一括取り込み用)。併合するのは追加する取引の日付の範囲だけなので、
+        日付の近いバッチを繰り返し追加しても全件を並べ直さない。excludeを渡すと、読み込みを終えた台帳に対して
+        exclude(transactions, get_transactions_for_day)を呼び、返された取引だけを追加する(重複の除去用)。
+        """
+        self._finish_loading()
+        if exclude is not None: transactions = exclude(transactions, self.get_transactions_for_day)
+        if not transactions: return []
+        # 同じ日付の中では既存の取引の後ろに、渡された順で並べる(add_transactionを繰り返した場合と同じ並び)
+        new_transactions = sorted(transactions, key=_tx_sort_key)
+        lo = bisect.bisect_left(self._transactions, _tx_sort_key(new_transactions[0]), key=_tx_sort_key)
+        hi = bisect.bisect_right(self._transactions, _tx_sort_key(new_transactions[-1]), key=_tx_sort_key)
+        self._transactions[lo:hi] = list(heapq.merge(self._transactions[lo:hi], new_transactions, key=_tx_sort_key))
+        for tx in new_transactions: self._index_add(tx)
+        self._version += 1; self._storage.record_add_many(new_transactions, self._transactions)
+        self._notify(ChangeEvent.ADDED, {tx.transaction_date for tx in new_transactions}, new_transactions)
+        return new_transactions
+
+    # --- 1件ずつの参照・変更・削除 ---
+    # IDで引き、全体のリスト内の位置は日付の範囲を二分探索してから求めるので、全件の走査や作り直しはしない
+    def get(self, tx_id: str) -> Transaction:
+        """IDの取引を返す(なければNone)。読み込み中の古い取引はまだ見つからないことがある"""
+        return self._by_id.get(_transaction_id_key(tx_id))
+
+    def _position(self, tx: Transaction) -> int:
+        lo, hi = _desc_date_range(self._transactions, tx.transaction_date, tx.transaction_date, _tx_sort_key); return self._transactions.index(tx, lo, hi)
+
+    def _remove_from_day(self, tx: Transaction):
+        day = self._by_date[tx.transaction_date]; day.remove(tx)
+        if not day: del self._by_date[tx.transaction_date]
+
+    def update(self, tx_id: str, **fields) -> Transaction:
+        """
+        取引の金額(amount)・カテゴリ(category)・日付(transaction_date)・種別(type)を変更し、変更後の取引を返す。
+        IDは変わらない。日付が変わらなければ並び順もそのまま、変われば新しい日付の取引の末尾に移る。
+        """
+        self._finish_loading(); old = self.get(tx_id)
+        if old is None: raise KeyError(tx_id)
+        unknown = set(fields) - {"amount", "category", "transaction_date", "type"}
+        if unknown: raise TypeError(f"変更できない項目です: {', '.join(sorted(unknown))}")
+        # 検証はTransactionの生成で行い、不正な値なら何も変更しない
+        new = Transaction(**{"amount": old.amount, "category": old.category, "transaction_date": old.transaction_date, "type": old.type, **fields}, id=old._id_bytes)
+        position = self._position(old); self._index_remove_totals(old); self._by_id[new._id_bytes] = new
+        if new.date_ordinal == old.date_ordinal:
+            self._transactions[position] = new; day = self._by_date[old.transaction_date]; day[day.index(old)] = new
+        else:
+            del self._transactions[position]; self._remove_from_day(old)
+            bisect.insort_right(self._transactions, new, key=_tx_sort_key); self._by_date[new.transaction_date].append(new)
+        self._index_add_totals(new); self._version += 1
+        self._storage.record_update(new, self._transactions)
+        self._notify(ChangeEvent.UPDATED, {old.transaction_date, new.transaction_date}, [new])
+        return new
+
+    def delete(self, tx_id: str) -> Transaction:
+        """IDの取引を削除して返す(なければNone)"""
+        self._finish_loading(); tx = self._by_id.pop(_transaction_id_key(tx_id), None)
+        if tx is None: return None
+        del self._transactions[self._position(tx)]; self._remove_from_day(tx); self._index_remove_totals(tx); self._version += 1
+        self._storage.record_delete([tx], self._transactions)
+        self._notify(ChangeEvent.DELETED, [tx.transaction_date], [tx])
+        return tx
 
     def get_all_transactions(self) -> List[Transaction]: return self._transactions
-    def get_expense_summary_for_month(self, year: int, month: int) -> int: return sum(tx.amount for tx in self._transactions if tx.transaction_date.year == year and tx.transaction_date.month == month and tx.type == 'expense')
-    def get_income_summary_for_month(self, year: int, month: int) -> int: return sum(tx.amount for tx in self._transactions if tx.transaction_date.year == year and tx.transaction_date.month == month and tx.type == 'income')
+    def get_transactions_between(self, start: date, end: date) -> List[Transaction]:
+        """start〜end(両端を含む)の取引を日付の降順で返す"""
+        lo, hi = _desc_date_range(self._transactions, start, end, _tx_sort_key); return self._transactions[lo:hi]
+    def iter_transactions_between(self, start: date, end: date) -> Iterator[Transaction]:
+        """get_transactions_betweenの遅延版。リストをコピーせずに1件ずつ返す"""
+        lo, hi = _desc_date_range(self._transactions, start, end, _tx_sort_key)
+        return (self._transactions[i] for i in range(lo, hi))
+    def count_transactions_between(self, start: date, end: date) -> int:
+        lo, hi = _desc_date_range(self._transactions, start, end, _tx_sort_key); return hi - lo
+    def count_transactions_by_month(self) -> dict[Tuple[int, int], int]:
+        """取引のある月ごとの件数(取引リストの月見出し用)。日付インデックスから数えるので取引の件数ではなく日数に比例する"""
+        counts = defaultdict(int)
+        for day, transactions in self._by_date.items(): counts[(day.year, day.month)] += len(transactions)
+        return dict(counts)
+    def get_expense_summary_for_month(self, year: int, month: int) -> int: return self._month_totals.get((year, month, 'expense'), 0)
+    def get_income_summary_for_month(self, year: int, month: int) -> int: return self._month_totals.get((year, month, 'income'), 0)
     def get_category_summary_for_month(self, year: int, month: int) -> dict[str, int]:
-        category_summary = defaultdict(int)
-        for tx in self._transactions:
-            if tx.transaction_date.year == year and tx.transaction_date.month == month and tx.type == 'expense': category_summary[tx.category] += tx.amount
+        category_summary = self._month_category_totals.get((year, month, 'expense'), {})
         return dict(sorted(category_summary.items(), key=lambda item: item[1], reverse=True))
     def get_income_category_summary_for_month(self, year: int, month: int) -> dict[str, int]:
-        category_summary = defaultdict(int)
-        for tx in self._transactions:
-            if tx.transaction_date.year == year and tx.transaction_date.month == month and tx.type == 'income': category_summary[tx.category] += tx.amount
+        category_summary = self._month_category_totals.get((year, month, 'income'), {})
         return dict(sorted(category_summary.items(), key=lambda item: item[1], reverse=True))
-    def get_transactions_for_day(self, target_date: date) -> List[Transaction]: return [tx for tx in self._transactions if tx.transaction_date == target_date]
+    def get_transactions_for_day(self, target_date: date) -> List[Transaction]: return list(self._by_date.get(target_date, []))
+
+    # 複数月の集計は、Tkのスレッドで必要な行を切り出す準備(prepare_monthly_summaries)と、
+    # Ledgerに触れない集計の関数に分ける。集計はget_monthly_summariesでその場で行うか、TaskRunnerのワーカーで行う
+    # これ以上の月数の集計にNumPyの配列を使う。bench_suiteでは、1万〜100万件・12〜165か月のどの組み合わせでも
+    # 月別集計インデックス(12か月で0.1〜0.2ms)の方が配列(1〜28ms、初回は配列の構築も加わる)より速かったので、既定では使わない
+    AGGREGATION_ENGINE_MIN_MONTHS = float("inf")
+
+    def prepare_monthly_summaries(self, start: date, end: date) -> Tuple[Callable, tuple]:
+        """get_monthly_summaries(start, end)の結果を返す(関数, 引数)の組を作る。引数は呼び出し時点の写しでpickleできる"""
+        months = _month_keys_between(start, end)
+        if len(months) >= self.AGGREGATION_ENGINE_MIN_MONTHS and self._transactions and _import_numpy():
+            if self._aggregation_engine is None: self._aggregation_engine = NumpyAggregationEngine(self._transactions)
+            return _aggregate_monthly_rows, self._aggregation_engine.rows_for_months(months)
+        return _sorted_monthly_summaries, ({(year, month): {type: dict(self._month_category_totals.get((year, month, type), {})) for type in ('expense', 'income')} for year, month in months},)
+
+    def get_monthly_summaries(self, start: date, end: date) -> dict[Tuple[int, int], dict[str, dict[str, int]]]:
+        """
+        start〜endが含まれる各月について {(年, 月): {'expense': {カテゴリ: 合計}, 'income': {...}}} を返す。
+        年間レポートや複数月のグラフ向け。NumPyがあり期間がAGGREGATION_ENGINE_MIN_MONTHS以上ならNumPyの配列で(既定では使わない)、それ以外は月別集計インデックスから組み立てる。
+        """
+        func, args = self.prepare_monthly_summaries(start, end); return func(*args)
     
     def delete_transactions_for_day(self, target_date: date) -> int:
-        initial_count = len(self._transactions)
-        self._transactions = [tx for tx in self._transactions if tx.transaction_date != target_date]
-        num_deleted = initial_count - len(self._transactions)
-        if num_deleted > 0:
-            self._save()
-        return num_deleted
+        self._finish_loading(); deleted = self._by_date.pop(target_date, [])
+        if deleted:
+            for tx in deleted: self._index_remove_totals(tx); del self._by_id[tx._id_bytes]
+            self._version += 1
+            lo, hi = _desc_date_range(self._transactions, target_date, target_date, _tx_sort_key); del self._transactions[lo:hi]
+            self._storage.record_delete(deleted, self._transactions)
+            self._notify(ChangeEvent.DELETED, [target_date], deleted)
+        return len(deleted)
+
+def _monthly_summaries_from_rows(months: List[Tuple[int, int]], conn: sqlite3.Connection, range_start: str, range_end: str) -> dict:
+    result = {month_key: {'expense': {}, 'income': {}} for month_key in months}
+    rows = conn.execute("""SELECT substr(transaction_date, 1, 7) AS month, type, category, SUM(amount) AS total FROM transactions
+        WHERE transaction_date >= ? AND transaction_date < ?
+        GROUP BY month, type, category ORDER BY total DESC""", (range_start, range_end))
+    for month, type, category, total in rows:
+        result[(int(month[:4]), int(month[5:7]))][type][category] = total
+    return result
+
+def _query_monthly_summaries(db_path: str, months: List[Tuple[int, int]], range_start: str, range_end: str) -> dict:
+    """SqliteLedger.prepare_monthly_summariesの集計側。ワーカーのスレッド・プロセスから読み取り専用の接続で問い合わせる"""
+    conn = sqlite3.connect(Path(db_path).as_uri() + "?mode=ro", uri=True)
+    try: return _monthly_summaries_from_rows(months, conn, range_start, range_end)
+    finally: conn.close()
+
+class SqliteLedger(ChangeNotifier):
+    """
+    Ledgerと同じ公開APIを持つSQLite版。取引はledger.dbにのみ保持し、
+    集計は日付・種別・カテゴリのインデックスを使ったクエリで行う。
+    """
+    _COLUMNS = "id, amount, category, transaction_date, type"
+    load_error = None  # Ledgerと同じ属性。段階的な読み込みはしないので常にNone
+
+    def __init__(self, filename="ledger.db"):
+        self._listeners: List[Callable[[ChangeEvent], None]] = []; self._version = 0; self._month_versions: dict[Tuple[int, int], int] = defaultdict(int)
+        self.filepath = Path.home() / ".simple_kakeibo" / filename
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.filepath.exists()
+        self._conn = sqlite3.connect(self.filepath)
+        self._create_schema()
+        if is_new: self._migrate_from_json_storage()
+
+    def _create_schema(self):
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS transactions (
+                id TEXT PRIMARY KEY, amount INTEGER NOT NULL, category TEXT NOT NULL,
+                transaction_date TEXT NOT NULL, type TEXT NOT NULL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tx_date ON transactions (transaction_date)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tx_type_date ON transactions (type, transaction_date)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tx_category ON transactions (category)")
+
+    def _migrate_from_json_storage(self):
+        """初回作成時、ジャーナル/transactions.jsonに保存済みの取引を取り込む"""
+        directory = self.filepath.parent
+        transactions = JournalStorage(directory, legacy_filepath=directory / "transactions.json").load()
+        self._insert_many(transactions)
+
+    def replace_all(self, transactions: List[Transaction]):
+        """全ての取引を置き換える(保存形式の移行用)。置き換える前のledger.dbは.bak1として残す"""
+        backup = sqlite3.connect(_backup_path(self.filepath, 1))
+        try: self._conn.backup(backup)
+        finally: backup.close()
+        with self._conn: self._conn.execute("DELETE FROM transactions")
+        self._insert_many(transactions)
+
+    def _insert_many(self, transactions: List[Transaction]):
+        with self._conn:
+            self._conn.executemany(f"INSERT OR IGNORE INTO transactions ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                                   [(tx.id, tx.amount, tx.category, tx.transaction_date.isoformat(), tx.type) for tx in transactions])
+        self._bump_versions(tx.transaction_date for tx in transactions)
+
+    def _bump_versions(self, dates: Iterator[date]):
+        # このプロセス内での変更だけを数える(他のプロセスがledger.dbを書き換えた場合は検知しない)
+        self._version += 1
+        for month_key in {(d.year, d.month) for d in dates}: self._month_versions[month_key] += 1
+    @property
+    def version(self) -> int: return self._version
+    def month_version(self, year: int, month: int) -> int: return self._month_versions.get((year, month), 0)
+
+    @staticmethod
+    def _row_to_transaction(row) -> Transaction:
+        tx_id, amount, category, transaction_date, type = row
+        return Transaction(amount, category, date.fromisoformat(transaction_date), type, id=tx_id)
+
+    @staticmethod
+    def _month_range(year: int, month: int) -> Tuple[str, str]:
+        start = date(year, month, 1); end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        return start.isoformat(), end.isoformat()
+
+    def _select(self, where: str = "", params: tuple = ()) -> List[Transaction]:
+        # 同じ日付内は登録順(rowid)に並べ、Ledgerの並び順と揃える
+        rows = self._conn.execute(f"SELECT {self._COLUMNS} FROM transactions {where} ORDER BY transaction_date DESC, rowid", params)
+        return [self._row_to_transaction(row) for row in rows]
+
+    # SQLite版は起動時に全件を読み込まないため、段階的な読み込みは発生しない
+    is_loading = False; load_progress = 1.0
+    def merge_pending_batches(self, max_batches: int = 4) -> bool: return False
+
+    def add_transaction(self, transaction: Transaction): self._insert_many([transaction]); self._notify(ChangeEvent.ADDED, [transaction.transaction_date], [transaction])
+    def add_transactions(self, transactions: List[Transaction], exclude: Callable = None) -> List[Transaction]:
+        """複数の取引を1回のトランザクションで追加し、追加した取引を返す。excludeはLedger.add_transactionsと同じ"""
+        if exclude is not None: transactions = exclude(transactions, self.get_transactions_for_day)
+        if not transactions: return []
+        self._insert_many(transactions); self._notify(ChangeEvent.ADDED, {tx.transaction_date for tx in transactions}, transactions)
+        return list(transactions)
+
+    def get(self, tx_id: str) -> Transaction:
+        rows = self._select("WHERE id = ?", (_uuid_bytes_to_str(tx_id) if isinstance(tx_id, bytes) else tx_id,)); return rows[0] if rows else None
+    def update(self, tx_id: str, **fields) -> Transaction:
+        old = self.get(tx_id)
+        if old is None: raise KeyError(tx_id)
+        unknown = set(fields) - {"amount", "category", "transaction_date", "type"}
+        if unknown: raise TypeError(f"変更できない項目です: {', '.join(sorted(unknown))}")
+        new = Transaction(**{"amount": old.amount, "category": old.category, "transaction_date": old.transaction_date, "type": old.type, **fields}, id=old.id)
+        with self._conn: self._conn.execute("UPDATE transactions SET amount = ?, category = ?, transaction_date = ?, type = ? WHERE id = ?", (new.amount, new.category, new.transaction_date.isoformat(), new.type, new.id))
+        self._bump_versions([old.transaction_date, new.transaction_date]); self._notify(ChangeEvent.UPDATED, {old.transaction_date, new.transaction_date}, [new])
+        return new
+    def delete(self, tx_id: str) -> Transaction:
+        tx = self.get(tx_id)
+        if tx is None: return None
+        with self._conn: self._conn.execute("DELETE FROM transactions WHERE id = ?", (tx.id,))
+        self._bump_versions([tx.transaction_date]); self._notify(ChangeEvent.DELETED, [tx.transaction_date], [tx])
+        return tx
+
+    def get_all_transactions(self) -> List[Transaction]: return self._select()
+    # 取引リストは月ごとの件数と、展開した月の取引だけを日付の範囲で問い合わせる(全件は読み込まない)
+    def get_transactions_between(self, start: date, end: date) -> List[Transaction]:
+        return self._select("WHERE transaction_date >= ? AND transaction_date <= ?", (start.isoformat(), end.isoformat()))
+    def count_transactions_between(self, start: date, end: date) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM transactions WHERE transaction_date >= ? AND transaction_date <= ?", (start.isoformat(), end.isoformat())).fetchone()[0]
+    def count_transactions_by_month(self) -> dict[Tuple[int, int], int]:
+        rows = self._conn.execute("SELECT substr(transaction_date, 1, 7) AS month, COUNT(*) FROM transactions GROUP BY month")
+        return {(int(month[:4]), int(month[5:7])): count for month, count in rows}
+
+    def _sum_for_month(self, year: int, month: int, type: str) -> int:
+        start, end = self._month_range(year, month)
+        row = self._conn.execute("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE type = ? AND transaction_date >= ? AND transaction_date < ?", (type, start, end)).fetchone()
+        return row[0]
+
+    def _category_summary_for_month(self, year: int, month: int, type: str) -> dict[str, int]:
+        start, end = self._month_range(year, month)
+        rows = self._conn.execute("""SELECT category, SUM(amount) AS total FROM transactions
+            WHERE type = ? AND transaction_date >= ? AND transaction_date < ?
+            GROUP BY category ORDER BY total DESC""", (type, start, end))
+        return dict(rows.fetchall())
+
+    def get_expense_summary_for_month(self, year: int, month: int) -> int: return self._sum_for_month(year, month, 'expense')
+    def get_income_summary_for_month(self, year: int, month: int) -> int: return self._sum_for_month(year, month, 'income')
+    def get_category_summary_for_month(self, year: int, month: int) -> dict[str, int]: return self._category_summary_for_month(year, month, 'expense')
+    def get_income_category_summary_for_month(self, year: int, month: int) -> dict[str, int]: return self._category_summary_for_month(year, month, 'income')
+    def get_transactions_for_day(self, target_date: date) -> List[Transaction]: return self._select("WHERE transaction_date = ?", (target_date.isoformat(),))
+
+    def prepare_monthly_summaries(self, start: date, end: date) -> Tuple[Callable, tuple]:
+        """Ledger.prepare_monthly_summariesと同じ。ワーカーではデータベースを別の接続で開いて集計する"""
+        months = _month_keys_between(start, end)
+        return _query_monthly_summaries, (str(self.filepath), months, self._month_range(*months[0])[0], self._month_range(*months[-1])[1])
+
+    def get_monthly_summaries(self, start: date, end: date) -> dict[Tuple[int, int], dict[str, dict[str, int]]]:
+        months = _month_keys_between(start, end)
+        return _monthly_summaries_from_rows(months, self._conn, self._month_range(*months[0])[0], self._month_range(*months[-1])[1])
+
+    def delete_transactions_for_day(self, target_date: date) -> int:
+        deleted = self.get_transactions_for_day(target_date)
+        with self._conn: deleted_count = self._conn.execute("DELETE FROM transactions WHERE transaction_date = ?", (target_date.isoformat(),)).rowcount
+        if deleted_count: self._bump_versions([target_date]); self._notify(ChangeEvent.DELETED, [target_date], deleted)
+        return deleted_count
+
+    def export_json(self, filepath: Path = None):
+        """従来のtransactions.json形式で全件を書き出す"""
+        _write_transactions_json(filepath or self.filepath.parent / "transactions.json", self.get_all_transactions(), indent=4, checksum=False)
+
+    def import_json(self, filepath: Path = None) -> int:
+        """transactions.json形式のファイルから、未登録のIDの取引だけを取り込む"""
+        before = self._conn.total_changes; transactions = _read_transactions_json(filepath or self.filepath.parent / "transactions.json")
+        self._insert_many(transactions); imported_count = self._conn.total_changes - before
+        # どの行が新規だったかは分からないので、ファイルに含まれていた日付をまとめて通知する
+        if imported_count: self._notify(ChangeEvent.ADDED, {tx.transaction_date for tx in transactions})
+        return imported_count
+
+    def close(self): self._conn.close()
+
+LEDGER_BACKENDS = {"journal": "ジャーナル (推奨)", "json": "JSON (チェックサム付き)", "sqlite": "SQLite"}
+
+def create_ledger(backend: str, streaming: bool = False, save_delay: float = 0.5):
+    """設定の"ledger_backend"に応じたLedger実装を生成する"""
+    if backend == "sqlite": return SqliteLedger()
+    if backend == "json":
+        filepath = Path.home() / ".simple_kakeibo" / "transactions.json"; filepath.parent.mkdir(parents=True, exist_ok=True)
+        return Ledger(JsonFileStorage(filepath, save_delay), streaming=streaming)
+    return Ledger(streaming=streaming)
+
+def migrate_ledger(source: str, target: str) -> int:
+    """
+    sourceの形式で保存されている全ての取引で、targetの形式の保存先を置き換え、移した件数を返す。
+    targetに以前の取引が残っていても、それは以前に切り替えたときより古い内容なので、上書きする(直前の内容は.bak1として残る)。
+    """
+    old = create_ledger(source); transactions = old.get_all_transactions(); old.close()
+    directory = Path.home() / ".simple_kakeibo"
+    if target == "sqlite":
+        new = SqliteLedger(); new.replace_all(transactions); new.close()
+    elif target == "json": JsonFileStorage(directory / "transactions.json").save(transactions)
+    else: JournalStorage(directory).save(transactions)
+    return len(transactions)
+
+def open_configured_ledger(settings: 'SettingsManager'):
+    """
+    設定の保存形式でLedgerを開く。前回の起動から保存形式が変わっていれば、先に前の形式の取引を新しい形式へ移す。
+    移せなければ前の形式のまま開き、設定も前の形式に戻す。
+    """
+    backend = settings.get("ledger_backend"); active = settings.get("ledger_backend_active") or backend
+    if active != backend:
+        try: count = migrate_ledger(active, backend); print(f"INFO: 取引{count:,}件を保存形式「{LEDGER_BACKENDS[active]}」から「{LEDGER_BACKENDS[backend]}」へ移しました")
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"WARN: 保存形式を切り替えられなかったため、「{LEDGER_BACKENDS[active]}」のまま開きます: {e}"); backend = active; settings.set("ledger_backend", backend)
+    if settings.get("ledger_backend_active") != backend: settings.set("ledger_backend_active", backend)
+    return create_ledger(backend, streaming=settings.get("streaming_load"), save_delay=settings.get("save_delay_ms") / 1000)
+
+# =============================================================================
+# ▼▼▼ 取引の一括取り込み (CSV / OFX) ▼▼▼
+# =============================================================================
+# ファイルは1行(1件)ずつ読み、IMPORT_BATCH_SIZE件ごとに検証してTransactionのバッチにする。parse_import_fileは
+# Tkに触れないのでTaskRunner.submit_io_streamでワーカーから実行し、バッチが届くたびにTkのスレッドで
+# TransactionImporterが重複を除いて台帳に追加する。ファイル全体の取引を一度にメモリに持つことはない。
+IMPORT_BATCH_SIZE = 5000; IMPORT_MAX_REPORTED_ERRORS = 1000
+# 同じ内容の行の出現回数や重複の照合用の状態は、直近に現れたこの日数分の日付についてだけ保持する
+IMPORT_WINDOW_DAYS = 62
+# CSVの見出し → 項目。見出しの前後の空白と大文字・小文字は無視する
+IMPORT_COLUMN_ALIASES = {
+    "date": ("日付", "取引日", "利用日", "date"),
+    "amount": ("金額", "amount"),                                  # 符号付き(負なら支出)
+    "deposit": ("入金", "入金額", "お預り金額", "deposit", "credit"),
+    "withdrawal": ("出金", "出金額", "お引出し金額", "利用金額", "支払金額", "withdrawal", "debit"),
+    "type": ("種別", "収支", "type"),
+    "category": ("カテゴリ", "費目", "category"),
+    "memo": ("メモ", "摘要", "内容", "備考", "memo", "description"),
+}
+# 取り込み元のカテゴリ名(家計簿アプリや銀行の分類) → このアプリのカテゴリ
+IMPORT_CATEGORY_ALIASES = {
+    "食料品": "食費", "外食": "食費", "食品": "食費", "food": "食費",
+    "電車": "交通費", "バス": "交通費", "タクシー": "交通費", "ガソリン": "交通費", "transport": "交通費",
+    "住居": "家賃", "住宅": "家賃", "rent": "家賃",
+    "趣味・娯楽": "娯楽", "趣味": "娯楽", "entertainment": "娯楽",
+    "日用雑貨": "日用品", "雑貨": "日用品",
+    "交際": "交際費",
+    "給料": "給与", "給与所得": "給与", "salary": "給与",
+    "ボーナス": "賞与", "bonus": "賞与",
+}
+# カテゴリがない行(OFXなど)は、摘要に含まれる語から推定する
+IMPORT_MEMO_KEYWORDS = (("給与", "給与"), ("給料", "給与"), ("賞与", "賞与"), ("家賃", "家賃"), ("JR", "交通費"), ("SUICA", "交通費"), ("PASMO", "交通費"),
+                        ("スーパー", "食費"), ("コンビニ", "食費"), ("セブン", "食費"), ("ローソン", "食費"), ("ファミリーマート", "食費"))
+IMPORT_TYPE_ALIASES = {"収入": "income", "入金": "income", "income": "income", "支出": "expense", "出金": "expense", "expense": "expense"}
+IMPORT_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d", "%Y年%m月%d日", "%Y.%m.%d")
+# 取り込んだ取引のIDは行の内容から決める。同じファイルを再度取り込んでも同じIDになるので、重複として除ける
+_IMPORT_ID_NAMESPACE = uuid.UUID("6c1f0d3e-5b7a-4f2e-9a51-2d8e4c7b9f10")
+
+class ImportReport:
+    """一括取り込みの結果。errorsは(行番号または件番号, 内容)で、先頭のIMPORT_MAX_REPORTED_ERRORS件だけを保持する"""
+    def __init__(self, filepath: Path, unit: str = "行目"):
+        self.filepath = filepath; self.unit = unit
+        self.rows = 0; self.imported = 0; self.duplicates = 0; self.error_count = 0
+        self.errors: List[Tuple[int, str]] = []
+
+    def add_error(self, position: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS: self.errors.append((position, message))
+
+    def summary(self, max_errors: int = 10) -> str:
+        lines = [f"{self.filepath.name}: {self.rows:,}件中 {self.imported:,}件を取り込みました(重複 {self.duplicates:,}件、エラー {self.error_count:,}件)"]
+        lines += [f"  {position}{self.unit}: {message}" for position, message in self.errors[:max_errors]]
+        if self.error_count > max_errors: lines.append(f"  ほか{self.error_count - max_errors:,}件")
+        return "\n".join(lines)
+
+def _detect_import_encoding(filepath: Path) -> str:
+    """UTF-8(BOM付きを含む)として読めなければ、国内の銀行・カード会社のCSVに多いShift_JIS(cp932)とみなす"""
+    with filepath.open('rb') as f: head = f.read(1 << 16)
+    try: codecs.getincrementaldecoder('utf-8')().decode(head, final=False); return 'utf-8-sig'
+    except UnicodeDecodeError: return 'cp932'
+
+def _iter_csv_import_rows(filepath: Path, encoding: str) -> Iterator[Tuple[int, dict]]:
+    """(行番号, {項目: 値})を1行ずつ返す。項目はIMPORT_COLUMN_ALIASESのキー"""
+    with filepath.open('r', encoding=encoding, errors='replace', newline='') as f:
+        reader = csv.reader(f); header = next(reader, None)
+        if header is None: return
+        aliases = {alias.lower(): field for field, names in IMPORT_COLUMN_ALIASES.items() for alias in names}
+        columns = [(index, aliases[name.strip().lower()]) for index, name in enumerate(header) if name.strip().lower() in aliases]
+        if not any(field == "date" for _, field in columns): raise ValueError(f"日付の列が見つかりません(見出し: {', '.join(header)})")
+        for row in reader:
+            if not any(cell.strip() for cell in row): continue
+            yield reader.line_num, {field: row[index].strip() for index, field in columns if index < len(row)}
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_OFX_FIELDS = {"DTPOSTED": "date", "TRNAMT": "amount", "NAME": "memo", "MEMO": "memo", "CATEGORY": "category"}
+
+def _iter_ofx_import_rows(filepath: Path, encoding: str) -> Iterator[Tuple[int, dict]]:
+    """OFX(SGML形式・XML形式の両方)の<STMTTRN>を1件ずつ(件番号, {項目: 値})として返す。ファイルは少しずつ読む"""
+    number, current, buffer = 0, None, ""
+    with filepath.open('r', encoding=encoding, errors='replace') as f:
+        while True:
+            chunk = f.read(1 << 16); buffer += chunk
+            # 最後の"<"以降はタグの途中かもしれないので、次の読み込みに回す
+            end = buffer.rfind("<") if chunk else len(buffer)
+            for closing, tag, value in _OFX_TAG.findall(buffer, 0, max(end, 0)):
+                tag = tag.upper(); value = value.strip()
+                if tag == "STMTTRN":
+                    if not closing: current = {}
+                    elif current is not None: number += 1; yield number, current; current = None
+                elif current is not None and not closing and value and tag in _OFX_FIELDS:
+                    field = _OFX_FIELDS[tag]; current[field] = f"{current[field]} {value}" if field == "memo" and field in current else value
+            buffer = buffer[max(end, 0):]
+            if not chunk: break
+
+@functools.lru_cache(maxsize=1 << 16)  # 日付の種類は多くても数万なので、ほぼ全ての行がキャッシュに当たる
+def _parse_import_date(text: str) -> date:
+    text = text.strip()
+    if len(text) >= 14 and text[:14].isdigit(): text = text[:8]  # OFXの日時(YYYYMMDDHHMMSS...)
+    for date_format in IMPORT_DATE_FORMATS:
+        try: return datetime.strptime(text, date_format).date()
+        except ValueError: continue
+    raise ValueError(f"日付を読み取れません: {text!r}")
+
+# 符号と数字と小数部だけを受け付ける。"1e5"のような指数表記や"Infinity"・"NaN"は、明細の金額としてはありえないので誤りとする
+_IMPORT_AMOUNT = re.compile(r"([+-]?\d+)(?:\.(\d+))?")
+
+def _parse_import_amount(text: str) -> int:
+    """"¥1,500"・"-1500"・"1500.00"などを整数の円に変換する(符号付き)"""
+    cleaned = text.replace(",", "").replace("¥", "").replace("￥", "").replace("円", "").replace(" ", "")
+    match = _IMPORT_AMOUNT.fullmatch(cleaned)
+    if match is None: raise ValueError(f"金額を読み取れません: {text!r}")
+    if match.group(2) and match.group(2).strip("0"): raise ValueError(f"金額は整数(円)で指定してください: {text!r}")
+    return int(match.group(1))
+
+def _nonzero_import_amount(text: str) -> int:
+    """入金・出金の欄の金額。空欄と0は金額がないものとしてNoneを返す"""
+    if not text: return None
+    return abs(_parse_import_amount(text)) or None
+
+def _map_import_category(source_category: str, type: str, memo: str) -> str:
+    categories = AddTransactionWindow.EXPENSE_CATEGORIES if type == 'expense' else AddTransactionWindow.INCOME_CATEGORIES
+    if source_category in categories: return source_category
+    mapped = IMPORT_CATEGORY_ALIASES.get(source_category) or IMPORT_CATEGORY_ALIASES.get(source_category.lower())
+    if mapped in categories: return mapped
+    upper_memo = memo.upper()
+    for keyword, category in IMPORT_MEMO_KEYWORDS:
+        if keyword in upper_memo and category in categories: return category
+    return "その他"
+
+def _import_transaction_id(name: str) -> bytes:
+    """uuid.uuid5(_IMPORT_ID_NAMESPACE, name)と同じ16バイト。大量の行で文字列との変換を省くため直接求める"""
+    digest = bytearray(hashlib.sha1(_IMPORT_ID_NAMESPACE.bytes + name.encode('utf-8')).digest()[:16])
+    digest[6] = (digest[6] & 0x0F) | 0x50; digest[8] = (digest[8] & 0x3F) | 0x80
+    return bytes(digest)
+
+def _is_import_transaction_id(id_bytes) -> bool:
+    """取り込みで付けたID(UUIDの版5)か。手入力の取引のIDはuuid4なので区別できる"""
+    return isinstance(id_bytes, bytes) and id_bytes[6] >> 4 == 5
+
+def _recent_day_state(states: OrderedDict, ordinal: int, factory: Callable):
+    """日付ごとの状態を返す(なければfactory()で作る)。直近に使ったIMPORT_WINDOW_DAYS日分だけを残す"""
+    state = states.get(ordinal)
+    if state is not None: states.move_to_end(ordinal); return state
+    state = states[ordinal] = factory()
+    if len(states) > IMPORT_WINDOW_DAYS: states.popitem(last=False)
+    return state
+
+def _import_row_to_transaction(row: dict, occurrences: OrderedDict) -> Transaction:
+    """1行分の値を検証してTransactionにする。不正な行はValueErrorを送出する"""
+    if not row.get("date"): raise ValueError("日付が空です")
+    transaction_date = _parse_import_date(row["date"])
+    deposit, withdrawal = _nonzero_import_amount(row.get("deposit", "")), _nonzero_import_amount(row.get("withdrawal", ""))
+    if deposit is not None and withdrawal is not None: raise ValueError("入金と出金の両方に金額があります")
+    if deposit is not None or withdrawal is not None: type, amount = ("income", deposit) if deposit is not None else ("expense", withdrawal)
+    elif row.get("amount"):
+        signed_amount = _parse_import_amount(row["amount"])
+        type = IMPORT_TYPE_ALIASES.get(row.get("type", "").lower()) or ("expense" if signed_amount < 0 else "income"); amount = abs(signed_amount)
+    else: raise ValueError("金額が空か0です")
+    source_category, memo = row.get("category", ""), row.get("memo", "")
+    # 同じ内容の行が複数あっても別の取引として扱えるよう、ファイル内で何番目に現れたかもIDに含める。
+    # 数えるのは直近IMPORT_WINDOW_DAYS日分の日付だけなので、日付順でないファイルで、数え終えた日付の同じ内容の行が
+    # 離れた位置に再び現れると、同じIDになり重複として除かれる(銀行・カード会社の明細は日付順なので通常は起きない)
+    ordinal = transaction_date.toordinal(); counts = _recent_day_state(occurrences, ordinal, dict)
+    key = (amount, type, source_category, memo); occurrence = counts.get(key, 0); counts[key] = occurrence + 1
+    tx_id = _import_transaction_id(f"{ordinal}|{amount}|{type}|{source_category}|{memo}|{occurrence}")
+    return Transaction(amount, _map_import_category(source_category, type, memo), transaction_date, type, id=tx_id)
+
+def parse_import_file(filepath: Path, emit: Callable[[List[Transaction]], None]) -> ImportReport:
+    """
+    CSVまたはOFXのファイルを読み、検証済みの取引をIMPORT_BATCH_SIZE件以下のバッチごとにemitへ渡し、
+    行数と行ごとのエラーをImportReportにまとめて返す。Tkにも台帳にも触れないので、
+    TaskRunner.submit_io_streamでワーカーから実行できる。重複の除去と件数の集計はTransactionImporterで行う。
+    """
+    encoding = _detect_import_encoding(filepath)
+    is_ofx = filepath.suffix.lower() in (".ofx", ".qfx")
+    report = ImportReport(filepath, unit="件目" if is_ofx else "行目"); occurrences = OrderedDict()
+    rows = (_iter_ofx_import_rows if is_ofx else _iter_csv_import_rows)(filepath, encoding)
+    while True:
+        batch = list(itertools.islice(rows, IMPORT_BATCH_SIZE))
+        if not batch: break
+        report.rows += len(batch); transactions = []
+        for position, row in batch:
+            try: transactions.append(_import_row_to_transaction(row, occurrences))
+            except ValueError as e: report.add_error(position, str(e))
+        if transactions: emit(transactions)
+    return report
+
+class TransactionImporter:
+    """
+    parse_import_fileが渡すバッチを、重複を除いて台帳に追加する(Tkのスレッドで呼ぶ)。次の取引を重複とみなす:
+      - 同じ日付に同じIDの取引がある(同じ明細を取り込み済み)
+      - 同じ日付・金額・種別・カテゴリの手入力の取引がある(1件の手入力は1件の取り込みとだけ対応させる)
+    取引にはメモがないので、手入力の取引との照合にメモは使わない。照合用の日付ごとの状態は
+    その日付が初めて現れたときに台帳から作り、直近IMPORT_WINDOW_DAYS日分だけを保持する。
+    """
+    def __init__(self, ledger):
+        self.ledger = ledger; self.imported = 0; self.duplicates = 0
+        self._days = OrderedDict()  # 日付の序数 -> (台帳にある取引のIDの集合, 未対応の手入力の取引の(金額, 種別, カテゴリ)ごとの件数)
+
+    def add_batch(self, transactions: List[Transaction]):
+        added = self.ledger.add_transactions(transactions, exclude=self._exclude_duplicates)
+        self.imported += len(added); self.duplicates += len(transactions) - len(added)
+
+    def _exclude_duplicates(self, transactions: List[Transaction], transactions_for_day: Callable[[date], List[Transaction]]) -> List[Transaction]:
+        result = []
+        for tx in transactions:
+            ids, manual = _recent_day_state(self._days, tx.date_ordinal, lambda: self._day_state(transactions_for_day(tx.transaction_date)))
+            if tx._id_bytes in ids: continue
+            key = (tx.amount, tx.type, tx.category)
+            if manual[key] > 0: manual[key] -= 1; continue
+            ids.add(tx._id_bytes); result.append(tx)
+        return result
+
+    @staticmethod
+    def _day_state(existing: List[Transaction]) -> Tuple[set, Counter]:
+        return {tx._id_bytes for tx in existing}, Counter((tx.amount, tx.type, tx.category) for tx in existing if not _is_import_transaction_id(tx._id_bytes))
+
+    def finish(self, report: ImportReport) -> ImportReport:
+        report.imported = self.imported; report.duplicates = self.duplicates; return report
+
+def import_file(ledger, filepath: Path) -> ImportReport:
+    """ファイルを読みながら、同じスレッドでバッチごとに台帳へ追加する(画面を持たない呼び出し元用)"""
+    importer = TransactionImporter(ledger); return importer.finish(parse_import_file(filepath, importer.add_batch))
 # =============================================================================
 
 # =============================================================================
@@ -221,26 +1774,97 @@ class TodoItem:
     @staticmethod
     def from_dict(data: dict): return TodoItem(id=data["id"], content=data["content"], due_date=date.fromisoformat(data["due_date"]), is_completed=data["is_completed"])
 
-class TodoManager:
-    def __init__(self, filename="todos.json"):
-        self.filepath = Path.home() / ".simple_kakeibo" / filename; self.filepath.parent.mkdir(parents=True, exist_ok=True)
-        self.todos: List[TodoItem] = self._load()
+def _todo_sort_key(todo: TodoItem) -> int: return -todo.due_date.toordinal()
+
+class TodoManager(ChangeNotifier):
+    def __init__(self, filename="todos.json", save_delay: float = 0.5):
+        self._listeners: List[Callable[[ChangeEvent], None]] = []
+        # 保存はバイナリスナップショット(todos.bin)に行い、JSONは取り込み・書き出し用の形式として残す
+        self.json_filepath = Path.home() / ".simple_kakeibo" / filename; self.json_filepath.parent.mkdir(parents=True, exist_ok=True)
+        self.filepath = self.json_filepath.with_suffix(".bin"); self._saver = WriteBehindSaver(lambda todos: _write_todo_snapshot(self.filepath, todos), save_delay)
+        self.todos = self._load()
+
+    # --- インデックス ---
+    # todos: 期日の降順のリスト(同じ期日の中は追加順)
+    # _by_id: ID -> Todo
+    # _uncompleted_by_date: 期日 -> その日の未完了のTodo(todosと同じ順序)
+    # _all_sorted: get_all_todosの結果。変更のたびに破棄する
+    @property
+    def todos(self) -> List[TodoItem]: return self._todos
+    @todos.setter
+    def todos(self, todos: List[TodoItem]): self._todos = todos; self._rebuild_indexes()
+
+    def _rebuild_indexes(self):
+        self._by_id: dict[str, TodoItem] = {}; self._uncompleted_by_date: dict[date, List[TodoItem]] = defaultdict(list); self._all_sorted = None
+        for todo in self._todos: self._index_add(todo)
+
+    def _index_add(self, todo: TodoItem):
+        self._by_id[todo.id] = todo; self._all_sorted = None
+        if not todo.is_completed: self._uncompleted_by_date[todo.due_date].append(todo)
+
+    def _reindex_day(self, due_date: date):
+        """その日の未完了のTodoを、todosの並び順で作り直す"""
+        uncompleted = [t for t in self.iter_todos_between(due_date, due_date) if not t.is_completed]
+        if uncompleted: self._uncompleted_by_date[due_date] = uncompleted
+        else: self._uncompleted_by_date.pop(due_date, None)
+        self._all_sorted = None
+    @_profiled
     def _load(self) -> List[TodoItem]:
-        try:
-            with self.filepath.open('r', encoding='utf-8') as f: return [TodoItem.from_dict(item) for item in json.load(f)]
-        except (FileNotFoundError, json.JSONDecodeError): return []
-    def _save(self):
-        with self.filepath.open('w', encoding='utf-8') as f: json.dump([item.to_dict() for item in self.todos], f, indent=4, ensure_ascii=False)
+        try: return sorted(_load_newest_valid(self.filepath, _read_todo_snapshot), key=lambda t: t.due_date, reverse=True)
+        except FileNotFoundError: pass
+        except ValueError: _quarantine_corrupt_file(self.filepath); return []
+        # 初回起動時は以前の版のtodos.jsonから移行する
+        todos = self._read_json(self.json_filepath)
+        if todos: _write_todo_snapshot(self.filepath, todos)
+        return todos
+    @staticmethod
+    def _read_json(filepath: Path) -> List[TodoItem]:
+        try: return sorted((TodoItem.from_dict(item) for item in _load_checksummed_json(filepath)), key=lambda t: t.due_date, reverse=True)
+        except (FileNotFoundError, ValueError): return []
+    @_profiled
+    def _save(self): self._saver.mark_dirty(list(self.todos))
+    def close(self): self._saver.flush()
+    def export_json(self, filepath: Path = None):
+        """従来のtodos.json形式で全件を書き出す"""
+        _atomic_write(filepath or self.json_filepath, json.dumps([item.to_dict() for item in self.todos], indent=4, ensure_ascii=False).encode('utf-8'), generations=0)
+    def import_json(self, filepath: Path = None) -> int:
+        """todos.json形式のファイルから、未登録のIDのTodoだけを取り込む"""
+        new_todos = [t for t in self._read_json(filepath or self.json_filepath) if t.id not in self._by_id]
+        if new_todos:
+            # _read_jsonの結果は期日の降順なので、1回の併合で既存の同じ期日のTodoの後ろに並べられる
+            self._todos[:] = list(heapq.merge(self._todos, new_todos, key=_todo_sort_key))
+            for todo in new_todos: self._index_add(todo)
+            self._save(); self._notify(ChangeEvent.ADDED, {t.due_date for t in new_todos}, new_todos)
+        return len(new_todos)
     def add_todo(self, content: str, due_date: date) -> TodoItem:
-        new_todo = TodoItem(content=content, due_date=due_date); self.todos.append(new_todo); self.todos.sort(key=lambda t: t.due_date, reverse=True); self._save(); return new_todo
-    def get_all_todos(self) -> List[TodoItem]: return sorted(self.todos, key=lambda t: (t.due_date, t.is_completed), reverse=False)
-    def get_uncompleted_todos_for_day(self, target_date: date) -> List[TodoItem]: return [t for t in self.todos if t.due_date == target_date and not t.is_completed]
+        new_todo = TodoItem(content=content, due_date=due_date); bisect.insort_right(self._todos, new_todo, key=_todo_sort_key); self._index_add(new_todo); self._save()
+        self._notify(ChangeEvent.ADDED, [due_date], [new_todo]); return new_todo
+    def get_todo(self, todo_id: str) -> TodoItem: return self._by_id.get(todo_id)
+    def get_all_todos(self) -> List[TodoItem]:
+        """期日の昇順(同じ期日では未完了が先)の全件。結果は次の変更まで使い回すので、呼び出し側で変更しないこと"""
+        if self._all_sorted is None: self._all_sorted = sorted(self._todos, key=lambda t: (t.due_date, t.is_completed), reverse=False)
+        return self._all_sorted
+    def get_todos_between(self, start: date, end: date) -> List[TodoItem]:
+        lo, hi = _desc_date_range(self.todos, start, end, _todo_sort_key); return self.todos[lo:hi]
+    def iter_todos_between(self, start: date, end: date) -> Iterator[TodoItem]:
+        lo, hi = _desc_date_range(self.todos, start, end, _todo_sort_key); return (self.todos[i] for i in range(lo, hi))
+    def get_uncompleted_todos_for_day(self, target_date: date) -> List[TodoItem]: return list(self._uncompleted_by_date.get(target_date, ()))
+    def get_uncompleted_todos_by_day(self, start: date, end: date) -> dict[date, List[TodoItem]]:
+        """start〜endの未完了のTodoを期日ごとにまとめて返す(カレンダーの1か月分を1回で取得する)。件数はlenで求める"""
+        result = defaultdict(list)
+        for todo in self.iter_todos_between(start, end):
+            if not todo.is_completed: result[todo.due_date].append(todo)
+        return result
     def update_todo_status(self, todo_id: str, is_completed: bool):
-        todo = next((t for t in self.todos if t.id == todo_id), None)
-        if todo: todo.is_completed = is_completed; self._save()
+        todo = self._by_id.get(todo_id)
+        if todo is None: return
+        todo.is_completed = is_completed; self._reindex_day(todo.due_date); self._save(); self._notify(ChangeEvent.TOGGLED, [todo.due_date], [todo])
     def delete_todo(self, todo_id: str):
-        initial_len = len(self.todos); self.todos = [t for t in self.todos if t.id != todo_id]
-        if len(self.todos) < initial_len: self._save()
+        todo = self._by_id.pop(todo_id, None)
+        if todo is None: return
+        lo, hi = _desc_date_range(self._todos, todo.due_date, todo.due_date, _todo_sort_key)
+        del self._todos[next(i for i in range(lo, hi) if self._todos[i] is todo)]
+        self._reindex_day(todo.due_date); self._save(); self._notify(ChangeEvent.DELETED, [todo.due_date], [todo])
 # =============================================================================
 
 
@@ -320,7 +1944,7 @@ class SettingsView(ttk.Frame):
         "パステルミント": "pastel_mint",
         "ソフトラベンダー": "soft_lavender",
     }
-    def __init__(self, parent: tk.Tk, settings_manager: SettingsManager, on_settings_change_callback: Callable):
+    def __init__(self, parent: tk.Tk, settings_manager: SettingsManager, on_settings_change_callback: Callable, on_import_callback: Callable = None):
         super().__init__(parent)
         self.settings_manager = settings_manager
         self.on_settings_change = on_settings_change_callback
@@ -348,6 +1972,22 @@ class SettingsView(ttk.Frame):
             
         self._create_color_settings_ui(self.scrollable_frame)
 
+        self.selected_backend = tk.StringVar(value=self.settings_manager.get("ledger_backend"))
+        backend_labelframe = ttk.LabelFrame(self.scrollable_frame, text="データの保存形式 (再起動後に反映)")
+        backend_labelframe.pack(fill=tk.X, pady=10)
+        for backend_key, name in LEDGER_BACKENDS.items():
+            ttk.Radiobutton(backend_labelframe, text=name, variable=self.selected_backend, value=backend_key, command=lambda: self.settings_manager.set("ledger_backend", self.selected_backend.get()), style="Theme.TRadiobutton").pack(anchor="w", padx=20, pady=2)
+        ttk.Label(backend_labelframe, text="切り替えると、次の起動時に現在の取引を新しい形式へ移します(移す先に残っていた以前の内容は.bak1として残します)。", wraplength=600).pack(anchor="w", padx=20, pady=2)
+        ttk.Label(backend_labelframe, text="JSON形式のtransactions.jsonは、破損を検出できるようチェックサム付きで保存します。以前の版の形式のファイルはそのまま読み込み、最初の保存で新しい形式に変換します。", wraplength=600).pack(anchor="w", padx=20, pady=2)
+
+        if on_import_callback:
+            import_labelframe = ttk.LabelFrame(self.scrollable_frame, text="取引の取り込み")
+            import_labelframe.pack(fill=tk.X, pady=10)
+            ttk.Label(import_labelframe, text="銀行・カード会社のCSVやOFXから、取引をまとめて追加します。取り込み済みの取引は重複して追加されません。", wraplength=600).pack(anchor="w", padx=20, pady=2)
+            ttk.Button(import_labelframe, text="ファイルを選んで取り込む…", command=on_import_callback).pack(anchor="w", padx=20, pady=5)
+
+        self._create_profiler_ui(self.scrollable_frame)
+
     def _on_mousewheel(self, event):
         if not (self.winfo_ismapped() and self.winfo_containing(event.x_root, event.y_root) == self.canvas):
             return
@@ -360,6 +2000,52 @@ class SettingsView(ttk.Frame):
             scroll_units = -1 if event.delta > 0 else 1
         self.canvas.yview_scroll(scroll_units, "units")
 
+    def _create_profiler_ui(self, parent_frame):
+        """計測の有効・無効、処理ごとの所要時間とウィジェット数の表示、trace形式での書き出し"""
+        profiler_labelframe = ttk.LabelFrame(parent_frame, text="パフォーマンス計測 (開発者向け)")
+        profiler_labelframe.pack(fill=tk.X, pady=10)
+        self.profiling_enabled = tk.BooleanVar(value=PROFILER.enabled)
+        ttk.Checkbutton(profiler_labelframe, text="計測を有効にする", variable=self.profiling_enabled, command=self._toggle_profiling).pack(anchor="w", padx=20, pady=2)
+        button_frame = ttk.Frame(profiler_labelframe); button_frame.pack(fill=tk.X, padx=20, pady=2)
+        ttk.Button(button_frame, text="リセット", command=lambda: (PROFILER.reset(), self._refresh_profiler_panel())).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Chrome trace形式で書き出す…", command=self._export_profiler_trace).pack(side=tk.LEFT, padx=5)
+        self.profiler_text = tk.Text(profiler_labelframe, height=18, font="TkFixedFont", wrap="none", state="disabled", relief="flat")
+        self.profiler_text.pack(fill=tk.X, padx=20, pady=(2, 5))
+        # 表示中の間だけ1秒ごとに更新する
+        self._profiler_job = None; self.profiler_text.bind("<Map>", lambda e: self._refresh_profiler_panel())
+
+    def _toggle_profiling(self):
+        enabled = self.profiling_enabled.get(); self.settings_manager.set("profiling_enabled", enabled)
+        if enabled: PROFILER.enable()
+        else: PROFILER.disable()
+        self._refresh_profiler_panel()
+
+    def _format_profiler_report(self) -> str:
+        # 見出しの全角文字は2桁分で表示されるので、その分だけ幅を詰める
+        lines = [f"{'処理':<42}{'回数':>6}{'合計ms':>8}{'平均ms':>7}{'p95ms':>9}{'最大ms':>7}"]
+        for name, histogram in PROFILER.summary()[:20]:
+            lines.append(f"{name[:44]:<44}{histogram.count:>8}{histogram.total * 1e3:>10.1f}{histogram.mean * 1e3:>9.2f}{histogram.percentile(0.95) * 1e3:>9.2f}{histogram.max * 1e3:>9.2f}")
+        created, destroyed = PROFILER.widgets_created, PROFILER.widgets_destroyed
+        lines.append(f"ウィジェット: 生成 {sum(created.values())}  破棄 {sum(destroyed.values())}  "
+                     + "  ".join(f"{name} +{count}/-{destroyed.get(name, 0)}" for name, count in sorted(created.items(), key=lambda item: -item[1])[:5]))
+        for name, stats in PROFILER.extra_stats().items():
+            lines.append(f"{name}: " + "  ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}" for key, value in stats.items()))
+        return "\n".join(lines)
+
+    def _refresh_profiler_panel(self):
+        if self._profiler_job: self.after_cancel(self._profiler_job); self._profiler_job = None
+        if not self.profiler_text.winfo_ismapped(): return
+        text = self._format_profiler_report() if PROFILER.enabled else f"計測は無効です。環境変数{PROFILE_ENV_VAR}=1で起動するか、上のチェックで有効にしてください。"
+        self.profiler_text.config(state="normal"); self.profiler_text.delete("1.0", tk.END); self.profiler_text.insert("1.0", text); self.profiler_text.config(state="disabled")
+        if PROFILER.enabled: self._profiler_job = self.after(1000, self._refresh_profiler_panel)
+
+    def _export_profiler_trace(self):
+        filepath = filedialog.asksaveasfilename(parent=self, title="計測結果の書き出し", defaultextension=".json", filetypes=[("Chrome trace", "*.json")],
+                                                initialfile=f"kakeibo-trace-{datetime.now():%Y%m%d-%H%M%S}.json")
+        if not filepath: return
+        try: PROFILER.export_chrome_trace(Path(filepath))
+        except OSError as e: messagebox.showerror("エラー", f"書き出しに失敗しました: {e}", parent=self)
+
     def _apply_theme(self):
         theme_key = self.selected_theme.get()
         self.settings_manager.set("app_theme", theme_key)
@@ -444,9 +2130,11 @@ class SettingsView(ttk.Frame):
 
 class AddTransactionWindow(tk.Toplevel):
     EXPENSE_CATEGORIES = ["食費", "交通費", "家賃", "娯楽", "日用品", "交際費", "その他"]; INCOME_CATEGORIES = ["給与", "賞与", "副業", "臨時収入", "その他"]
-    def __init__(self, parent: tk.Tk, ledger: Ledger, on_close_callback: Callable[[Transaction], None], initial_date: date = None):
-        super().__init__(parent); self.ledger = ledger; self.on_close_callback = on_close_callback; self.initial_date = initial_date if initial_date is not None else date.today()
-        self.title("取引の追加"); self.geometry("400x250"); self.resizable(False, False); self.transient(parent); self.grab_set(); self._create_widgets()
+    def __init__(self, parent: tk.Tk, ledger: Ledger, on_close_callback: Callable[[Transaction], None] = None, initial_date: date = None, transaction: Transaction = None):
+        # transactionを渡すと、その取引の編集(変更・削除)画面になる
+        super().__init__(parent); self.ledger = ledger; self.on_close_callback = on_close_callback; self.transaction = transaction
+        self.initial_date = transaction.transaction_date if transaction is not None else initial_date if initial_date is not None else date.today()
+        self.title("取引の編集" if transaction is not None else "取引の追加"); self.geometry("400x250"); self.resizable(False, False); self.transient(parent); self.grab_set(); self._create_widgets()
     
     def _create_widgets(self):
         main_frame = ttk.Frame(self, padding=(20, 10)); main_frame.pack(fill=tk.BOTH, expand=True); main_frame.columnconfigure(1, weight=1)
@@ -461,15 +2149,22 @@ class AddTransactionWindow(tk.Toplevel):
         income_btn = ttk.Radiobutton(type_frame, text="収入", variable=self.transaction_type, value="income", command=self._update_categories, style="Type.TRadiobutton")
         income_btn.pack(side=tk.LEFT, expand=True, fill=tk.X)
 
+        if self.transaction is not None: self.transaction_type.set(self.transaction.type)
         ttk.Label(main_frame, text="日付:").grid(row=1, column=0, sticky="w", pady=5)
-        date_display_label = ttk.Label(main_frame, text=self.initial_date.strftime('%Y-%m-%d'))
-        date_display_label.grid(row=1, column=1, sticky="ew", padx=5)
+        if self.transaction is not None:
+            self.date_entry = ttk.Entry(main_frame); self.date_entry.insert(0, self.initial_date.strftime('%Y-%m-%d')); self.date_entry.grid(row=1, column=1, sticky="ew", padx=5)
+        else:
+            date_display_label = ttk.Label(main_frame, text=self.initial_date.strftime('%Y-%m-%d'))
+            date_display_label.grid(row=1, column=1, sticky="ew", padx=5)
 
         ttk.Label(main_frame, text="金額:").grid(row=2, column=0, sticky="w", pady=5)
         self.amount_entry = ttk.Entry(main_frame); self.amount_entry.grid(row=2, column=1, sticky="ew", padx=5); self.amount_entry.focus_set()
         
         ttk.Label(main_frame, text="カテゴリ:").grid(row=3, column=0, sticky="w", pady=5)
         self.category_combobox = ttk.Combobox(main_frame, state="readonly"); self.category_combobox.grid(row=3, column=1, sticky="ew", padx=5); self._update_categories()
+        if self.transaction is not None:
+            self.amount_entry.insert(0, str(self.transaction.amount))
+            if self.transaction.category in self.category_combobox['values']: self.category_combobox.set(self.transaction.category)
         
         button_frame = ttk.Frame(main_frame); button_frame.grid(row=4, column=0, columnspan=2, pady=20)
         
@@ -485,24 +2180,38 @@ class AddTransactionWindow(tk.Toplevel):
                                 borderwidth=0,
                                 padx=20,
                                 pady=5)
-        save_button.pack()
+        save_button.pack(side=tk.LEFT)
+        if self.transaction is not None:
+            delete_button = ttk.Button(button_frame, text="削除", command=self._handle_delete); delete_button.pack(side=tk.LEFT, padx=(10, 0))
     
     def _update_categories(self):
         type_selected = self.transaction_type.get(); self.category_combobox['values'] = self.EXPENSE_CATEGORIES if type_selected == "expense" else self.INCOME_CATEGORIES; self.category_combobox.current(0)
     
     def _handle_save(self):
         try:
-            selected_date = self.initial_date
+            selected_date = datetime.strptime(self.date_entry.get(), '%Y-%m-%d').date() if self.transaction is not None else self.initial_date
             amount = int(self.amount_entry.get())
-            new_tx = Transaction(amount, self.category_combobox.get(), selected_date, self.transaction_type.get())
-            self.ledger.add_transaction(new_tx)
-            self.on_close_callback(new_tx)
+            if self.transaction is not None:
+                new_tx = self.ledger.update(self.transaction.id, amount=amount, category=self.category_combobox.get(), transaction_date=selected_date, type=self.transaction_type.get())
+            else:
+                new_tx = Transaction(amount, self.category_combobox.get(), selected_date, self.transaction_type.get())
+                self.ledger.add_transaction(new_tx)
+            if self.on_close_callback: self.on_close_callback(new_tx)
             self.destroy()
         except (ValueError, TypeError) as e: messagebox.showerror("入力エラー", str(e), parent=self)
+        except KeyError: messagebox.showerror("エラー", "この取引は既に削除されています。", parent=self); self.destroy()
+        except LedgerLoadError as e: messagebox.showerror("保存できません", str(e), parent=self)
         except Exception as e: messagebox.showerror("予期せぬエラー", f"エラーが発生しました: {e}", parent=self)
 
+    def _handle_delete(self):
+        if not messagebox.askyesno("削除の確認", "この取引を削除しますか？\nこの操作は元に戻せません。", parent=self): return
+        try: self.ledger.delete(self.transaction.id)
+        except LedgerLoadError as e: messagebox.showerror("削除できません", str(e), parent=self); return
+        if self.on_close_callback: self.on_close_callback(None)
+        self.destroy()
+
 class AddTodoWindow(tk.Toplevel):
-    def __init__(self, parent: tk.Tk, todo_manager: TodoManager, on_close_callback: Callable, initial_date: date = None):
+    def __init__(self, parent: tk.Tk, todo_manager: TodoManager, on_close_callback: Callable = None, initial_date: date = None):
         super().__init__(parent); self.todo_manager = todo_manager; self.on_close_callback = on_close_callback; self.initial_date = initial_date or date.today()
         self.title("Todoの追加"); self.geometry("400x180"); self.resizable(False, False); self.transient(parent); self.grab_set(); self._create_widgets()
     def _create_widgets(self):
@@ -531,22 +2240,31 @@ class AddTodoWindow(tk.Toplevel):
         try:
             target_date = datetime.strptime(self.date_entry.get(), '%Y-%m-%d').date(); content = self.content_entry.get()
             self.todo_manager.add_todo(content, target_date)
-            self.on_close_callback(); self.destroy()
+            if self.on_close_callback: self.on_close_callback()
+            self.destroy()
         except ValueError as e: messagebox.showerror("入力エラー", str(e), parent=self)
         except Exception as e: messagebox.showerror("予期せぬエラー", f"エラーが発生しました: {e}", parent=self)
 
 class ChartView(ttk.Frame):
+    """
+    円グラフの表示。アニメーションは扇形を一度だけ作って角度だけを更新し、軸の背景を保存してAggで部分描画(blit)する。
+    描き終えた画像は(年, 月, グラフ種別, 配色のハッシュ)ごとに保持し、同じ月を再表示するときはアニメーションせずに貼り戻す。
+    """
     BALANCE_COLORS = {"収入": "#4caf50", "支出": "#d62728"}; DEFAULT_COLOR = "#cccccc"
+    FRAME_CACHE_SIZE = 24
     def __init__(self, parent, chart_type: str, settings_manager: SettingsManager, **kwargs):
         super().__init__(parent, **kwargs)
-        self.settings_manager = settings_manager
-        self.chart_type = chart_type; self.font_family = plt.rcParams['font.family']; self.fig = Figure(figsize=(3.5, 4), dpi=100, constrained_layout=True); self.fig.patch.set_facecolor('#ffffff')
+        self.settings_manager = settings_manager; self.font_family = _load_matplotlib(settings_manager)
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.chart_type = chart_type; self.fig = Figure(figsize=(3.5, 4), dpi=100, constrained_layout=True); self.fig.patch.set_facecolor('#ffffff')
         self.ax = self.fig.add_subplot(111); self.canvas = FigureCanvasTkAgg(self.fig, master=self); self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True); self.last_rendered_period = None; self.anim_job = None; self.anim_params = {}
+        # キー: (年, 月, 種別, 配色のハッシュ) → (データと図の大きさ, 描画済みの画像)
+        self._frame_cache = OrderedDict(); self._displayed = None
     
+    @_profiled
     def update_chart(self, year: int, month: int, data: dict, balance_data: dict):
         if self.anim_job: self.after_cancel(self.anim_job); self.anim_job = None
-        self.anim_params = {}; self.ax.clear();
-        if self.fig.legends: self.fig.legends.clear()
         
         has_data = False
         summary_data, total_value, labels, colors = {}, 0, [], []
@@ -567,6 +2285,7 @@ class ChartView(ttk.Frame):
                 colors = [self.BALANCE_COLORS.get(label) for label in labels]
         
         if not has_data:
+            self._clear_axes(); self._displayed = None
             msg = f"{year}年{month}月の{ {'expense':'支出', 'income':'収入', 'balance':'取引'}[self.chart_type] }データはありません"
             self.ax.text(0.5, 0.5, msg, ha='center', va='center', fontfamily=self.font_family)
             self.ax.axis('off') 
@@ -574,9 +2293,31 @@ class ChartView(ttk.Frame):
             return
             
         self.last_rendered_period = (year, month)
+        params = {"data": summary_data, "colors": colors, "labels": labels, "total_value": total_value}
+        cache_key = (year, month, self.chart_type, hash(tuple(colors)))
+        signature = (tuple(summary_data.items()), total_value, tuple(self.fig.bbox.size), self.fig.get_facecolor(), self.ax.get_facecolor())
+        if self._displayed == (cache_key, signature): return
+        cached = self._frame_cache.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            # 描画済みの画像を貼り戻す。図の部品も最終状態に揃えておき、リサイズ時の再描画に備える
+            self._frame_cache.move_to_end(cache_key); self._clear_axes(); self._draw_final_details(**params)
+            self.canvas.restore_region(cached[1]); self.canvas.blit(self.fig.bbox); self._displayed = (cache_key, signature)
+            return
         self.total_frames = 30; self.animation_duration = 0.25; interval_ms = self.animation_duration / self.total_frames; 
-        self.anim_params = {"data": summary_data, "colors": colors, "labels": labels, "total_value": total_value, "current_frame": 0, "interval_ms": int(max(1, interval_ms * 1000))}
-        self._run_animation()
+        self.anim_params = dict(params, current_frame=0, interval_ms=int(max(1, interval_ms * 1000)), cache_key=cache_key, signature=signature)
+        self._start_animation(); self._run_animation()
+
+    def _clear_axes(self):
+        self.anim_params = {}; self.ax.clear()
+        if self.fig.legends: self.fig.legends.clear()
+
+    def _start_animation(self):
+        """扇形を最終的な大きさで一度だけ作り、角度を0にして背景だけを全体描画・保存する"""
+        params = self.anim_params; self._clear_axes(); self.anim_params = params; self.ax.axis('equal')
+        wedges, _ = self.ax.pie(list(params["data"].values()), startangle=90, counterclock=False, colors=params["colors"], wedgeprops=dict(width=0.4, edgecolor='w'))
+        params["wedges"] = wedges; params["final_thetas"] = [(w.theta1, w.theta2) for w in wedges]
+        for wedge in wedges: wedge.set_animated(True)
+        self.canvas.draw(); params["background"] = self.canvas.copy_from_bbox(self.ax.bbox)
 
     def _run_animation(self):
         params = self.anim_params; current_frame = params.get("current_frame", 0); self._animate(current_frame); params["current_frame"] = current_frame + 1
@@ -585,16 +2326,25 @@ class ChartView(ttk.Frame):
     def _ease_in_out(self, progress: float) -> float: return 0.5 * (1 - math.cos(progress * math.pi))
     
     def _animate(self, frame):
-        params = self.anim_params; data, colors = params.get("data", {}), params.get("colors", []);
-        if not data: return
-        progress = self._ease_in_out(frame / self.total_frames) if self.total_frames > 0 else 1.0; self.ax.clear(); self.ax.axis('equal'); sizes = list(data.values())
-        if not sizes: return
-        self.ax.pie([s * progress for s in sizes] + [sum(sizes) * (1 - progress)], startangle=90, counterclock=False, colors=colors + ['#00000000'], wedgeprops=dict(width=0.4, edgecolor='w'))
-        self.canvas.draw_idle()
-        if frame >= self.total_frames: self._draw_final_details(params.get("data"), params.get("colors"), params.get("labels"), params.get("total_value"))
+        params = self.anim_params
+        if not params.get("data"): return
+        if frame >= self.total_frames: self._finish_animation(); return
+        # 12時の位置から時計回りに、最終的な角度をprogressの割合まで広げる
+        progress = self._ease_in_out(frame / self.total_frames) if self.total_frames > 0 else 1.0
+        self.canvas.restore_region(params["background"])
+        for wedge, (theta1, theta2) in zip(params["wedges"], params["final_thetas"]):
+            wedge.set_theta1(90 - (90 - theta1) * progress); wedge.set_theta2(90 - (90 - theta2) * progress); self.ax.draw_artist(wedge)
+        self.canvas.blit(self.ax.bbox)
+
+    def _finish_animation(self):
+        params = self.anim_params; self._clear_axes()
+        self._draw_final_details(params["data"], params["colors"], params["labels"], params["total_value"]); self.canvas.draw()
+        self._frame_cache[params["cache_key"]] = (params["signature"], self.canvas.copy_from_bbox(self.fig.bbox)); self._frame_cache.move_to_end(params["cache_key"])
+        if len(self._frame_cache) > self.FRAME_CACHE_SIZE: self._frame_cache.popitem(last=False)
+        self._displayed = (params["cache_key"], params["signature"])
     
     def _draw_final_details(self, data, colors, labels, total_value):
-        self.ax.clear(); self.ax.axis('equal'); 
+        self.ax.axis('equal')
         if not data: return
         
         INCOME_COLOR = "#007aff"
@@ -617,12 +2367,68 @@ class ChartView(ttk.Frame):
         
         self.ax.text(0, 0, text, ha='center', va='center', size=12, weight='bold', color=color, fontfamily=self.font_family)
         if self.chart_type != 'balance': self.fig.legend(wedges, labels, loc="center right", bbox_to_anchor=(0.99, 0.5), prop={'family': self.font_family, 'size': 9})
-        self.canvas.draw_idle()
+
+class _TodoCardOrder:
+    """
+    TodoViewのカードの並び。キー (期日の序数, 完了済みか, 追加順の通し番号, ID) を昇順に保持するので、並びは get_all_todos と一致する。
+    ウィジェットを持たないので、画面がなくても並びの更新を確かめられる
+    """
+    def __init__(self): self.keys: List[tuple] = []; self._key_by_id: dict[str, tuple] = {}; self._next_seq = 0
+    def __len__(self) -> int: return len(self.keys)
+    def ids(self) -> List[str]: return [key[3] for key in self.keys]
+    def has_day(self, ordinal: int) -> bool:
+        index = bisect.bisect_left(self.keys, (ordinal,)); return index < len(self.keys) and self.keys[index][0] == ordinal
+
+    def reset(self, todos: List[TodoItem]):
+        """通し番号はTodoManagerの保持順(同じ期日の中は追加順)で振る。表示順(未完了が先)で振ると、完了を切り替えたときに追加順とずれる"""
+        self._key_by_id = {todo.id: (todo.due_date.toordinal(), todo.is_completed, seq, todo.id) for seq, todo in enumerate(todos)}
+        self.keys = sorted(self._key_by_id.values()); self._next_seq = len(todos)
+    def add(self, todo: TodoItem) -> Tuple[tuple, tuple, tuple]:
+        """追加されたTodoのキーを入れ、(キー, 直前のキー, 直後のキー) を返す"""
+        key = (todo.due_date.toordinal(), todo.is_completed, self._next_seq, todo.id); self._next_seq += 1; return self._insert(key)
+    def toggle(self, todo: TodoItem) -> Tuple[tuple, tuple, tuple]:
+        """完了の切り替えを反映する。位置が変わったら (キー, 直前のキー, 直後のキー)、変わらなければNoneを返す"""
+        key = self._key_by_id.get(todo.id)
+        if key is None or key[1] == todo.is_completed: return None
+        self._discard(key); return self._insert((key[0], todo.is_completed) + key[2:])
+    def remove(self, todo_id: str) -> tuple:
+        """キーを除いて返す(未登録ならNone)"""
+        key = self._key_by_id.pop(todo_id, None)
+        if key is not None: self._discard(key)
+        return key
+
+    def _insert(self, key: tuple) -> Tuple[tuple, tuple, tuple]:
+        index = bisect.bisect_left(self.keys, key); self.keys.insert(index, key); self._key_by_id[key[3]] = key
+        return key, (self.keys[index - 1] if index > 0 else None), (self.keys[index + 1] if index + 1 < len(self.keys) else None)
+    def _discard(self, key: tuple): del self.keys[bisect.bisect_left(self.keys, key)]
 
 class TodoView(ttk.Frame):
-    def __init__(self, parent, todo_manager: TodoManager, on_change_callback: Callable):
-        super().__init__(parent); self.todo_manager = todo_manager; self.on_change = on_change_callback; self.add_todo_window = None
-        self._create_widgets()
+    """
+    Todoの一覧。カードはTodoのIDごとに保持し、変更通知を受けたら追加・完了の切り替え・削除されたカードだけを差し替える。
+    並び順は get_all_todos と同じ(期日の昇順、同じ期日では未完了が先、その中は追加順)。
+    """
+    HEADER_PACK = {"fill": tk.X, "padx": 5, "pady": (8, 2)}; CARD_PACK = {"fill": tk.X, "padx": 10, "pady": 1}
+    def __init__(self, parent, todo_manager: TodoManager):
+        super().__init__(parent); self.todo_manager = todo_manager; self.add_todo_window = None
+        # カードの文字はこの2つのフォントを共有する(カードごとにフォントを作ると、Tkの名前付きフォントが解放されずに増え続ける)
+        family = font.nametofont("TkDefaultFont").cget("family")
+        self._card_fonts = {False: font.Font(family=family, size=10), True: font.Font(family=family, size=10, overstrike=True)}
+        # _cards: ID -> カード({"frame", "var", "label"})
+        # _order: カードの並び(_TodoCardOrder)
+        # _day_headers: 期日 -> 日付の見出し
+        self._cards: dict[str, dict] = {}; self._order = _TodoCardOrder(); self._day_headers: dict[date, ttk.Frame] = {}; self._empty_label = None
+        self._create_widgets(); self.todo_manager.subscribe(self._on_todos_changed)
+
+    def _on_todos_changed(self, event: ChangeEvent):
+        if event.kind == ChangeEvent.ADDED:
+            for todo in event.items:
+                if todo.id not in self._cards: self._insert_card(todo)
+        elif event.kind == ChangeEvent.TOGGLED:
+            for todo in event.items: self._move_card(todo)
+        elif event.kind == ChangeEvent.DELETED:
+            for todo in event.items: self._remove_card(todo.id)
+        else: self.update_list(); return
+        self._update_empty_label()
 
     def _create_widgets(self):
         header = ttk.Frame(self); header.pack(fill=tk.X, pady=(10, 15))
@@ -654,52 +2460,165 @@ class TodoView(ttk.Frame):
             self._bind_mousewheel_recursive(child)
 
     def update_list(self):
+        """一覧を全て作り直す(起動時や全件の読み直し時)。個々の変更は_on_todos_changedで差分だけを反映する"""
         for widget in self.list_frame.winfo_children(): widget.destroy()
-        all_todos = self.todo_manager.get_all_todos()
-        if not all_todos: ttk.Label(self.list_frame, text="タスクはありません", font=("", 10, "italic"), style="Content.TLabel").pack(pady=20); return
-        
-        grouped_by_day = defaultdict(list)
-        for todo in all_todos: grouped_by_day[todo.due_date].append(todo)
-        
-        for day, todos_in_day in sorted(grouped_by_day.items()):
-            self._create_day_header(day); [self._create_todo_card(todo) for todo in todos_in_day]
-        
+        self._cards.clear(); self._day_headers.clear(); self._empty_label = None
+        self._order.reset(self.todo_manager.todos); current_day = None
+        for key in self._order.keys:
+            todo = self.todo_manager.get_todo(key[3])
+            if todo.due_date != current_day: current_day = todo.due_date; self._day_headers[current_day] = self._create_day_header(current_day); self._day_headers[current_day].pack(**self.HEADER_PACK)
+            self._create_todo_card(todo)["frame"].pack(**self.CARD_PACK)
+        self._update_empty_label()
         self._bind_mousewheel_recursive(self.list_frame)
 
+    def _update_empty_label(self):
+        if self._cards and self._empty_label is not None: self._empty_label.destroy(); self._empty_label = None
+        elif not self._cards and self._empty_label is None:
+            self._empty_label = ttk.Label(self.list_frame, text="タスクはありません", font=("", 10, "italic"), style="Content.TLabel"); self._empty_label.pack(pady=20)
 
-    def _create_day_header(self, day: date):
+    def _create_day_header(self, day: date) -> ttk.Frame:
         day_header_frame = ttk.Frame(self.list_frame, padding=(0, 5), style="Header.TFrame")
-        day_header_frame.pack(fill=tk.X, padx=5, pady=(8, 2))
         ttk.Label(day_header_frame, text=f"{day.day}日 ({'月火水木金土日'[day.weekday()]})", font=("", 10, "bold"), style="Header.TLabel").pack(side=tk.LEFT)
-    def _create_todo_card(self, todo: TodoItem):
-        card_frame = ttk.Frame(self.list_frame, padding=5, style="Content.TFrame"); card_frame.pack(fill=tk.X, padx=10, pady=1); card_frame.columnconfigure(1, weight=1)
+        return day_header_frame
+    def _create_todo_card(self, todo: TodoItem) -> dict:
+        """カードを作って_cardsに登録する(並びへの登録と配置は呼び出し側で行う)"""
+        card_frame = ttk.Frame(self.list_frame, padding=5, style="Content.TFrame"); card_frame.columnconfigure(1, weight=1)
         check_var = tk.BooleanVar(value=todo.is_completed)
         check = ttk.Checkbutton(card_frame, variable=check_var, command=lambda: self._toggle_complete(todo.id, check_var), style="Content.TCheckbutton")
         check.grid(row=0, column=0)
-        
-        label_font = font.Font(family=font.nametofont("TkDefaultFont").cget("family"), size=10)
-        if todo.is_completed: label_font.configure(overstrike=True)
-        label = ttk.Label(card_frame, text=todo.content, font=label_font, style="Content.TLabel", anchor="w"); label.grid(row=0, column=1, sticky="ew", padx=5)
-        
+        label = ttk.Label(card_frame, text=todo.content, font=self._card_fonts[todo.is_completed], style="Content.TLabel", anchor="w"); label.grid(row=0, column=1, sticky="ew", padx=5)
         delete_button = ttk.Button(card_frame, text="🗑️", width=3, style="Toolbutton.TButton", command=lambda: self._handle_delete(todo.id)); delete_button.grid(row=0, column=2)
+        card = self._cards[todo.id] = {"frame": card_frame, "var": check_var, "label": label}
+        return card
+
+    def _place_card(self, card: dict, placed: Tuple[tuple, tuple, tuple]):
+        """_orderに入れた位置 (キー, 直前のキー, 直後のキー) に従い、前後のカード(同じ日がなければ日付の見出し)を基準にpackする"""
+        key, previous, following = placed; day = date.fromordinal(key[0])
+        if following is not None and following[0] == key[0]: card["frame"].pack(**self.CARD_PACK, before=self._cards[following[3]]["frame"]); return
+        if previous is not None and previous[0] == key[0]: card["frame"].pack(**self.CARD_PACK, after=self._cards[previous[3]]["frame"]); return
+        # その日の唯一のカード: 見出しがなければ次の日の見出しの前(なければ末尾)に作り、見出しの直後にカードを置く
+        header = self._day_headers.get(day)
+        if header is None:
+            header = self._day_headers[day] = self._create_day_header(day); self._bind_mousewheel_recursive(header)
+            if following is not None: header.pack(**self.HEADER_PACK, before=self._day_headers[date.fromordinal(following[0])])
+            else: header.pack(**self.HEADER_PACK)
+        card["frame"].pack(**self.CARD_PACK, after=header)
+
+    def _insert_card(self, todo: TodoItem):
+        card = self._create_todo_card(todo); self._bind_mousewheel_recursive(card["frame"]); self._place_card(card, self._order.add(todo))
+
+    def _move_card(self, todo: TodoItem):
+        """完了の切り替え: ウィジェットは作り直さず、フォントとチェックを合わせて同じ日の中で並べ替える"""
+        card = self._cards.get(todo.id)
+        if card is None: return
+        card["var"].set(todo.is_completed); card["label"].configure(font=self._card_fonts[todo.is_completed])
+        placed = self._order.toggle(todo)
+        if placed is None: return
+        card["frame"].pack_forget(); self._place_card(card, placed)
+
+    def _remove_card(self, todo_id: str):
+        card = self._cards.pop(todo_id, None)
+        if card is None: return
+        key = self._order.remove(todo_id); card["frame"].destroy()
+        if not self._order.has_day(key[0]): self._day_headers.pop(date.fromordinal(key[0])).destroy()
     def _toggle_complete(self, todo_id: str, var: tk.BooleanVar):
-        self.todo_manager.update_todo_status(todo_id, var.get()); self.update_list(); self.on_change()
+        self.todo_manager.update_todo_status(todo_id, var.get())
     def _handle_delete(self, todo_id: str):
         if messagebox.askyesno("削除の確認", "このタスクを削除しますか？", parent=self):
-            self.todo_manager.delete_todo(todo_id); self.update_list(); self.on_change()
+            self.todo_manager.delete_todo(todo_id)
     def _open_add_dialog(self):
         if self.add_todo_window is None or not self.add_todo_window.winfo_exists():
-            self.add_todo_window = AddTodoWindow(self, self.todo_manager, lambda: (self.update_list(), self.on_change()))
+            self.add_todo_window = AddTodoWindow(self, self.todo_manager)
         else: self.add_todo_window.lift()
 
+class _DayCell:
+    """カレンダーの1日分のウィジェット一式。月を切り替えても作り直さず、表示内容だけを差し替えて使い回す"""
+    def __init__(self, view: 'CalendarView', row: int, column: int):
+        self.date = None; self.model = None
+        self.frame = ttk.Frame(view.calendar_grid, style="CalendarDay.TFrame"); self.frame.grid(row=row, column=column, sticky="nsew", padx=1, pady=1)
+        self.frame.grid_propagate(False); self.frame.rowconfigure(1, weight=1); self.frame.columnconfigure(0, weight=1)
+        self.header_frame = ttk.Frame(self.frame, style="Content.TFrame"); self.header_frame.grid(row=0, column=0, sticky="ew")
+        self.content_frame = ttk.Frame(self.frame, style="Content.TFrame"); self.content_frame.grid(row=1, column=0, sticky="nsew"); self.content_frame.columnconfigure(0, weight=1)
+
+        self.date_canvas = tk.Canvas(self.header_frame, width=30, height=30, highlightthickness=0); self.date_canvas.pack(side=tk.LEFT, padx=4, pady=2)
+        self.today_oval = self.date_canvas.create_oval(2, 2, 28, 28, width=2, state=tk.HIDDEN)
+        self.date_text = self.date_canvas.create_text(15, 15, text="", font=("", 12), fill=CalendarView.DEFAULT_COLOR)
+        self.todo_label = ttk.Label(self.header_frame, foreground="#007aff", style="Content.TLabel"); self.todo_tooltip = Tooltip(self.todo_label, self._todo_tooltip_text)
+
+        # 表示しない行はgrid_removeで隠すだけにして、行の位置と並び順を保つ
+        self.category_frame = ttk.Frame(self.content_frame, style="Indicator.TFrame"); self.category_frame.columnconfigure(0, weight=1)
+        self.category_frame.grid(row=0, column=0, sticky="ew", padx=2, pady=(2, 0))
+        self.income_category_label = ttk.Label(self.category_frame, font=CalendarView.CATEGORY_FONT, foreground=CalendarView.INCOME_COLOR, anchor="center", background="white")
+        self.expense_category_label = ttk.Label(self.category_frame, font=CalendarView.CATEGORY_FONT, foreground=CalendarView.EXPENSE_COLOR, anchor="center", background="white")
+        self.income_category_label.grid(row=0, column=0, sticky="ew"); self.expense_category_label.grid(row=1, column=0, sticky="ew")
+        self.income_amount_label = ttk.Label(self.content_frame, foreground=CalendarView.INCOME_COLOR, font=CalendarView.AMOUNT_FONT, background="white", style="Indicator.TLabel")
+        self.expense_amount_label = ttk.Label(self.content_frame, foreground=CalendarView.EXPENSE_COLOR, font=CalendarView.AMOUNT_FONT, background="white", style="Indicator.TLabel")
+        self.income_amount_label.grid(row=1, column=0); self.expense_amount_label.grid(row=2, column=0)
+        self.indicator_label = ttk.Label(self.frame, text="▼", foreground="grey", font=("", 8), style="Content.TLabel")
+
+        # ツールチップとクリックはセルごとのバインドタグに一度だけ結び付け、セル内のウィジェットにはタグを付けるだけにする。
+        # ツールチップの文章はマウスを乗せたときに作り、その日のデータが変わるまで使い回す
+        self.view = view; tag = f"DayCell{id(self)}"; self.tooltip = Tooltip(self.frame, self._transaction_tooltip_text, tag=tag)
+        for widget in (self.header_frame, self.content_frame, self.date_canvas, self.indicator_label, self.category_frame,
+                       self.income_category_label, self.expense_category_label, self.income_amount_label, self.expense_amount_label):
+            self.tooltip.bind_widget(widget)
+        self.frame.bind_class(tag, "<Button-1>", lambda e: self.date and view.on_date_click_callback(self.date))
+        self.frame.grid_remove()
+
+    def _transaction_tooltip_text(self) -> str:
+        return self.view._format_tooltip_text(self.view.ledger.get_transactions_for_day(self.date)) if self.model and self.model[11] else ""
+
+    def _todo_tooltip_text(self) -> str:
+        return "【タスク一覧】\n" + "\n".join(f"・{t.content}" for t in self.model[5]) if self.model and self.model[5] else ""
+
+    def update(self, date_obj, model):
+        """前回と表示内容が同じなら何もしない。変わった部分だけウィジェットを設定し直す"""
+        self.date = date_obj
+        if model == self.model: return
+        # 隠したセルが次に別の日付で表示されたとき、前の日付のツールチップの文章を使い回さないよう捨てておく
+        if model is None: self.frame.grid_remove(); self.model = None; self.tooltip.invalidate(); self.todo_tooltip.invalidate(); return
+        old = self.model or (None,) * len(model); self.model = model
+        day, is_today, background, accent, todo_text, todos, income_category, expense_category, income_text, expense_text, was_truncated, tooltip_key = model
+        if old[0] is None: self.frame.grid()
+        if day != old[0]: self.date_canvas.itemconfigure(self.date_text, text=str(day))
+        if background != old[2]: self.date_canvas.configure(bg=background)
+        if (is_today, accent) != (old[1], old[3]): self.date_canvas.itemconfigure(self.today_oval, outline=accent, state=tk.NORMAL if is_today else tk.HIDDEN)
+        if todo_text != old[4]:
+            if todo_text: self.todo_label.config(text=todo_text); self.todo_label.pack(side=tk.LEFT, padx=(0, 2))
+            else: self.todo_label.pack_forget()
+        if todos != old[5]: self.todo_tooltip.invalidate()
+        for label, text, old_text in ((self.income_category_label, income_category, old[6]), (self.expense_category_label, expense_category, old[7]),
+                                      (self.income_amount_label, income_text, old[8]), (self.expense_amount_label, expense_text, old[9])):
+            if text == old_text: continue
+            if text: label.config(text=text); label.grid()
+            else: label.grid_remove()
+        if bool(income_category or expense_category) != bool(old[6] or old[7]) or old[0] is None:
+            if income_category or expense_category: self.category_frame.grid()
+            else: self.category_frame.grid_remove()
+        if was_truncated != old[10]:
+            if was_truncated: self.indicator_label.place(relx=1.0, rely=1.0, x=-2, y=-2, anchor="se")
+            else: self.indicator_label.place_forget()
+        if tooltip_key != old[11]: self.tooltip.invalidate()
+
 class CalendarView(ttk.Frame):
+    INCOME_COLOR = "#007aff"
+    EXPENSE_COLOR = "#d62728"
+    DEFAULT_COLOR = "#000000"
+    WEEKDAY_HEADER_BG = "#e8e8e8"
+    CATEGORY_FONT = ("", 9, "normal"); AMOUNT_FONT = ("", 10, "normal")
+    MEASURE_CACHE_SIZE = 4096
+
     def __init__(self, parent, *, style: ttk.Style, ledger: Ledger, todo_manager: TodoManager, on_date_click_callback: Callable[[date], None], on_month_change_callback: Callable[[date], None], **kwargs):
         super().__init__(parent, **kwargs)
         self.style = style
         self.ledger = ledger
         self.todo_manager = todo_manager
         self.on_date_click_callback = on_date_click_callback; self.on_month_change_callback = on_month_change_callback
-        self.current_date = date.today(); self._font_measurer_label = ttk.Label(self); self._create_widgets()
+        self.current_date = date.today(); self._day_cells: List[_DayCell] = []; self._create_widgets()
+        # 文字幅の計測結果((フォント, 文字列)→幅、LRU)と省略結果((文字列, フォント)→省略後)のキャッシュ。
+        # 省略結果はセル幅が、計測結果はフォントが変わったときだけ捨てる
+        self._measure_cache = OrderedDict(); self._truncation_cache = {}; self._cache_cell_width = None; self._cache_font_family = None
+        self.render_stats = {"measure_calls": 0, "measure_hits": 0, "truncation_hits": 0}
         # 【修正】初期化時の直接描画を削除。描画は親コンポーネントの準備ができてから呼び出される。
         # self.render_calendar() 
     
@@ -714,18 +2633,65 @@ class CalendarView(ttk.Frame):
         for i in range(1, 7): self.calendar_grid.rowconfigure(i, weight=1)
         for i in range(7): self.calendar_grid.columnconfigure(i, weight=1)
 
+        for i, day_name in enumerate(["日", "月", "火", "水", "木", "金", "土"]):
+            color = self.EXPENSE_COLOR if day_name == "日" else self.INCOME_COLOR if day_name == "土" else self.DEFAULT_COLOR
+            d_label_frame = ttk.Frame(self.calendar_grid, style="WeekdayHeader.TFrame"); d_label_frame.grid(row=0, column=i, sticky="nsew", padx=1, pady=1)
+            label = ttk.Label(d_label_frame, text=day_name, anchor="center", foreground=color, font=("", 9, "bold"), background=self.WEEKDAY_HEADER_BG)
+            label.pack(expand=True, fill="both", ipady=2)
+
+    def _measure(self, text: str, font_config: tuple) -> int:
+        key = (font_config, text); measured_width = self._measure_cache.get(key)
+        if measured_width is not None: self._measure_cache.move_to_end(key); self.render_stats["measure_hits"] += 1; return measured_width
+        measured_width = self.tk.getint(self.tk.call("font", "measure", font_config, text)); self.render_stats["measure_calls"] += 1
+        self._measure_cache[key] = measured_width
+        if len(self._measure_cache) > self.MEASURE_CACHE_SIZE: self._measure_cache.popitem(last=False)
+        return measured_width
+
     def _get_truncated_text(self, text: str, font_config: tuple, max_width: int) -> Tuple[str, bool]:
-        self._font_measurer_label.config(font=font_config)
-        measured_width = self._font_measurer_label.tk.call("font", "measure", self._font_measurer_label.cget("font"), text)
-        if measured_width <= max_width:
-            return text, False
-        for i in range(len(text) - 1, 0, -1):
-            truncated = text[:i] + "…";
-            measured_width = self._font_measurer_label.tk.call("font", "measure", self._font_measurer_label.cget("font"), truncated)
-            if measured_width <= max_width:
-                return truncated, True
-        return "…", True
-    
+        key = (text, font_config); cached = self._truncation_cache.get(key)
+        if cached is not None: self.render_stats["truncation_hits"] += 1; return cached
+        if self._measure(text, font_config) <= max_width: result = (text, False)
+        else:
+            # 文字を削るほど幅は狭くなるので、収まる最長の長さを二分探索する(0なら「…」のみ)
+            lo, hi = 0, len(text) - 1
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if self._measure(text[:mid] + "…", font_config) <= max_width: lo = mid
+                else: hi = mid - 1
+            result = (text[:lo] + "…", True)
+        if len(self._truncation_cache) >= self.MEASURE_CACHE_SIZE: self._truncation_cache.clear()
+        self._truncation_cache[key] = result; return result
+
+    def _build_day_model(self, date_obj: date, cell_width: float, background: str, accent: str, uncompleted_todos: List[TodoItem] = None) -> tuple:
+        """
+        1日分のセルの表示内容。_DayCell.updateはこの値を前回と比べ、変わった部分だけを描き直す。
+        ツールチップの文章は含めず、未完了のTodoの一覧と、取引の内容が変わると変わるキー(日付と月の版数)だけを持つ
+        """
+        todo_text = ""
+        if uncompleted_todos is None: uncompleted_todos = self.todo_manager.get_uncompleted_todos_for_day(date_obj)
+        if uncompleted_todos: todo_text = f"💬({len(uncompleted_todos)})"
+
+        income_category = expense_category = income_text = expense_text = ""; tooltip_key = None; was_truncated = False
+        day_transactions = self.ledger.get_transactions_for_day(date_obj)
+        if day_transactions:
+            income_by_cat = defaultdict(int); expense_by_cat = defaultdict(int)
+            for tx in day_transactions:
+                if tx.type == 'income': income_by_cat[tx.category] += tx.amount
+                else: expense_by_cat[tx.category] += tx.amount
+            texts = []
+            if income_by_cat: texts.append(self._get_truncated_text(max(income_by_cat, key=income_by_cat.get), self.CATEGORY_FONT, cell_width))
+            else: texts.append(("", False))
+            if expense_by_cat: texts.append(self._get_truncated_text(max(expense_by_cat, key=expense_by_cat.get), self.CATEGORY_FONT, cell_width))
+            else: texts.append(("", False))
+            income_total = sum(income_by_cat.values()); expense_total = sum(expense_by_cat.values())
+            texts.append(self._get_truncated_text(f"+{income_total:,}", self.AMOUNT_FONT, cell_width) if income_total > 0 else ("", False))
+            texts.append(self._get_truncated_text(f"-{expense_total:,}", self.AMOUNT_FONT, cell_width) if expense_total > 0 else ("", False))
+            (income_category, _), (expense_category, _), (income_text, _), (expense_text, _) = texts
+            was_truncated = any(truncated for _, truncated in texts); tooltip_key = (date_obj, self.ledger.month_version(date_obj.year, date_obj.month))
+        return (date_obj.day, date_obj == date.today(), background, accent, todo_text, uncompleted_todos or (),
+                income_category, expense_category, income_text, expense_text, was_truncated, tooltip_key)
+
+    @_profiled
     def render_calendar(self):
         # セルの横幅計算が、ウィジェットのサイズが確定してから行われるようにする
         if self.calendar_grid.winfo_width() <= 1:
@@ -733,96 +2699,31 @@ class CalendarView(ttk.Frame):
             self.after(50, self.render_calendar)
             return
 
-        for widget in self.calendar_grid.winfo_children(): widget.destroy()
         year, month = self.current_date.year, self.current_date.month; self.month_label.config(text=f"{year}年 {month}月")
-        weekdays = ["日", "月", "火", "水", "木", "金", "土"]
+        # 6週×7日のセルは最初の描画で一度だけ作り、以降は表示内容を差し替える
+        if not self._day_cells: self._day_cells = [_DayCell(self, week_index + 1, day_index) for week_index in range(6) for day_index in range(7)]
+
+        render_context = self._render_context()
+        month_days = calendar.monthcalendar(year, month); month_days += [[0] * 7] * (6 - len(month_days))
+        todos_by_day = self.todo_manager.get_uncompleted_todos_by_day(date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1]))
+        for cell, day in zip(self._day_cells, (day for week in month_days for day in week)):
+            if day == 0: cell.update(None, None); continue
+            date_obj = date(year, month, day); cell.update(date_obj, self._build_day_model(date_obj, *render_context, todos_by_day.get(date_obj, [])))
+
+    def _render_context(self) -> tuple:
+        cell_width = self.calendar_grid.winfo_width() / 7 - 10; font_family = font.nametofont("TkDefaultFont").cget("family")
+        for key in self.render_stats: self.render_stats[key] = 0
+        if font_family != self._cache_font_family: self._measure_cache.clear(); self._truncation_cache.clear(); self._cache_font_family = font_family
+        if cell_width != self._cache_cell_width: self._truncation_cache.clear(); self._cache_cell_width = cell_width
+        return (cell_width, self.style.lookup("Content.TFrame", "background"), self.style.lookup("Nav.TRadiobutton", "foreground", ("selected",)))
+
+    def refresh_dates(self, dates):
+        """指定した日付のうち、表示中の月に含まれるセルだけを描き直す"""
+        if not self._day_cells: return
+        render_context = self._render_context()
+        for cell in self._day_cells:
+            if cell.date in dates: cell.update(cell.date, self._build_day_model(cell.date, *render_context))
 
-        INCOME_COLOR = "#007aff"
-        EXPENSE_COLOR = "#d62728"
-        DEFAULT_COLOR = "#000000"
-        WEEKDAY_HEADER_BG = "#e8e8e8"
-
-        for i, day_name in enumerate(weekdays):
-            color = EXPENSE_COLOR if day_name == "日" else INCOME_COLOR if day_name == "土" else DEFAULT_COLOR
-            d_label_frame = ttk.Frame(self.calendar_grid, style="WeekdayHeader.TFrame"); d_label_frame.grid(row=0, column=i, sticky="nsew", padx=1, pady=1)
-            label = ttk.Label(d_label_frame, text=day_name, anchor="center", foreground=color, font=("", 9, "bold"), background=WEEKDAY_HEADER_BG)
-            label.pack(expand=True, fill="both", ipady=2)
-        
-        month_days = calendar.monthcalendar(year, month)
-        cell_width = self.calendar_grid.winfo_width() / 7 - 10
-        for week_index, week in enumerate(month_days):
-            for day_index, day in enumerate(week):
-                if day == 0: continue
-                date_obj = date(year, month, day)
-                day_cell = ttk.Frame(self.calendar_grid, style="CalendarDay.TFrame"); day_cell.grid(row=week_index + 1, column=day_index, sticky="nsew", padx=1, pady=1)
-                day_cell.grid_propagate(False); day_cell.rowconfigure(1, weight=1); day_cell.columnconfigure(0, weight=1)
-                header_frame = ttk.Frame(day_cell, style="Content.TFrame"); header_frame.grid(row=0, column=0, sticky="ew")
-                content_frame = ttk.Frame(day_cell, style="Content.TFrame"); content_frame.grid(row=1, column=0, sticky="nsew")
-
-                date_canvas = tk.Canvas(header_frame, width=30, height=30, highlightthickness=0)
-                date_canvas.configure(bg=self.style.lookup("Content.TFrame", "background"))
-                date_canvas.pack(side=tk.LEFT, padx=4, pady=2)
-                
-                if date_obj == date.today():
-                    accent_color = self.style.lookup("Nav.TRadiobutton", "foreground", ("selected",))
-                    date_canvas.create_oval(2, 2, 28, 28, outline=accent_color, width=2)
-
-                date_canvas.create_text(15, 15, text=str(day), font=("", 12), fill=DEFAULT_COLOR)
-                
-                uncompleted_todos = self.todo_manager.get_uncompleted_todos_for_day(date_obj)
-                if uncompleted_todos:
-                    num_todos = len(uncompleted_todos)
-                    task_display_text = f"💬({num_todos})"
-                    todo_icon_label = ttk.Label(header_frame, text=task_display_text, foreground="#007aff", style="Content.TLabel"); todo_icon_label.pack(side=tk.LEFT, padx=(0, 2))
-                    todo_tooltip_text = "【タスク一覧】\n" + "\n".join(f"・{t.content}" for t in uncompleted_todos)
-                    Tooltip(todo_icon_label, todo_tooltip_text)
-
-                day_transactions = self.ledger.get_transactions_for_day(date_obj)
-                if day_transactions:
-                    category_frame = ttk.Frame(content_frame, style="Indicator.TFrame"); category_frame.pack(fill=tk.X, padx=2, pady=(2, 0))
-                    income_by_cat = defaultdict(int); expense_by_cat = defaultdict(int)
-                    for tx in day_transactions:
-                        if tx.type == 'income': income_by_cat[tx.category] += tx.amount
-                        else: expense_by_cat[tx.category] += tx.amount
-                    
-                    was_truncated = False
-                    font_config_cat = ("", 9, "normal")
-                    if income_by_cat:
-                        display_name, truncated = self._get_truncated_text(max(income_by_cat, key=income_by_cat.get), font_config_cat, cell_width)
-                        ttk.Label(category_frame, text=display_name, font=font_config_cat, foreground=INCOME_COLOR, anchor="center", background="white").pack(fill=tk.X)
-                        if truncated: was_truncated = True
-                    if expense_by_cat:
-                        display_name, truncated = self._get_truncated_text(max(expense_by_cat, key=expense_by_cat.get), font_config_cat, cell_width)
-                        ttk.Label(category_frame, text=display_name, font=font_config_cat, foreground=EXPENSE_COLOR, anchor="center", background="white").pack(fill=tk.X)
-                        if truncated: was_truncated = True
-
-                    font_config_amount = ("", 10, "normal")
-                    income_total = sum(income_by_cat.values())
-                    expense_total = sum(expense_by_cat.values())
-                    
-                    if income_total > 0:
-                        text, truncated = self._get_truncated_text(f"+{income_total:,}", font_config_amount, cell_width)
-                        ttk.Label(content_frame, text=text, foreground=INCOME_COLOR, font=font_config_amount, background="white", style="Indicator.TLabel").pack()
-                        if truncated: was_truncated = True
-                    if expense_total > 0:
-                        text, truncated = self._get_truncated_text(f"-{expense_total:,}", font_config_amount, cell_width)
-                        ttk.Label(content_frame, text=text, foreground=EXPENSE_COLOR, font=font_config_amount, background="white", style="Indicator.TLabel").pack()
-                        if truncated: was_truncated = True
-
-                    if was_truncated:
-                        indicator_label = ttk.Label(day_cell, text="▼", foreground="grey", font=("", 8), style="Content.TLabel")
-                        indicator_label.place(relx=1.0, rely=1.0, x=-2, y=-2, anchor="se")
-
-                widgets_to_bind = [day_cell, header_frame, content_frame, date_canvas]
-                if 'indicator_label' in locals() and indicator_label.winfo_exists(): widgets_to_bind.append(indicator_label)
-                if 'category_frame' in locals() and category_frame.winfo_exists(): widgets_to_bind.extend([category_frame] + category_frame.winfo_children())
-                
-                if day_transactions:
-                    tooltip = Tooltip(day_cell, self._format_tooltip_text(day_transactions))
-                    for widget in widgets_to_bind: tooltip.bind_widget(widget); widget.bind("<Button-1>", lambda e, d=date_obj: self.on_date_click_callback(d))
-                else:
-                    for widget in widgets_to_bind: widget.bind("<Button-1>", lambda e, d=date_obj: self.on_date_click_callback(d))
-    
     def _format_tooltip_text(self, transactions: List[Transaction]) -> str:
         text_parts = []; income_txs = sorted([tx for tx in transactions if tx.type == 'income'], key=lambda t: t.amount, reverse=True); expense_txs = sorted([tx for tx in transactions if tx.type == 'expense'], key=lambda t: t.amount, reverse=True)
         if income_txs: text_parts.append("収入:"); [text_parts.append(f"  + {tx.category}: ¥{tx.amount:,}") for tx in income_txs]
@@ -833,14 +2734,210 @@ class CalendarView(ttk.Frame):
     def go_to_prev_month(self): self.current_date = self.current_date.replace(day=1) - timedelta(days=1); self.render_calendar(); self.on_month_change_callback(self.current_date)
     def go_to_next_month(self): _, last_day = calendar.monthrange(self.current_date.year, self.current_date.month); self.current_date = self.current_date.replace(day=last_day) + timedelta(days=1); self.render_calendar(); self.on_month_change_callback(self.current_date)
 
+class TransactionListView(ttk.Frame):
+    """
+    取引リストを1枚のCanvasに描く仮想リスト。月見出し・日見出し・取引カードを行として平らに並べ、
+    表示範囲に入っている行の分だけ図形を用意して使い回すので、取引が何件あってもウィジェットは増えない。
+    取引はsource(Ledger/SqliteLedger)から、月ごとの件数と、展開した月の分だけを日付の範囲で取得する。
+    """
+    ROW_HEIGHTS = {"month": 40, "day": 32, "tx": 44, "empty": 60}
+    INCOME_COLOR = "#007aff"
+    EXPENSE_COLOR = "#d62728"
+    MONTH_HEADER_BG = "#808080"
+    DELETE_HIT_WIDTH = 40
+
+    def __init__(self, parent, *, on_delete_day_callback: Callable[[date], None], on_transaction_click_callback: Callable[[Transaction], None] = None, source=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.on_delete_day_callback = on_delete_day_callback; self.on_transaction_click_callback = on_transaction_click_callback; self._source = source
+        # _month_counts: (年, 月) -> 件数、_month_transactions: 展開した月の取引(日付の降順)、_months: 取引のある月(新しい順)
+        self._month_counts: dict[Tuple[int, int], int] = {}; self._month_transactions: dict[Tuple[int, int], List[Transaction]] = {}
+        self._months: List[Tuple[int, int]] = []; self._expanded = None
+        self._rows: List[tuple] = []; self._offsets = [0]; self._slots: List[dict] = []
+        self.canvas = tk.Canvas(self, highlightthickness=0, background="#ffffff")
+        self._scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        # スクロールバー・ホイール・yview_movetoのどれで表示位置が変わっても、見えている行を描き直す
+        self.canvas.configure(yscrollcommand=self._on_canvas_scrolled)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5); self._scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.bind("<Configure>", lambda e: self._render_visible(force=True)); self.canvas.bind("<Button-1>", self._on_click)
+
+    def set_source(self, source): self._source = source; self.refresh()
+
+    def refresh(self, months=None):
+        """monthsの各(年, 月)の件数と取引を読み直す。Noneなら全ての月の件数を数え直す"""
+        if self._source is None: return
+        if months is None: self._month_counts = self._source.count_transactions_by_month(); self._month_transactions.clear()
+        else:
+            for month_key in months:
+                count = self._source.count_transactions_between(*_month_bounds(*month_key)); self._month_transactions.pop(month_key, None)
+                if count: self._month_counts[month_key] = count
+                else: self._month_counts.pop(month_key, None)
+        self._months = sorted(self._month_counts, reverse=True)
+        # 初回は最新の月だけを開く。以降は利用者が開閉した状態を保つ
+        if self._expanded is None and self._months: self._expanded = {self._months[0]}
+        self._rebuild_rows()
+
+    def _transactions_for_month(self, month_key: Tuple[int, int]) -> List[Transaction]:
+        transactions = self._month_transactions.get(month_key)
+        if transactions is None: transactions = self._month_transactions[month_key] = self._source.get_transactions_between(*_month_bounds(*month_key))
+        return transactions
+
+    def _rebuild_rows(self):
+        rows = []
+        for month_key in self._months:
+            rows.append(("month", month_key))
+            if month_key not in (self._expanded or ()): continue
+            current_ordinal = None
+            for tx in self._transactions_for_month(month_key):
+                if tx.date_ordinal != current_ordinal: current_ordinal = tx.date_ordinal; rows.append(("day", tx.transaction_date))
+                rows.append(("tx", tx))
+        if not rows: rows.append(("empty",))
+        self._rows = rows; offsets = [0]
+        for row in rows: offsets.append(offsets[-1] + self.ROW_HEIGHTS[row[0]])
+        self._offsets = offsets
+        self.canvas.configure(scrollregion=(0, 0, 1, offsets[-1])); self._render_visible(force=True)
+
+    def _on_canvas_scrolled(self, first, last): self._scrollbar.set(first, last); self._render_visible()
+
+    def _new_slot(self) -> dict:
+        return {"bg": self.canvas.create_rectangle(0, 0, 0, 0, width=0), "left": self.canvas.create_text(0, 0, anchor="w"),
+                "right": self.canvas.create_text(0, 0, anchor="e"), "shown": None}
+
+    def _render_visible(self, force: bool = False):
+        """表示範囲に入っている行だけを、使い回しの図形に割り当てて描く"""
+        top = self.canvas.canvasy(0); bottom = top + self.canvas.winfo_height(); width = self.canvas.winfo_width()
+        first = max(bisect.bisect_right(self._offsets, top) - 1, 0); last = min(bisect.bisect_left(self._offsets, bottom), len(self._rows))
+        while len(self._slots) < last - first: self._slots.append(self._new_slot())
+        family = font.nametofont("TkDefaultFont").cget("family")
+        for slot, row_index in zip(self._slots, range(first, last)):
+            row = self._rows[row_index]; shown = (row, self._offsets[row_index], width)
+            if not force and slot["shown"] == shown: continue
+            self._draw_row(slot, row, self._offsets[row_index], width, family); slot["shown"] = shown
+        for slot in self._slots[last - first:]:
+            if slot["shown"] is not None:
+                for key in ("bg", "left", "right"): self.canvas.itemconfigure(slot[key], state=tk.HIDDEN)
+                slot["shown"] = None
+
+    def _draw_row(self, slot: dict, row: tuple, y: int, width: int, family: str):
+        height = self.ROW_HEIGHTS[row[0]]; kind = row[0]
+        bg, left, right = slot["bg"], slot["left"], slot["right"]
+        if kind == "month":
+            year, month = row[1]; marker = "▼" if row[1] in self._expanded else "▶"
+            self.canvas.coords(bg, 5, y + 9, width - 5, y + height - 1); self.canvas.itemconfigure(bg, fill=self.MONTH_HEADER_BG, state=tk.NORMAL)
+            self.canvas.coords(left, 15, y + 5 + height / 2); self.canvas.itemconfigure(left, text=f"{marker} {year}年 {month}月", font=(family, 12, "bold"), fill="#ffffff", state=tk.NORMAL)
+            self.canvas.itemconfigure(right, state=tk.HIDDEN)
+        elif kind == "day":
+            day = row[1]
+            self.canvas.itemconfigure(bg, state=tk.HIDDEN)
+            self.canvas.coords(left, 20, y + height / 2); self.canvas.itemconfigure(left, text=f"{day.day}日 ({'月火水木金土日'[day.weekday()]})", font=(family, 10, "bold"), fill="#000000", state=tk.NORMAL)
+            self.canvas.coords(right, width - 10, y + height / 2); self.canvas.itemconfigure(right, text="🗑️", font=(family, 10), fill="#000000", state=tk.NORMAL)
+        elif kind == "tx":
+            tx = row[1]; amount_color = self.INCOME_COLOR if tx.type == 'income' else self.EXPENSE_COLOR
+            self.canvas.itemconfigure(bg, state=tk.HIDDEN)
+            self.canvas.coords(left, 30, y + height / 2); self.canvas.itemconfigure(left, text=tx.category, font=(family, 13, "bold"), fill="#000000", state=tk.NORMAL)
+            self.canvas.coords(right, width - 15, y + height / 2); self.canvas.itemconfigure(right, text=tx.to_card_data()["amount_str"], font=(family, 13, "bold"), fill=amount_color, state=tk.NORMAL)
+        else:
+            self.canvas.itemconfigure(bg, state=tk.HIDDEN); self.canvas.itemconfigure(right, state=tk.HIDDEN)
+            self.canvas.coords(left, width / 2, y + height / 2); self.canvas.itemconfigure(left, text="取引履歴がありません", font=(family, 10, "italic"), fill="#000000", anchor="center", state=tk.NORMAL)
+            return
+        self.canvas.itemconfigure(left, anchor="w")
+
+    def _on_click(self, event):
+        y = self.canvas.canvasy(event.y); row_index = bisect.bisect_right(self._offsets, y) - 1
+        if not 0 <= row_index < len(self._rows): return
+        kind = self._rows[row_index][0]
+        if kind == "month":
+            month_key = self._rows[row_index][1]
+            # 閉じた月の取引は手放し、次に開いたときに取得し直す
+            if month_key in self._expanded: self._expanded.discard(month_key); self._month_transactions.pop(month_key, None)
+            else: self._expanded.add(month_key)
+            self._rebuild_rows()
+        elif kind == "day" and event.x >= self.canvas.winfo_width() - self.DELETE_HIT_WIDTH:
+            self.on_delete_day_callback(self._rows[row_index][1])
+        elif kind == "tx" and self.on_transaction_click_callback:
+            self.on_transaction_click_callback(self._rows[row_index][1])
+
+class ChartDataCache:
+    """
+    月ごとのグラフ用集計(支出・収入のカテゴリ別、収支)のLRUキャッシュ。
+    各項目には集計時のLedger.month_versionを記録し、版数が変わった月は次の取得時に集計し直す。
+    """
+    def __init__(self, ledger: Ledger, max_entries: int = 36):
+        self.ledger = ledger; self.max_entries = max_entries; self._entries = OrderedDict(); self._prefetch_future = None
+        self.hits = self.misses = self.evictions = self.prefetches = 0
+
+    PREFETCH_MONTHS = 12  # 先読みする期間(表示中の月の前6か月〜後5か月)。月別集計インデックスの写しを作るだけなので、Tkのスレッドの負担は小さい
+
+    @staticmethod
+    def _chart_data(summary: dict) -> dict:
+        """get_monthly_summariesの1か月分から、グラフ用の集計(支出・収入のカテゴリ別、収支)を作る"""
+        return {'expense': summary['expense'], 'income': summary['income'], 'balance': {'収入': sum(summary['income'].values()), '支出': sum(summary['expense'].values())}}
+
+    def _compute(self, year: int, month: int) -> dict:
+        first = date(year, month, 1); return self._chart_data(self.ledger.get_monthly_summaries(first, first)[(year, month)])
+
+    def _lookup(self, year: int, month: int):
+        key = (year, month); version = self.ledger.month_version(year, month); entry = self._entries.get(key)
+        if entry is not None and entry[0] == version: self._entries.move_to_end(key); return entry[1], version
+        return None, version
+
+    def _store(self, year: int, month: int, version: int, data: dict):
+        self._entries[(year, month)] = (version, data); self._entries.move_to_end((year, month))
+        while len(self._entries) > self.max_entries: self._entries.popitem(last=False); self.evictions += 1
+
+    def get(self, year: int, month: int) -> dict:
+        data, version = self._lookup(year, month)
+        if data is not None: self.hits += 1; return data
+        self.misses += 1; data = self._compute(year, month); self._store(year, month, version, data); return data
+
+    def prefetch_window(self, center: date) -> Tuple[date, date]:
+        first = _month_index(center) - self.PREFETCH_MONTHS // 2
+        return _month_start(first), _month_start(first + self.PREFETCH_MONTHS - 1)
+
+    def prefetch(self, center: date, task_runner: 'TaskRunner' = None):
+        """
+        centerの前後の月のうち、まだ有効な項目がない月をまとめて集計しておく。ヒット・ミスの統計には数えない。
+        task_runnerを渡すと、Tkのスレッドでは集計する行の切り出し(prepare_monthly_summaries)だけを行い、集計はsubmit_cpuのワーカーで行う。
+        """
+        start, end = self.prefetch_window(center)
+        versions = {}
+        for month_key in _month_keys_between(start, end):
+            data, version = self._lookup(*month_key)
+            if data is None: versions[month_key] = version
+        if not versions: return
+        func, args = self.ledger.prepare_monthly_summaries(start, end)
+        if task_runner is None: self._store_prefetched(versions, func(*args)); return
+        # 前の月へ続けて移動したときは、まだ始まっていない先読みを取り消して新しい範囲だけを集計する
+        if self._prefetch_future is not None: self._prefetch_future.cancel()
+        self._prefetch_future = task_runner.submit_cpu(func, *args, on_done=lambda summaries: self._store_prefetched(versions, summaries))
+
+    def _store_prefetched(self, versions: dict, summaries: dict):
+        for (year, month), version in versions.items():
+            # 集計している間にその月の取引が変わっていれば、結果は古いので捨てる(次に表示するときに集計し直す)
+            if self.ledger.month_version(year, month) != version: continue
+            self._store(year, month, version, self._chart_data(summaries[(year, month)])); self.prefetches += 1
+
+    def clear(self): self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions, "prefetches": self.prefetches}
+
 class HouseholdAppGUI:
     def __init__(self, root: tk.Tk, ledger: Ledger):
         self.root = root; self.ledger = ledger
-        self.todo_manager = TodoManager()
-        self.add_window = None; self.settings_manager = SettingsManager()
+        self.settings_manager = SettingsManager()
+        self.todo_manager = TodoManager(save_delay=self.settings_manager.get("save_delay_ms") / 1000)
+        self.ledger.subscribe(self._on_ledger_changed); self.todo_manager.subscribe(self._on_todos_changed)
+        self.add_window = None
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         self.root.title("シンプル家計簿ダッシュボード"); self.root.geometry("1280x720"); self.root.resizable(True, True)
-        self.default_font = font.nametofont("TkDefaultFont"); self.default_font.configure(family=plt.rcParams['font.family'], size=10)
-        self.displayed_date_for_charts = date.today(); self._chart_data_cache = {}
+        self.default_font = font.nametofont("TkDefaultFont"); self.default_font.configure(family=_tk_font_family(self.root, self.settings_manager), size=10)
+        self.displayed_date_for_charts = date.today(); self.chart_data_cache = ChartDataCache(self.ledger); self._prefetch_job = None
+        self.task_runner = TaskRunner(self.root, cpu_workers=self.settings_manager.get("process_pool_workers")); self._chart_warmup = None
+        if self.settings_manager.get("profiling_enabled"): PROFILER.enable()
+        PROFILER.register_stats("ChartDataCache", lambda: self.chart_data_cache.stats)
 
         self.current_view = tk.StringVar(value="dashboard")
         self.current_view.trace_add("write", self._on_view_change)
@@ -862,8 +2959,25 @@ class HouseholdAppGUI:
     # 【修正】初回読み込み用のメソッドを新設
     def initial_load(self):
         """UIの初回更新処理。ウィンドウサイズ確定後に呼び出す。"""
-        self.update_ui()
-        self._on_view_change()
+        # グラフ以外を先に描き、グラフ(matplotlibの読み込みを含む)は_on_view_changeが少し後に描く
+        self._update_summary(); self._update_transaction_list(); self.full_todo_view.update_list(); self.calendar_view.render_calendar()
+        self.task_runner.submit_io(_import_numpy); self._on_view_change()
+        if self.ledger.is_loading: self.root.after(50, self._poll_ledger_loading)
+        elif self.ledger.load_error is not None: self._show_ledger_load_error()
+
+    def _poll_ledger_loading(self):
+        """バックグラウンドで読み込み中の取引を少しずつ取り込み、進捗を取引リストの見出しに表示する"""
+        if self.ledger.merge_pending_batches():
+            self.list_frame_container.config(text=f"取引リスト (読み込み中… {self.ledger.load_progress:.0%})")
+            self.root.after(50, self._poll_ledger_loading)
+        else:
+            self.list_frame_container.config(text="取引リスト"); self.update_ui()
+            if self.ledger.load_error is not None: self._show_ledger_load_error()
+
+    def _show_ledger_load_error(self):
+        self.list_frame_container.config(text="取引リスト (読み取り専用)")
+        messagebox.showerror("取引データの読み込み", f"取引データの一部を読み込めませんでした。\n{self.ledger.load_error}\n\n"
+                             "データを保護するため、取引の追加・変更・削除はできません。アプリを終了し、データのファイルを確認してください。", parent=self.root)
 
     def _create_widgets(self):
         nav_bar = ttk.Frame(self.root, style="Nav.TFrame")
@@ -926,42 +3040,31 @@ class HouseholdAppGUI:
             btn.grid(row=0, column=col, sticky="ew", padx=2)
             col += 1
 
-        charts_frame = ttk.Frame(chart_container, style="WhiteBG.TFrame")
-        charts_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        self.chart_view_expense = ChartView(charts_frame, chart_type='expense', settings_manager=self.settings_manager, style="WhiteBG.TFrame")
-        self.chart_view_income = ChartView(charts_frame, chart_type='income', settings_manager=self.settings_manager, style="WhiteBG.TFrame")
-        self.chart_view_balance = ChartView(charts_frame, chart_type='balance', settings_manager=self.settings_manager, style="WhiteBG.TFrame")
-        for cv in [self.chart_view_expense, self.chart_view_income, self.chart_view_balance]:
-            cv.fig.patch.set_facecolor("#ffffff")
-            cv.ax.set_facecolor("#ffffff")
+        # グラフ(matplotlib)は初めて表示するときに作る。それまでは枠だけを用意しておく
+        self.charts_frame = ttk.Frame(chart_container, style="WhiteBG.TFrame")
+        self.charts_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self._chart_views: dict[str, ChartView] = {}; self._chart_bg = "#ffffff"
         
-        list_frame_container = ttk.Labelframe(left_pane, text="取引リスト")
+        list_frame_container = ttk.Labelframe(left_pane, text="取引リスト"); self.list_frame_container = list_frame_container
         list_frame_container.grid(row=1, column=0, sticky="nsew", pady=(5, 0))
-        self.list_canvas = tk.Canvas(list_frame_container, highlightthickness=0, background="#ffffff")
-        scrollbar_tx = ttk.Scrollbar(list_frame_container, orient="vertical", command=self.list_canvas.yview)
-        self.list_frame = ttk.Frame(self.list_canvas, style="WhiteBG.TFrame")
-        self.list_frame.bind("<Configure>", lambda e: self.list_canvas.configure(scrollregion=self.list_canvas.bbox("all")))
-        self.list_canvas.create_window((0, 0), window=self.list_frame, anchor="nw")
-        self.list_canvas.configure(yscrollcommand=scrollbar_tx.set)
-        self.list_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-        scrollbar_tx.pack(side=tk.RIGHT, fill=tk.Y)
+        self.transaction_list = TransactionListView(list_frame_container, on_delete_day_callback=self._handle_delete_day, on_transaction_click_callback=self._open_edit_transaction_window, source=self.ledger, style="WhiteBG.TFrame")
+        self.transaction_list.pack(fill=tk.BOTH, expand=True); self.list_canvas = self.transaction_list.canvas
         
         self.list_canvas.bind_all("<MouseWheel>", self._on_tx_list_mousewheel, add="+")
-        self.list_frame.bind_all("<MouseWheel>", self._on_tx_list_mousewheel, add="+")
 
         right_pane = ttk.Frame(self.dashboard_frame)
         right_pane.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
         self.calendar_view = CalendarView(right_pane, style=self.style, ledger=self.ledger, todo_manager=self.todo_manager, on_date_click_callback=self._on_date_selected_from_calendar, on_month_change_callback=self._on_calendar_month_changed)
         self.calendar_view.pack(fill=tk.BOTH, expand=True)
+        PROFILER.register_stats("CalendarView", lambda: dict(self.calendar_view.render_stats))
 
         self.todo_frame = ttk.Frame(self.main_content_frame)
         todo_list_container = ttk.Frame(self.todo_frame)
         todo_list_container.pack(fill=tk.BOTH, expand=True)
-        self.full_todo_view = TodoView(todo_list_container, self.todo_manager, self._on_todo_change)
+        self.full_todo_view = TodoView(todo_list_container, self.todo_manager)
         self.full_todo_view.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.settings_frame = SettingsView(self.main_content_frame, self.settings_manager, self._on_settings_changed)
+        self.settings_frame = SettingsView(self.main_content_frame, self.settings_manager, self._on_settings_changed, on_import_callback=self._import_transactions)
 
     def _on_tx_list_mousewheel(self, event):
         if not (self.list_canvas.winfo_ismapped() and self.list_canvas.winfo_containing(event.x_root, event.y_root) == self.list_canvas):
@@ -975,12 +3078,6 @@ class HouseholdAppGUI:
             scroll_units = -1 if event.delta > 0 else 1
         self.list_canvas.yview_scroll(scroll_units, "units")
 
-    def _bind_tx_list_mousewheel_recursive(self, widget):
-        widget.bind("<MouseWheel>", self._on_tx_list_mousewheel)
-        for child in widget.winfo_children():
-            if isinstance(child, (ttk.Frame, ttk.Label)):
-                 self._bind_tx_list_mousewheel_recursive(child)
-
     def _on_view_change(self, *args):
         view = self.current_view.get()
         self.content_header.pack_forget()
@@ -997,81 +3094,8 @@ class HouseholdAppGUI:
         elif view == "settings":
             self.settings_frame.pack(fill=tk.BOTH, expand=True)
 
-    def _update_transaction_list(self):
-        for widget in self.list_frame.winfo_children(): widget.destroy()
-        all_transactions = self.ledger.get_all_transactions()
-        if not all_transactions: 
-            ttk.Label(self.list_frame, text="取引履歴がありません", font=(self.default_font.cget("family"), 10, "italic"), style="WhiteBG.TLabel").pack(pady=20)
-            return
-
-        grouped_by_month = defaultdict(list)
-        for tx in all_transactions: grouped_by_month[(tx.transaction_date.year, tx.transaction_date.month)].append(tx)
-        
-        latest_month_key = None
-        if grouped_by_month:
-            sorted_keys = sorted(grouped_by_month.keys(), reverse=True)
-            if sorted_keys:
-                latest_month_key = sorted_keys[0]
-
-        default_family = self.default_font.cget("family")
-
-        for month_key, transactions_in_month in sorted(grouped_by_month.items(), reverse=True):
-            year, month = month_key
-            month_header_frame = ttk.Frame(self.list_frame, style="MonthHeader.TFrame")
-            month_header_frame.pack(fill=tk.X, pady=(10, 1), padx=5)
-            month_header_frame.columnconfigure(0, weight=1)
-            month_label = ttk.Label(month_header_frame, text=f"▶ {year}年 {month}月", font=(default_family, 12, "bold"), style="MonthHeader.TLabel")
-            month_label.grid(row=0, column=0, sticky="w", padx=10, pady=5)
-            days_container = ttk.Frame(self.list_frame, style="WhiteBG.TFrame")
-
-            def create_toggler(container, header, label, y, m, txs):
-                is_content_created = False
-                def toggle(event=None):
-                    nonlocal is_content_created
-                    if container.winfo_viewable():
-                        container.pack_forget(); label.config(text=f"▶ {y}年 {m}月")
-                    else:
-                        if not is_content_created:
-                            self._create_month_content(container, txs)
-                            self._bind_tx_list_mousewheel_recursive(container)
-                            is_content_created = True
-                        container.pack(fill=tk.X, padx=(15, 5), after=header); label.config(text=f"▼ {y}年 {m}月")
-                return toggle
-
-            toggler = create_toggler(days_container, month_header_frame, month_label, year, month, transactions_in_month)
-            month_header_frame.bind("<Button-1>", toggler); month_label.bind("<Button-1>", toggler)
-
-            if month_key == latest_month_key:
-                self.root.after(10, toggler)
-
-    def _create_month_content(self, parent_container, transactions_in_month):
-        default_family = self.default_font.cget("family")
-        days_in_month = defaultdict(list)
-        for tx in transactions_in_month: days_in_month[tx.transaction_date].append(tx)
-
-        for day, transactions_in_day in sorted(days_in_month.items(), reverse=True):
-            day_header_frame = ttk.Frame(parent_container, padding=(0, 5), style="WhiteBG.TFrame")
-            day_header_frame.pack(fill=tk.X, padx=5)
-            day_header_frame.columnconfigure(0, weight=1)
-            ttk.Label(day_header_frame, text=f"{day.day}日 ({'月火水木金土日'[day.weekday()]})", font=(default_family, 10, "bold"), style="WhiteBG.TLabel").grid(row=0, column=0, sticky="w")
-            delete_button = ttk.Button(day_header_frame, text="🗑️", width=3, style="Toolbutton.TButton", command=lambda d=day: self._handle_delete_day(d))
-            self.style.map("Toolbutton.TButton", background=[('active', '#e0e0e0'), ('!active', '#ffffff')])
-            delete_button.grid(row=0, column=1, sticky="e")
-
-            for tx in transactions_in_day: self._create_transaction_card(parent_container, tx.to_card_data())
-    
-    def _create_transaction_card(self, parent_frame: ttk.Frame, tx_data: dict):
-        card_frame = ttk.Frame(parent_frame, padding=10, style="WhiteBG.TFrame")
-        card_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
-        content_frame = ttk.Frame(card_frame, style="WhiteBG.TFrame"); content_frame.pack(fill=tk.X)
-        default_family = self.default_font.cget("family")
-        ttk.Label(content_frame, text=tx_data["category"], font=(default_family, 13, "bold"), style="WhiteBG.TLabel").pack(side=tk.LEFT)
-        
-        INCOME_COLOR = "#007aff"
-        EXPENSE_COLOR = "#d62728"
-        amount_color = INCOME_COLOR if tx_data["type"] == 'income' else EXPENSE_COLOR
-        amount_label = ttk.Label(content_frame, text=tx_data["amount_str"], font=(default_family, 13, "bold"), foreground=amount_color, style="WhiteBG.TLabel")
-        amount_label.pack(side=tk.RIGHT)
+    @_profiled
+    def _update_transaction_list(self, months=None): self.transaction_list.refresh(months)
     
     def _update_summary(self):
         now = datetime.now(); income_total = self.ledger.get_income_summary_for_month(now.year, now.month); expense_total = self.ledger.get_expense_summary_for_month(now.year, now.month); balance = income_total - expense_total
@@ -1086,48 +3110,73 @@ class HouseholdAppGUI:
         balance_sign = "+" if balance >= 0 else ""
         self.balance_label.config(text=f"今月の収支: {balance_sign}¥{balance:,}", foreground=balance_color)
 
+    @_profiled
     def update_ui(self): 
         self._update_summary(); self._trigger_active_chart_update(); self._update_transaction_list()
         self.full_todo_view.update_list()
         self.calendar_view.render_calendar()
 
-    def _get_chart_data(self, year: int, month: int):
-        cache_key = (year, month)
-        if cache_key in self._chart_data_cache: return self._chart_data_cache[cache_key]
-        expense_summary = self.ledger.get_category_summary_for_month(year, month); income_summary = self.ledger.get_income_category_summary_for_month(year, month); balance_summary = {'収入': self.ledger.get_income_summary_for_month(year, month), '支出': self.ledger.get_expense_summary_for_month(year, month)}
-        data = {'expense': expense_summary, 'income': income_summary, 'balance': balance_summary}; self._chart_data_cache[cache_key] = data; return data
+    def _get_chart_data(self, year: int, month: int): return self.chart_data_cache.get(year, month)
 
-    def _invalidate_chart_cache_for_date(self, changed_date: date):
-        cache_key = (changed_date.year, changed_date.month)
-        if cache_key in self._chart_data_cache: del self._chart_data_cache[cache_key]
+    def _schedule_chart_prefetch(self, center: date):
+        """表示中の月の前後の月の集計を、画面の更新が落ち着いてからTaskRunnerのワーカーで用意しておく"""
+        if self._prefetch_job: self.root.after_cancel(self._prefetch_job)
+        def prefetch(): self._prefetch_job = None; self.chart_data_cache.prefetch(center, self.task_runner)
+        self._prefetch_job = self.root.after_idle(prefetch)
 
     def _trigger_active_chart_update(self, event=None):
+        if not self._warm_up_charts(): return
         year, month = self.displayed_date_for_charts.year, self.displayed_date_for_charts.month
         chart_data = self._get_chart_data(year, month)
         
         selected_chart = self.chart_nav_var.get()
         
-        self.chart_view_expense.pack_forget()
-        self.chart_view_income.pack_forget()
-        self.chart_view_balance.pack_forget()
+        for chart_type, chart_view in self._chart_views.items():
+            if chart_type != selected_chart: chart_view.pack_forget()
+        chart_view = self._get_chart_view(selected_chart); chart_view.pack(fill=tk.BOTH, expand=True)
 
         if selected_chart == "expense":
-            self.chart_view_expense.pack(fill=tk.BOTH, expand=True)
-            self.chart_view_expense.update_chart(year, month, chart_data['expense'], chart_data['balance'])
+            chart_view.update_chart(year, month, chart_data['expense'], chart_data['balance'])
         elif selected_chart == "income":
-            self.chart_view_income.pack(fill=tk.BOTH, expand=True)
-            self.chart_view_income.update_chart(year, month, chart_data['income'], chart_data['balance'])
+            chart_view.update_chart(year, month, chart_data['income'], chart_data['balance'])
         elif selected_chart == "balance":
-            self.chart_view_balance.pack(fill=tk.BOTH, expand=True)
-            self.chart_view_balance.update_chart(year, month, {}, chart_data['balance'])
-
-    def _on_todo_change(self): self.calendar_view.render_calendar()
+            chart_view.update_chart(year, month, {}, chart_data['balance'])
+
+    def _warm_up_charts(self) -> bool:
+        """
+        matplotlibの読み込みとフォントの探索をワーカーで行う。準備ができていればTrueを返す。
+        準備中はFalseを返し、終わったらグラフを描き直す(その間もカレンダー等は操作できる)。
+        """
+        if _matplotlib_font_family is not None: return True
+        if self._chart_warmup is None:
+            def on_done(font_name: str): _matplotlib_prepared(self.settings_manager, font_name); self._trigger_active_chart_update()
+            def on_error(error: Exception): print(f"WARN: グラフの準備に失敗しました: {error!r}"); self._chart_warmup = None
+            self._chart_warmup = self.task_runner.submit_io(_prepare_matplotlib, self.settings_manager.get("font_family"), on_done=on_done, on_error=on_error)
+        return False
+
+    def _get_chart_view(self, chart_type: str) -> ChartView:
+        chart_view = self._chart_views.get(chart_type)
+        if chart_view is None:
+            chart_view = self._chart_views[chart_type] = ChartView(self.charts_frame, chart_type=chart_type, settings_manager=self.settings_manager, style="WhiteBG.TFrame")
+            chart_view.fig.patch.set_facecolor(self._chart_bg); chart_view.ax.set_facecolor(self._chart_bg)
+        return chart_view
+
+    def _on_ledger_changed(self, event: ChangeEvent):
+        """変更された日付を含む月のグラフ・集計と、その日のカレンダーのセルだけを更新する"""
+        changed_months = event.months
+        today = date.today()
+        if (today.year, today.month) in changed_months: self._update_summary()
+        if (self.displayed_date_for_charts.year, self.displayed_date_for_charts.month) in changed_months: self._trigger_active_chart_update()
+        self._update_transaction_list(changed_months); self.calendar_view.refresh_dates(event.dates)
+
+    def _on_todos_changed(self, event: ChangeEvent): self.calendar_view.refresh_dates(event.dates)
 
     def _handle_delete_day(self, target_date: date):
         date_str = target_date.strftime('%Y年%m月%d日')
         if messagebox.askyesno("削除の確認", f"「{date_str}」の全ての取引を削除しますか？\nこの操作は元に戻せません。", parent=self.root):
-            self._invalidate_chart_cache_for_date(target_date); deleted_count = self.ledger.delete_transactions_for_day(target_date)
-            if deleted_count > 0: self.update_ui(); messagebox.showinfo("削除完了", f"{deleted_count}件の取引を削除しました。", parent=self.root)
+            try: deleted_count = self.ledger.delete_transactions_for_day(target_date)
+            except LedgerLoadError as e: messagebox.showerror("削除できません", str(e), parent=self.root); return
+            if deleted_count > 0: messagebox.showinfo("削除完了", f"{deleted_count}件の取引を削除しました。", parent=self.root)
 
     def _on_settings_changed(self):
         """ テーマや色設定の変更を適用し、UIを更新する """
@@ -1190,12 +3239,12 @@ class HouseholdAppGUI:
             ]
         )
         
-        if hasattr(self, 'chart_view_expense'):
-             for chart_view in [self.chart_view_expense, self.chart_view_income, self.chart_view_balance]:
-                if hasattr(chart_view, 'fig'):
-                    chart_view.fig.patch.set_facecolor(colors["comp_bg"])
-                    chart_view.ax.set_facecolor(colors["comp_bg"])
-                    chart_view.canvas.draw_idle()
+        if hasattr(self, '_chart_views'):
+            self._chart_bg = colors["comp_bg"]
+            for chart_view in self._chart_views.values():
+                chart_view.fig.patch.set_facecolor(colors["comp_bg"])
+                chart_view.ax.set_facecolor(colors["comp_bg"])
+                chart_view.canvas.draw_idle()
 
         if hasattr(self, 'settings_frame'):
             self.settings_frame.canvas.configure(bg=colors["bg"])
@@ -1207,26 +3256,53 @@ class HouseholdAppGUI:
             self.calendar_view.render_calendar()
 
 
-    def _on_transaction_added(self, new_transaction: Transaction): self._invalidate_chart_cache_for_date(new_transaction.transaction_date); self.update_ui()
-    
+    def _on_close(self):
+        """保留中の保存を全て書き込んでからウィンドウを閉じる"""
+        self.task_runner.close(); self.ledger.close(); self.todo_manager.close(); self.settings_manager.close()
+        self.root.destroy()
+
+    def _import_transactions(self):
+        """選んだファイルの読み込みと検証はワーカーで行い、検証済みのバッチが届くたびにTkのスレッドで台帳へ追加する"""
+        filepath = filedialog.askopenfilename(parent=self.root, title="取引の取り込み", filetypes=[("CSV / OFX", "*.csv *.ofx *.qfx *.txt"), ("すべてのファイル", "*")])
+        if not filepath: return
+        self.list_frame_container.config(text="取引リスト (取り込み中…)"); importer = TransactionImporter(self.ledger)
+        def add_batch(transactions: List[Transaction]):
+            importer.add_batch(transactions); self.list_frame_container.config(text=f"取引リスト (取り込み中… {importer.imported:,}件)")
+        def on_done(report: ImportReport):
+            self.list_frame_container.config(text="取引リスト"); importer.finish(report)
+            (messagebox.showwarning if report.error_count else messagebox.showinfo)("取引の取り込み", report.summary(), parent=self.root)
+        def on_error(error: Exception):
+            self.list_frame_container.config(text="取引リスト")
+            message = str(error) if isinstance(error, LedgerLoadError) else f"取り込みに失敗しました: {error}"
+            messagebox.showerror("取引の取り込み", f"{message}\n(中断までに{importer.imported:,}件を追加しました)", parent=self.root)
+        self.task_runner.submit_io_stream(parse_import_file, Path(filepath), on_item=add_batch, on_done=on_done, on_error=on_error)
+
     def _on_date_selected_from_calendar(self, selected_date: date): 
         self._open_add_transaction_window(initial_date=selected_date)
 
     def _open_add_transaction_window(self, initial_date: date = None):
         if initial_date is None: initial_date = date.today()
         if self.add_window is None or not self.add_window.winfo_exists(): 
-            self.add_window = AddTransactionWindow(self.root, self.ledger, self._on_transaction_added, initial_date=initial_date)
+            self.add_window = AddTransactionWindow(self.root, self.ledger, initial_date=initial_date)
         else: 
             self.add_window.lift()
 
+    def _open_edit_transaction_window(self, transaction: Transaction):
+        # 追加画面と同じ枠を使うので、どちらかが開いていれば前面に出すだけにする
+        if self.add_window is None or not self.add_window.winfo_exists():
+            self.add_window = AddTransactionWindow(self.root, self.ledger, transaction=transaction)
+        else:
+            self.add_window.lift()
+
     def _on_calendar_month_changed(self, new_date: date):
         if self.displayed_date_for_charts.year != new_date.year or self.displayed_date_for_charts.month != new_date.month: self.displayed_date_for_charts = new_date; self._trigger_active_chart_update()
+        self._schedule_chart_prefetch(new_date)
 
-def main():
-    my_ledger = Ledger()
-    my_todo_manager = TodoManager()
-    
-    root = tk.Tk()
+def create_app(root: tk.Tk) -> HouseholdAppGUI:
+    """設定に従ってLedgerを開き、スタイルを設定したrootの上にアプリを組み立てる"""
+    startup_settings = SettingsManager()
+    my_ledger = open_configured_ledger(startup_settings)
+    startup_settings.close()
     
     style = ttk.Style(root)
     default_font_family = font.nametofont("TkDefaultFont").cget("family")
@@ -1248,8 +3324,13 @@ def main():
 
     style.configure("WeekdayHeader.TFrame", background="#e8e8e8")
 
-    app = HouseholdAppGUI(root, my_ledger)
+    return HouseholdAppGUI(root, my_ledger)
+
+def main():
+    root = tk.Tk()
+    app = create_app(root)
     root.mainloop()
+    app.ledger.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,57 @@
+# coding: utf-8
+"""
+CalendarViewの月切り替え1回あたりの描画時間を計測する。画面が必要なので、サーバー等では
+Xvfbの上で実行する。変更前後の比較は、同じスクリプトを比較したいコミットのapp.pyに対して実行する。
+
+    xvfb-run -a python benchmarks/bench_calendar.py [取引件数] [切り替え回数]   (既定: 5000 48)
+"""
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Tuple
+
+import tkinter as tk
+from tkinter import ttk
+
+from common import HOME, app, make_todos, make_transactions
+
+def make_ledger(count: int, months: int) -> app.Ledger:
+    filepath = Path(HOME.name) / "transactions.json"
+    app._write_transactions_json(filepath, make_transactions(count, date.today().replace(day=1), months * 31))
+    return app.Ledger(app.JsonFileStorage(filepath))
+
+def make_todo_manager(months: int) -> app.TodoManager:
+    manager = app.TodoManager(); manager.todos = make_todos(months * 10, date.today().replace(day=1), months * 31)
+    return manager
+
+def timed_renders(root: tk.Tk, view, action, repeat: int) -> Tuple[list, int]:
+    times = []; measure_calls = 0
+    for _ in range(repeat):
+        started = time.perf_counter(); action(); root.update_idletasks(); times.append(time.perf_counter() - started)
+        # 文字幅計測のTcl呼び出し回数(計測キャッシュのある版のみ)
+        measure_calls += getattr(view, "render_stats", {}).get("measure_calls", 0)
+    return times, measure_calls
+
+def report(label: str, result: Tuple[list, int]):
+    times, measure_calls = sorted(result[0]), result[1]
+    print(f"  {label:<16} 平均 {sum(times) / len(times) * 1000:8.2f} ms  中央値 {times[len(times) // 2] * 1000:8.2f} ms  最大 {times[-1] * 1000:8.2f} ms"
+          f"  font measure {measure_calls / len(times):6.1f} 回/描画")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000; switches = int(sys.argv[2]) if len(sys.argv) > 2 else 48
+    try: root = tk.Tk()
+    except tk.TclError as e: print(f"画面に接続できないため計測を省略します(xvfb-runの上で実行してください): {e}"); return
+    root.geometry("900x700")
+    view = app.CalendarView(root, style=ttk.Style(), ledger=make_ledger(count, switches), todo_manager=make_todo_manager(switches),
+                            on_date_click_callback=lambda d: None, on_month_change_callback=lambda d: None)
+    view.pack(fill=tk.BOTH, expand=True); root.update()
+    view.render_calendar(); root.update()
+    print(f"取引件数: {count:,}  切り替え回数: {switches}")
+    report("次月へ切り替え", timed_renders(root, view, view.go_to_next_month, switches))
+    report("前月へ切り替え", timed_renders(root, view, view.go_to_prev_month, switches))
+    report("同じ月を再描画", timed_renders(root, view, view.render_calendar, switches))
+    root.destroy()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# coding: utf-8
+"""
+Transactionの保持に必要なメモリ量を、従来の__dict__ベースの表現と比較する。
+
+    python benchmarks/bench_memory.py [件数]
+"""
+import sys
+import tracemalloc
+import uuid
+
+from common import app, make_transaction_fields
+
+class LegacyTransaction:
+    """比較用: 変更前のTransactionと同じ属性の持ち方"""
+    def __init__(self, amount, category, transaction_date, type, id=None):
+        self.id = id if id is not None else str(uuid.uuid4())
+        self.amount = amount; self.category = category.strip(); self.transaction_date = transaction_date; self.type = type
+
+def measure(cls, count: int) -> int:
+    fields = make_transaction_fields(count)
+    tracemalloc.start()
+    # 実際のファイル読み込みと同様に、カテゴリ文字列は行ごとに別オブジェクトとして生成する
+    items = [cls(amount, "".join(category), transaction_date, type) for amount, category, transaction_date, type in fields]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    legacy = measure(LegacyTransaction, count); compact = measure(app.Transaction, count)
+    print(f"件数: {count:,}")
+    print(f"従来:       {legacy / 1024 / 1024:8.1f} MB ({legacy / count:.0f} B/件)")
+    print(f"コンパクト: {compact / 1024 / 1024:8.1f} MB ({compact / count:.0f} B/件)")
+    print(f"削減率:     {1 - compact / legacy:8.1%}")
+
+if __name__ == "__main__":
+    main()
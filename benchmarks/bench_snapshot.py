@@ -0,0 +1,37 @@
+# coding: utf-8
+"""
+台帳とTodoの保存形式について、従来のJSON(indent=4)とバイナリスナップショットの
+保存時間・読み込み時間・ファイルサイズを比較する。
+
+    python benchmarks/bench_snapshot.py [件数 ...]   (既定: 10000 100000 1000000)
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from common import app, make_todos, make_transactions, timed
+
+def report(label: str, save_time: float, load_time: float, filepath: Path):
+    print(f"  {label:<14} 保存 {save_time * 1000:9.1f} ms  読込 {load_time * 1000:9.1f} ms  サイズ {filepath.stat().st_size / 1024 / 1024:8.2f} MB")
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    manager = app.TodoManager(save_delay=60)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for count in counts:
+            print(f"件数: {count:,}")
+            txs = make_transactions(count)
+            save_time, _ = timed(app._write_transactions_json, tmp / "tx.json", txs, 4); load_time, _ = timed(app._read_transactions_json, tmp / "tx.json")
+            report("台帳 JSON", save_time, load_time, tmp / "tx.json")
+            save_time, _ = timed(app._write_ledger_snapshot, tmp / "tx.bin", txs); load_time, _ = timed(app._read_ledger_snapshot, tmp / "tx.bin")
+            report("台帳 バイナリ", save_time, load_time, tmp / "tx.bin")
+            del txs
+            manager.todos = make_todos(count)
+            save_time, _ = timed(manager.export_json, tmp / "todo.json"); load_time, _ = timed(app.TodoManager._read_json, tmp / "todo.json")
+            report("Todo JSON", save_time, load_time, tmp / "todo.json")
+            save_time, _ = timed(app._write_todo_snapshot, tmp / "todo.bin", manager.todos); load_time, _ = timed(app._read_todo_snapshot, tmp / "todo.bin")
+            report("Todo バイナリ", save_time, load_time, tmp / "todo.bin")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# coding: utf-8
+"""
+起動時間を計測する。
+  1. python -X importtime -c "import app" の結果から、app全体と時間のかかったモジュールを表示する
+  2. 別プロセスでアプリを起動し、ウィンドウとカレンダーが描かれるまで(最初の画面)と、
+     グラフが描かれるまでの時間を計測する(画面が必要。サーバー等ではxvfb-runの上で実行する)
+
+    python benchmarks/bench_startup.py [繰り返し回数]   (既定: 3)
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 子プロセスで実行する。起動から最初の画面・グラフまでの時刻を標準出力に書く
+FIRST_FRAME_SCRIPT = r"""
+import sys, time
+sys.path.insert(0, sys.argv[1])
+import tkinter as tk
+import app
+root = tk.Tk(); gui = app.create_app(root); marks = {}
+def poll():
+    if "first_frame" not in marks and gui.calendar_view._day_cells and root.winfo_viewable():
+        root.update_idletasks(); marks["first_frame"] = time.time()
+    if "first_frame" in marks and gui._chart_views:
+        root.update_idletasks(); marks["chart"] = time.time()
+        print(marks["first_frame"], marks["chart"]); root.destroy(); return
+    root.after(5, poll)
+root.after(0, poll); root.mainloop()
+"""
+
+def isolated_env(home: str) -> dict:
+    # 実行者の家計簿データに触れないよう、ホームディレクトリを一時ディレクトリに向ける
+    return dict(os.environ, HOME=home, USERPROFILE=home)
+
+def import_times(home: str):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, env=isolated_env(home), capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # モジュール名の前の空白は入れ子の深さ(1段につき2文字)を表す
+        rows.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+    return rows
+
+def first_frame_times(home: str):
+    started = time.time()
+    result = subprocess.run([sys.executable, "-c", FIRST_FRAME_SCRIPT, str(ROOT)], env=isolated_env(home), capture_output=True, text=True)
+    if result.returncode != 0: return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "不明なエラー"
+    first_frame, chart = map(float, result.stdout.split()[-2:])
+    return (first_frame - started, chart - started), None
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    with tempfile.TemporaryDirectory() as home:
+        rows = import_times(home)
+        app_row = next((row for row in rows if row[2] == "app"), None)
+        if app_row: print(f"import app: {app_row[0] / 1000:.1f} ms (-X importtime 累積)")
+        print("  時間のかかったモジュール(累積):")
+        for cumulative_us, _, name in sorted((row for row in rows if row[2] != "app" and not row[2].startswith(" " * 4)), reverse=True)[:10]:
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name.strip()}")
+        # 1回目はフォントの探索結果が未保存の状態(初回起動)、2回目以降は保存済みの状態になる
+        for attempt in range(repeat):
+            times, error = first_frame_times(home)
+            if error: print(f"起動時間の計測を省略します(xvfb-runの上で実行してください): {error}"); return
+            print(f"起動 {attempt + 1}回目{'(初回起動)' if attempt == 0 else ''}: 最初の画面 {times[0] * 1000:8.1f} ms  グラフ表示 {times[1] * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# coding: utf-8
+"""
+モデルと画面の主要な処理をまとめて計測し、結果をJSONで書き出す。
+コミット間の比較は benchmarks/compare.py で行う。
+
+    python benchmarks/bench_suite.py [件数 ...] [--output 結果.json] [--no-views]   (既定: 1000 10000 100000 1000000)
+
+画面の計測(CalendarView・取引リスト・ChartView)には画面が必要なので、サーバー等では
+xvfb-run -a python benchmarks/bench_suite.py ... のように実行する。画面がなければ画面の計測だけを省略する。
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from common import HOME, app, make_todos, make_transactions, timed
+
+def git_commit() -> str:
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).resolve().parent, capture_output=True, text=True).stdout.strip() or None
+    except OSError: return None
+
+class Recorder:
+    """計測結果を {"name", "size", "ops", "seconds", "per_op_us"} の行として集める"""
+    def __init__(self): self.results = []; self.skipped = []
+    def add(self, name: str, size: int, seconds: float, ops: int = 1):
+        self.results.append({"name": name, "size": size, "ops": ops, "seconds": seconds, "per_op_us": seconds / ops * 1e6})
+        print(f"  {name:<44} {seconds * 1000:10.2f} ms  ({seconds / ops * 1e6:10.2f} us/回, {ops}回)", file=sys.stderr)
+    def loop(self, name: str, size: int, func, args_list: list):
+        started = time.perf_counter()
+        for args in args_list: func(*args)
+        self.add(name, size, time.perf_counter() - started, len(args_list))
+
+def bench_model(recorder: Recorder, size: int, transactions: list, todos: list, workdir: Path):
+    rng = random.Random(size)
+    for backend, storage_factory in (("journal", lambda d: app.JournalStorage(d)), ("json", lambda d: app.JsonFileStorage(d / "transactions.json"))):
+        directory = workdir / f"{backend}-{size}"; directory.mkdir()
+        storage = storage_factory(directory); ledger = app.Ledger(storage)
+        ledger._transactions = list(transactions); ledger._rebuild_indexes()
+        seconds, _ = timed(ledger._save); recorder.add(f"ledger.save.{backend}", size, seconds)
+        seconds, loaded = timed(ledger._load); recorder.add(f"ledger.load.{backend}", size, seconds)
+        assert len(loaded) == size
+        storage.close()
+
+    directory = workdir / f"model-{size}"; directory.mkdir()
+    ledger = app.Ledger(app.JournalStorage(directory)); ledger._transactions = list(transactions); ledger._rebuild_indexes()
+    first, last = transactions[-1].transaction_date, transactions[0].transaction_date
+    new_transactions = [app.Transaction(rng.randint(100, 10_000), rng.choice(["食費", "娯楽"]), first + timedelta(days=rng.randint(0, (last - first).days)), "expense") for _ in range(1000)]
+    recorder.loop("ledger.add_transaction", size, ledger.add_transaction, [(tx,) for tx in new_transactions])
+    months = [(d.year, d.month) for d in (first + timedelta(days=rng.randint(0, (last - first).days)) for _ in range(1000))]
+    for method in ("get_expense_summary_for_month", "get_income_summary_for_month", "get_category_summary_for_month", "get_income_category_summary_for_month"):
+        recorder.loop(f"ledger.{method}", size, getattr(ledger, method), months)
+    # 複数月の集計: NumPyの配列(既定では使わない。最初の1回で作り、以降は1行ずつ更新する)と月別集計インデックス(既定)の比較
+    windows = [app.ChartDataCache(ledger).prefetch_window(date(*month, 1)) for month in months[:100]]
+    if app._import_numpy():
+        ledger.AGGREGATION_ENGINE_MIN_MONTHS = 1
+        seconds, _ = timed(ledger.prepare_monthly_summaries, *windows[0]); recorder.add("ledger.aggregation_engine.build", size, seconds)
+        recorder.loop("ledger.get_monthly_summaries.numpy", size, ledger.get_monthly_summaries, windows)
+        # 以降の変更の計測に配列の更新が含まれないよう、既定の状態に戻す
+        del ledger.AGGREGATION_ENGINE_MIN_MONTHS; ledger._aggregation_engine = None
+    recorder.loop("ledger.get_monthly_summaries.index", size, ledger.get_monthly_summaries, windows)
+    days = [(first + timedelta(days=rng.randint(0, (last - first).days)),) for _ in range(1000)]
+    recorder.loop("ledger.get_transactions_for_day", size, ledger.get_transactions_for_day, days)
+    targets = rng.sample(ledger.get_all_transactions(), 1000)
+    recorder.loop("ledger.get", size, ledger.get, [(tx.id,) for tx in targets])
+    recorder.loop("ledger.update", size, lambda tx, day: ledger.update(tx.id, amount=tx.amount + 1, transaction_date=day), [(tx, day) for tx, (day,) in zip(targets, days)])
+    recorder.loop("ledger.delete", size, ledger.delete, [(tx.id,) for tx in targets])
+    ledger.close()
+
+    # 一括取り込み: 同じ件数のCSVの解析だけと、空の台帳・全件が取り込み済みの台帳(全て重複)への取り込み
+    csv_path = workdir / f"import-{size}.csv"
+    with csv_path.open("w", encoding="utf-8") as f:
+        f.write("日付,金額,カテゴリ,メモ\n"); f.writelines(f"{tx.transaction_date.isoformat()},{-tx.amount if tx.type == 'expense' else tx.amount},{tx.category},{i}\n" for i, tx in enumerate(transactions))
+    seconds, _ = timed(app.parse_import_file, csv_path, lambda batch: None); recorder.add("import.parse_csv", size, seconds, size)
+    directory = workdir / f"import-{size}"; directory.mkdir(); ledger = app.Ledger(app.JournalStorage(directory))
+    seconds, _ = timed(app.import_file, ledger, csv_path); recorder.add("import.file", size, seconds, size)
+    seconds, report = timed(app.import_file, ledger, csv_path); recorder.add("import.file.duplicates", size, seconds, size)
+    assert report.duplicates == size; ledger.close()
+
+    manager = app.TodoManager(save_delay=60); manager.todos = list(todos)
+    recorder.loop("todo_manager.get_all_todos", size, manager.get_all_todos, [()] * 5)
+    manager._saver.flush()
+
+def bench_views(recorder: Recorder, size: int, transactions: list, todos: list, root, workdir: Path):
+    # 実際の起動と同じく、既定のジャーナル形式で保存したデータをcreate_appで開く
+    data_dir = Path(HOME.name) / ".simple_kakeibo"
+    for path in data_dir.glob("*"): path.unlink()
+    storage = app.JournalStorage(data_dir); storage.save(transactions); storage.close(); app._write_todo_snapshot(data_dir / "todos.bin", todos)
+    for child in root.winfo_children(): child.destroy()
+    gui = app.create_app(root); gui.ledger._finish_loading(); gui.initial_load(); root.update()
+    calendar_view = gui.calendar_view; calendar_view.current_date = transactions[0].transaction_date
+    def switch_month(step):
+        (calendar_view.go_to_next_month if step > 0 else calendar_view.go_to_prev_month)(); root.update_idletasks()
+    recorder.loop("calendar_view.render_calendar.switch_month", size, switch_month, [(-1,)] * 24)
+    # 月の切り替え1回で一時的に確保されるメモリの量(中央値)も、同じ行に記録する
+    tracemalloc.start(); peaks = []
+    for _ in range(12): tracemalloc.reset_peak(); base = tracemalloc.get_traced_memory()[0]; switch_month(-1); peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop(); recorder.results[-1]["peak_alloc_bytes"] = sorted(peaks)[len(peaks) // 2]
+    recorder.loop("calendar_view.render_calendar.unchanged", size, lambda: (calendar_view.render_calendar(), root.update_idletasks()), [()] * 24)
+    recorder.loop("gui._update_transaction_list", size, lambda: (gui._update_transaction_list(), root.update_idletasks()), [()] * 10)
+    # Todoの完了の切り替え(該当するカードだけを差し替える。ウィジェットとフォントが増えないことはtests/test_views.pyで確かめる)
+    manager = gui.todo_manager; root.update_idletasks(); targets = random.Random(size).choices(manager.todos, k=2000)
+    recorder.loop("todo_view.toggle", size, lambda todo: (manager.update_todo_status(todo.id, not todo.is_completed), root.update_idletasks()), [(todo,) for todo in targets])
+    chart_view = gui._get_chart_view("expense"); chart_view.pack(fill="both", expand=True); root.update()
+    latest = transactions[0].transaction_date; periods = [((latest.replace(day=1) - timedelta(days=31 * i)).year, (latest.replace(day=1) - timedelta(days=31 * i)).month) for i in range(12)]
+    def show_chart(year, month, finish: bool):
+        chart_data = gui.chart_data_cache.get(year, month); chart_view.update_chart(year, month, chart_data['expense'], chart_data['balance'])
+        # アニメーションはafterで進むので、計測では残りのフレームを待たずに最終描画まで進める
+        if finish and chart_view.anim_job: chart_view.after_cancel(chart_view.anim_job); chart_view.anim_job = None; chart_view._finish_animation()
+        root.update_idletasks()
+    recorder.loop("chart_view.update_chart.first", size, show_chart, [(y, m, True) for y, m in periods])
+    recorder.loop("chart_view.update_chart.cached", size, show_chart, [(y, m, True) for y, m in periods])
+    gui.ledger.close(); gui.todo_manager.close(); gui.settings_manager.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--output", type=Path, help="結果のJSONの書き出し先(省略時は標準出力)")
+    parser.add_argument("--no-views", action="store_true", help="画面の計測を省略する")
+    args = parser.parse_args()
+    recorder = Recorder(); root = None
+    if not args.no_views:
+        import tkinter as tk
+        try: root = tk.Tk(); root.geometry("1280x720")
+        except tk.TclError as e: recorder.skipped.append(f"views: {e}"); print(f"画面に接続できないため画面の計測を省略します: {e}", file=sys.stderr)
+    workdir = Path(HOME.name) / "bench"; workdir.mkdir()
+    for size in args.sizes:
+        print(f"件数: {size:,}", file=sys.stderr)
+        transactions = make_transactions(size); todos = make_todos(size)
+        bench_model(recorder, size, transactions, todos, workdir)
+        if root is not None: bench_views(recorder, size, transactions, todos, root, workdir)
+    if root is not None: root.destroy()
+    report = {"meta": {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                       "platform": platform.platform(), "numpy": app._import_numpy(), "sizes": args.sizes},
+              "results": recorder.results, "skipped": recorder.skipped}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output: args.output.write_text(text + "\n", encoding="utf-8")
+    else: print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# coding: utf-8
+"""
+ベンチマーク共通の準備と合成データの生成。
+
+読み込んだ時点でホームディレクトリを一時ディレクトリに向けてからappを読み込むので、
+ベンチマークが実行者の家計簿データ(~/.simple_kakeibo)に触れることはない。
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+HOME = tempfile.TemporaryDirectory(); os.environ["HOME"] = HOME.name; os.environ["USERPROFILE"] = HOME.name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import app
+
+CATEGORIES = ["食費", "交通費", "家賃", "娯楽", "日用品", "交際費", "その他"]
+INCOME_CATEGORIES = ["給与", "賞与", "副業", "臨時収入", "その他"]
+
+def make_transaction_fields(count: int, start: date = date(2010, 1, 1), days: int = 5000):
+    """make_transactionsと同じ乱数で、取引の(金額, カテゴリ, 日付, 種別)を生成順に返す(Transaction以外の表現と比べる用)"""
+    rng = random.Random(count); fields = []
+    for _ in range(count):
+        type = "income" if rng.random() < 0.2 else "expense"
+        fields.append((rng.randint(100, 100_000), rng.choice(INCOME_CATEGORIES if type == "income" else CATEGORIES), start + timedelta(days=rng.randint(0, days)), type))
+    return fields
+
+def make_transactions(count: int, start: date = date(2010, 1, 1), days: int = 5000):
+    """startからdays日の範囲に散らばった取引を、Ledgerと同じ日付の降順で返す"""
+    return sorted((app.Transaction(*fields) for fields in make_transaction_fields(count, start, days)), key=app._tx_sort_key)
+
+def make_todos(count: int, start: date = date(2010, 1, 1), days: int = 5000):
+    rng = random.Random(count)
+    todos = [app.TodoItem(f"タスク{i}: 支払い確認", start + timedelta(days=rng.randint(0, days)), rng.random() < 0.5) for i in range(count)]
+    return sorted(todos, key=app._todo_sort_key)
+
+def timed(func, *args):
+    started = time.perf_counter(); result = func(*args); return time.perf_counter() - started, result
@@ -0,0 +1,35 @@
+# coding: utf-8
+"""
+bench_suite.pyが書き出した2つの結果を比べ、項目ごとの変化率を表示する。
+
+    python benchmarks/compare.py 変更前.json 変更後.json [--threshold 0.10]
+
+変更後がthreshold(既定10%)以上遅くなった項目があれば、終了コード1で終わる。
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+def load(path: Path) -> dict:
+    report = json.loads(path.read_text(encoding="utf-8"))
+    return {(row["name"], row["size"]): row["per_op_us"] for row in report["results"]}, report["meta"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("before", type=Path); parser.add_argument("after", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="遅くなったとみなす変化率")
+    args = parser.parse_args()
+    (before, before_meta), (after, after_meta) = load(args.before), load(args.after)
+    print(f"{before_meta.get('commit')} → {after_meta.get('commit')}")
+    regressions = 0
+    for key in sorted(before.keys() & after.keys(), key=lambda k: (k[1], k[0])):
+        change = after[key] / before[key] - 1 if before[key] else 0.0
+        mark = "遅" if change >= args.threshold else "速" if change <= -args.threshold else ""
+        regressions += mark == "遅"
+        print(f"  {key[0]:<44} {key[1]:>9,}  {before[key]:12.2f} → {after[key]:12.2f} us  {change:+7.1%} {mark}")
+    for key in sorted(before.keys() ^ after.keys()): print(f"  {key[0]:<44} {key[1]:>9,}  片方の結果のみ")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# coding: utf-8
+"""
+テスト共通の準備。ホームディレクトリをテストごとの一時ディレクトリに向けるので、
+テストが実行者の家計簿データ(~/.simple_kakeibo)に触れることはない。
+"""
+import gc
+import sys
+import tkinter as tk
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path)); monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def data_dir(home):
+    directory = home / ".simple_kakeibo"; directory.mkdir(exist_ok=True); return directory
+
+@pytest.fixture
+def tk_root():
+    """ウィジェットを使うテスト用のルートウィンドウ。ディスプレイがなければスキップする"""
+    try: root = tk.Tk()
+    except tk.TclError as e: pytest.skip(f"Tkのディスプレイがありません: {e}")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+@pytest.fixture
+def scheduler():
+    """
+    afterを処理するだけのTcl。画面がなくても使える。Tclのインタプリタは作ったスレッド以外で解放すると異常終了するので、
+    ワーカーのスレッドで起きたガベージコレクションに回収されないよう、テストの終わりにメインスレッドで回収する
+    """
+    interpreter = tk.Tcl(); yield interpreter
+    del interpreter; gc.collect()
@@ -0,0 +1,50 @@
+# coding: utf-8
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import app
+
+pytestmark = pytest.mark.skipif(not app._import_numpy(), reason="NumPyがありません")
+
+CATEGORIES = ["食費", "交通費", "家賃", "娯楽", "日用品"]
+
+def random_transaction(rng: random.Random) -> app.Transaction:
+    return app.Transaction(rng.randint(1, 100_000), rng.choice(CATEGORIES), date(2022, 1, 1) + timedelta(days=rng.randint(0, 800)), rng.choice(["expense", "income"]))
+
+def summaries(ledger: app.Ledger, start: date, end: date, use_engine: bool) -> dict:
+    ledger.AGGREGATION_ENGINE_MIN_MONTHS = 1 if use_engine else float("inf")
+    try: return ledger.get_monthly_summaries(start, end)
+    finally: del ledger.AGGREGATION_ENGINE_MIN_MONTHS
+
+def test_numpy_engine_matches_index_after_changes(data_dir):
+    """配列を作った後の追加・変更・削除を1行ずつ反映しても、月別集計インデックスと同じ結果になる"""
+    rng = random.Random(6); ledger = app.Ledger(app.JournalStorage(data_dir))
+    ledger.add_transactions([random_transaction(rng) for _ in range(2000)])
+    start, end = date(2021, 11, 1), date(2024, 5, 31)
+    assert summaries(ledger, start, end, True) == summaries(ledger, start, end, False)
+    engine = ledger._aggregation_engine; assert engine is not None
+    for step in range(300):
+        target = rng.choice(ledger.get_all_transactions())
+        if step % 3 == 0: ledger.add_transaction(random_transaction(rng))
+        elif step % 3 == 1: ledger.update(target.id, amount=rng.randint(1, 100_000), category=rng.choice(CATEGORIES + ["新カテゴリ"]), transaction_date=target.transaction_date + timedelta(days=rng.randint(-40, 40)))
+        else: ledger.delete(target.id)
+    ledger.delete_transactions_for_day(rng.choice(ledger.get_all_transactions()).transaction_date)
+    assert ledger._aggregation_engine is engine and engine.size == len(ledger.get_all_transactions())
+    assert summaries(ledger, start, end, True) == summaries(ledger, start, end, False)
+    ledger.close()
+
+def test_engine_grows_past_initial_capacity(data_dir):
+    rng = random.Random(1); ledger = app.Ledger(app.JournalStorage(data_dir))
+    ledger.add_transaction(random_transaction(rng)); summaries(ledger, date(2022, 1, 1), date(2024, 3, 31), True)
+    for _ in range(app.NumpyAggregationEngine._MIN_CAPACITY + 10): ledger.add_transaction(random_transaction(rng))
+    assert summaries(ledger, date(2022, 1, 1), date(2024, 3, 31), True) == summaries(ledger, date(2022, 1, 1), date(2024, 3, 31), False)
+    ledger.close()
+
+def test_prepared_summaries_match_sqlite(home):
+    """SqliteLedgerの集計は、ワーカー用の別の接続でも同じ結果になる"""
+    rng = random.Random(2); ledger = app.SqliteLedger(); ledger.add_transactions([random_transaction(rng) for _ in range(500)])
+    func, args = ledger.prepare_monthly_summaries(date(2022, 1, 1), date(2023, 12, 31))
+    assert func(*args) == ledger.get_monthly_summaries(date(2022, 1, 1), date(2023, 12, 31))
+    ledger.close()
@@ -0,0 +1,69 @@
+# coding: utf-8
+from datetime import date, timedelta
+
+import pytest
+
+import app
+
+@pytest.fixture(params=["journal", "sqlite"])
+def ledger(request):
+    ledger = app.create_ledger(request.param); yield ledger; ledger.close()
+
+def write_csv(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8"); return path
+
+def test_zero_or_blank_amount_cell_counts_as_empty(tmp_path):
+    """入金・出金の片方が0や空欄でも、もう片方の金額で取り込む。両方とも0なら金額がない行としてエラーにする"""
+    path = write_csv(tmp_path / "bank.csv", ["日付,お預り金額,お引出し金額,摘要", "2024/06/01,0,1500,スーパー", "2024/06/02,250000,,給与", "2024/06/03,0,0,手数料"])
+    batches = []; report = app.parse_import_file(path, batches.append)
+    transactions = [tx for batch in batches for tx in batch]
+    assert [(tx.transaction_date, tx.type, tx.amount, tx.category) for tx in transactions] == [(date(2024, 6, 1), "expense", 1500, "食費"), (date(2024, 6, 2), "income", 250000, "給与")]
+    assert report.rows == 3 and report.errors == [(4, "金額が空か0です")]
+
+def test_reimport_and_manual_entries_are_not_duplicated(ledger, tmp_path):
+    manual = app.Transaction(1500, "食費", date(2024, 6, 1), "expense"); ledger.add_transaction(manual)
+    path = write_csv(tmp_path / "card.csv", ["日付,金額,カテゴリ,メモ", "2024-06-01,-1500,食費,スーパー", "2024-06-01,-1500,食費,スーパー", "2024-06-02,-800,交通費,JR"])
+    report = app.import_file(ledger, path)
+    # 手入力の1件は同じ日付・金額・カテゴリの1行とだけ対応し、2行目は別の取引として取り込む
+    assert (report.imported, report.duplicates) == (2, 1)
+    assert sorted((tx.transaction_date, tx.amount) for tx in ledger.get_all_transactions()) == [(date(2024, 6, 1), 1500), (date(2024, 6, 1), 1500), (date(2024, 6, 2), 800)]
+    report = app.import_file(ledger, path)
+    assert (report.imported, report.duplicates) == (0, 3) and len(ledger.get_all_transactions()) == 3
+
+def test_import_streams_batches_into_ledger(ledger, tmp_path, monkeypatch):
+    """取引はバッチごとに台帳へ追加し、照合用の状態は直近の日付の分だけを保持する"""
+    monkeypatch.setattr(app, "IMPORT_BATCH_SIZE", 100); monkeypatch.setattr(app, "IMPORT_WINDOW_DAYS", 5)
+    start = date(2024, 1, 1); lines = ["日付,金額,カテゴリ,メモ"] + [f"{start + timedelta(days=i // 10)},-{100 + i % 3},食費,店{i % 3}" for i in range(1000)]
+    path = write_csv(tmp_path / "large.csv", lines)
+    importer = app.TransactionImporter(ledger); sizes = []
+    def add_batch(transactions):
+        sizes.append(len(ledger.get_all_transactions())); importer.add_batch(transactions)
+        assert len(importer._days) <= app.IMPORT_WINDOW_DAYS
+    report = importer.finish(app.parse_import_file(path, add_batch))
+    assert sizes == list(range(0, 1000, 100)) and (report.imported, report.duplicates) == (1000, 0)
+    transactions = ledger.get_all_transactions()
+    assert len({tx.id for tx in transactions}) == 1000 and [tx.transaction_date for tx in transactions] == sorted((tx.transaction_date for tx in transactions), reverse=True)
+    assert app.import_file(ledger, path).duplicates == 1000
+
+def test_batches_are_appended_to_journal(data_dir, tmp_path):
+    """ジャーナル形式では、取り込んだ取引をスナップショットの書き直しではなくジャーナルへの追記で記録する"""
+    ledger = app.Ledger(app.JournalStorage(data_dir, compact_threshold=10_000))
+    path = write_csv(tmp_path / "card.csv", ["日付,金額,カテゴリ"] + [f"2024-06-{day:02d},-{day * 100},食費" for day in range(1, 31)])
+    app.import_file(ledger, path)
+    assert not (data_dir / "ledger_snapshot.bin").exists() and len((data_dir / "ledger_journal.jsonl").read_text(encoding="utf-8").splitlines()) == 30
+    ledger.close()
+    reloaded = app.Ledger(app.JournalStorage(data_dir))
+    assert sorted(tx.amount for tx in reloaded.get_all_transactions()) == [day * 100 for day in range(1, 31)]
+    reloaded.close()
+
+@pytest.mark.parametrize("text, expected", [("¥1,500", 1500), ("-1500", -1500), ("+2,000円", 2000), ("1500.00", 1500), ("１５００", 1500)])
+def test_amount_formats(text, expected):
+    assert app._parse_import_amount(text) == expected
+
+@pytest.mark.parametrize("text", ["Infinity", "-inf", "NaN", "sNaN", "1e5", "1E+3", "0x10", "1_000", "12.5", "", "円"])
+def test_invalid_amount_is_a_row_error(tmp_path, text):
+    """読めない金額はその行のエラーとして記録し、取り込み全体は止めない"""
+    path = write_csv(tmp_path / "card.csv", ["日付,金額,カテゴリ", f"2024-06-01,{text},食費", "2024-06-02,-800,交通費"])
+    batches = []; report = app.parse_import_file(path, batches.append)
+    assert [tx.amount for batch in batches for tx in batch] == [800]
+    assert report.error_count == 1 and report.errors[0][0] == 2
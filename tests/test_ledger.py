@@ -0,0 +1,134 @@
+# coding: utf-8
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import app
+
+CATEGORIES = ["食費", "交通費", "家賃", "娯楽"]
+
+def make_transactions(count: int, start: date = date(2023, 11, 1), days: int = 120):
+    rng = random.Random(count)
+    return [app.Transaction(rng.randint(1, 10_000), rng.choice(CATEGORIES), start + timedelta(days=rng.randint(0, days)), rng.choice(["expense", "income"])) for _ in range(count)]
+
+@pytest.fixture(params=["journal", "sqlite"])
+def ledger(request):
+    ledger = app.create_ledger(request.param); yield ledger; ledger.close()
+
+def test_transaction_list_pages_match_full_list(ledger):
+    """取引リストが使う月ごとの件数・日付の範囲の取得が、全件の一覧と一致する"""
+    ledger.add_transactions(make_transactions(500))
+    transactions = ledger.get_all_transactions(); counts = ledger.count_transactions_by_month()
+    assert sum(counts.values()) == len(transactions)
+    for month_key, count in counts.items():
+        start, end = app._month_bounds(*month_key)
+        window = ledger.get_transactions_between(start, end)
+        assert len(window) == count == ledger.count_transactions_between(start, end)
+        assert sorted(tx.id for tx in window) == sorted(tx.id for tx in transactions if start <= tx.transaction_date <= end)
+        assert [tx.transaction_date for tx in window] == sorted((tx.transaction_date for tx in window), reverse=True)
+
+def test_month_counts_follow_changes(ledger):
+    tx = app.Transaction(500, "食費", date(2024, 2, 29), "expense"); ledger.add_transaction(tx)
+    assert ledger.count_transactions_by_month() == {(2024, 2): 1}
+    ledger.update(tx.id, transaction_date=date(2024, 3, 1))
+    assert ledger.count_transactions_by_month() == {(2024, 3): 1}
+    ledger.delete(tx.id)
+    assert ledger.count_transactions_by_month() == {}
+
+def test_switching_backend_moves_transactions(home):
+    """保存形式を切り替えるたびに、前の形式の取引が新しい形式へ移り、どの形式で追加した取引も失われない"""
+    added = []
+    for backend in ["journal", "json", "sqlite", "journal", "sqlite", "json", "journal"]:
+        settings = app.SettingsManager(save_delay=60); settings.set("ledger_backend", backend); settings.set("streaming_load", False)
+        ledger = app.open_configured_ledger(settings); settings.close()
+        assert sorted(tx.id for tx in ledger.get_all_transactions()) == sorted(added), backend
+        tx = app.Transaction(100 * (len(added) + 1), "食費", date(2024, 5, len(added) + 1), "expense"); ledger.add_transaction(tx); added.append(tx.id)
+        ledger.close()
+    assert app.SettingsManager().get("ledger_backend_active") == "journal"
+    assert (home / ".simple_kakeibo" / "ledger.db.bak1").exists()
+
+def expected_month_totals(transactions) -> dict:
+    totals = {}
+    for tx in transactions:
+        key = (tx.transaction_date.year, tx.transaction_date.month, tx.type); totals.setdefault(key, {}); totals[key][tx.category] = totals[key].get(tx.category, 0) + tx.amount
+    return totals
+
+def assert_indexes_consistent(ledger: app.Ledger):
+    assert ledger.check_index_consistency() == []
+    transactions = ledger.get_all_transactions()
+    for (year, month, type), categories in expected_month_totals(transactions).items():
+        summary = ledger.get_category_summary_for_month(year, month) if type == "expense" else ledger.get_income_category_summary_for_month(year, month)
+        total = ledger.get_expense_summary_for_month(year, month) if type == "expense" else ledger.get_income_summary_for_month(year, month)
+        assert summary == categories and total == sum(categories.values())
+    for day in {tx.transaction_date for tx in transactions}:
+        assert [tx.id for tx in ledger.get_transactions_for_day(day)] == [tx.id for tx in transactions if tx.transaction_date == day]
+
+def test_indexes_stay_consistent_through_changes(data_dir, tmp_path):
+    """日付インデックスと月別集計は、追加・変更・削除・日付ごとの削除・取り込みのどの後も全件から求めた値と一致する"""
+    ledger = app.Ledger(app.JournalStorage(data_dir)); rng = random.Random(3)
+    ledger.add_transactions(make_transactions(300)); assert_indexes_consistent(ledger)
+    for tx in make_transactions(20, start=date(2024, 1, 1), days=60): ledger.add_transaction(tx)
+    assert_indexes_consistent(ledger)
+    for tx in rng.sample(ledger.get_all_transactions(), 30):
+        ledger.update(tx.id, amount=tx.amount + 1, category=rng.choice(CATEGORIES)); assert_indexes_consistent(ledger)
+    for tx in rng.sample(ledger.get_all_transactions(), 30):
+        # 別の日付・別の月・別の種別への移動
+        ledger.update(tx.id, transaction_date=tx.transaction_date + timedelta(days=rng.randint(-45, 45)), type=rng.choice(["expense", "income"])); assert_indexes_consistent(ledger)
+    for tx in rng.sample(ledger.get_all_transactions(), 30): ledger.delete(tx.id)
+    assert_indexes_consistent(ledger)
+    for day in rng.sample(sorted({tx.transaction_date for tx in ledger.get_all_transactions()}), 10): assert ledger.delete_transactions_for_day(day) > 0
+    assert_indexes_consistent(ledger)
+    path = tmp_path / "card.csv"
+    path.write_text("日付,金額,カテゴリ\n" + "".join(f"2023-12-{day:02d},-{day * 10},食費\n" for day in range(1, 29)), encoding="utf-8")
+    assert app.import_file(ledger, path).imported == 28
+    assert_indexes_consistent(ledger)
+    exported = tmp_path / "export.json"; app._write_transactions_json(exported, make_transactions(50, start=date(2022, 1, 1)), checksum=False)
+    assert ledger.import_json(exported) == 50
+    assert_indexes_consistent(ledger)
+    ledger.close()
+
+def test_index_consistency_check_reports_mismatch(data_dir):
+    ledger = app.Ledger(app.JournalStorage(data_dir)); ledger.add_transactions(make_transactions(20))
+    tx = ledger.get_all_transactions()[0]; ledger._month_totals[(tx.transaction_date.year, tx.transaction_date.month, tx.type)] += 1
+    ledger._by_date[tx.transaction_date].remove(tx)
+    problems = ledger.check_index_consistency()
+    assert any(p.startswith("月別合計の不一致") for p in problems) and any(p.startswith("日付インデックスの不一致") for p in problems)
+    ledger.close()
+
+def test_get_update_delete_single_transaction(ledger):
+    ledger.add_transactions(make_transactions(100))
+    tx = app.Transaction(1200, "食費", date(2024, 1, 31), "expense"); ledger.add_transaction(tx)
+    assert ledger.get(tx.id).amount == 1200 and ledger.get(str(app.uuid.uuid4())) is None
+    before = {month: (ledger.get_expense_summary_for_month(*month), ledger.get_income_summary_for_month(*month), ledger.get_category_summary_for_month(*month), ledger.get_income_category_summary_for_month(*month)) for month in [(2024, 1), (2024, 2)]}
+    # 別の日付・月・種別・カテゴリへ移す。IDは変わらない
+    updated = ledger.update(tx.id, transaction_date=date(2024, 2, 1), type="income", category="給与", amount=3000)
+    assert updated.id == tx.id and ledger.get(tx.id).transaction_date == date(2024, 2, 1)
+    assert tx.id not in [t.id for t in ledger.get_transactions_for_day(date(2024, 1, 31))] and tx.id in [t.id for t in ledger.get_transactions_for_day(date(2024, 2, 1))]
+    january, february = before[(2024, 1)], before[(2024, 2)]
+    assert ledger.get_expense_summary_for_month(2024, 1) == january[0] - 1200 and ledger.get_income_summary_for_month(2024, 2) == february[1] + 3000
+    assert ledger.get_category_summary_for_month(2024, 1).get("食費", 0) == january[2].get("食費", 0) - 1200
+    assert ledger.get_income_category_summary_for_month(2024, 2).get("給与", 0) == february[3].get("給与", 0) + 3000
+    assert ledger.count_transactions_between(date(2024, 2, 1), date(2024, 2, 1)) == len(ledger.get_transactions_for_day(date(2024, 2, 1)))
+    with pytest.raises(ValueError): ledger.update(tx.id, amount=0)
+    with pytest.raises(TypeError): ledger.update(tx.id, memo="x")
+    with pytest.raises(KeyError): ledger.update(str(app.uuid.uuid4()), amount=1)
+    assert ledger.get(tx.id).amount == 3000  # 不正な変更では何も変わらない
+    assert ledger.delete(tx.id).id == tx.id and ledger.get(tx.id) is None and ledger.delete(tx.id) is None
+    assert ledger.get_income_summary_for_month(2024, 2) == february[1] and len(ledger.get_all_transactions()) == 100
+
+def test_journal_records_only_the_change(data_dir):
+    """変更と削除は、全件を書き直さずにその1件分のレコードだけをジャーナルに追記し、読み直すと反映されている"""
+    storage = app.JournalStorage(data_dir); storage.save(make_transactions(200)); storage.close()
+    ledger = app.Ledger(app.JournalStorage(data_dir, compact_threshold=10_000))
+    snapshot = (data_dir / "ledger_snapshot.bin").read_bytes(); journal = data_dir / "ledger_journal.jsonl"
+    moved, deleted = ledger.get_all_transactions()[:2]
+    ledger.update(moved.id, transaction_date=date(2025, 3, 1), amount=777); ledger.delete(deleted.id)
+    records = [app.json.loads(line) for line in journal.read_text(encoding="utf-8").splitlines()]
+    assert records == [{"op": "update", "tx": ledger.get(moved.id).to_dict()}, {"op": "delete", "ids": [deleted.id]}]
+    assert (data_dir / "ledger_snapshot.bin").read_bytes() == snapshot
+    ledger.close()
+    reloaded = app.Ledger(app.JournalStorage(data_dir))
+    assert reloaded.get(moved.id).amount == 777 and reloaded.get(moved.id).transaction_date == date(2025, 3, 1) and reloaded.get(deleted.id) is None
+    assert len(reloaded.get_all_transactions()) == 199 and reloaded.check_index_consistency() == []
+    reloaded.close()
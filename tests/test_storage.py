@@ -0,0 +1,164 @@
+# coding: utf-8
+import struct
+import threading
+import time
+import types
+from datetime import date
+
+import pytest
+
+import app
+
+def tx(amount: int, day: int = 1, category: str = "食費") -> app.Transaction:
+    return app.Transaction(amount, category, date(2024, 5, day), "expense")
+
+def ids(transactions) -> set: return {t.id for t in transactions}
+
+@pytest.fixture
+def storage(data_dir):
+    storage = app.JournalStorage(data_dir); yield storage; storage.close()
+
+def test_truncated_last_journal_line_is_ignored(storage):
+    """書き込み途中で途切れた最後の行は捨て、それより前のレコードと以降の追記は読める"""
+    first, second = tx(100), tx(200)
+    storage.record_add(first, [first]); storage.record_add(second, [first, second]); storage.close()
+    raw = storage.journal_path.read_bytes(); storage.journal_path.write_bytes(raw[:-10])
+    assert ids(storage.load()) == {first.id}
+    third = tx(300); storage.record_add(third, [first, third]); storage.close()
+    assert ids(app.JournalStorage(storage.journal_path.parent).load()) == {first.id, third.id}
+
+def test_corrupt_snapshot_falls_back_to_previous_generation(storage, capsys):
+    older, newer = [tx(100)], [tx(100), tx(200)]
+    storage.save(older); storage.save(newer)
+    assert app._backup_path(storage.snapshot_path, 1).exists()
+    raw = bytearray(storage.snapshot_path.read_bytes()); raw[-1] ^= 0xFF; storage.snapshot_path.write_bytes(bytes(raw))
+    assert ids(storage.load()) == ids(older)
+    assert "bak1" in capsys.readouterr().out
+
+def test_journal_replays_after_compaction(storage):
+    storage.compact_threshold = 3; transactions = []
+    for amount in range(1, 8):
+        new = tx(amount, day=amount); transactions.append(new); storage.record_add(new, transactions)
+    storage._wait_for_compaction()
+    storage.record_delete([transactions[0]], transactions[1:]); storage.record_update(app.Transaction(999, "家賃", date(2024, 5, 2), "expense", id=transactions[1].id), transactions[1:])
+    storage.close()
+    assert storage.snapshot_path.exists() and not storage.compacting_path.exists()
+    loaded = {t.id: t for t in app.JournalStorage(storage.journal_path.parent).load()}
+    assert set(loaded) == ids(transactions[1:]) and loaded[transactions[1].id].amount == 999
+
+def test_interrupted_compaction_replays_both_journals(storage):
+    """スナップショットの書き出し前に中断した場合は、退避したジャーナルと新しいジャーナルの両方を再生する"""
+    kept, deleted, later = tx(100), tx(200), tx(300)
+    storage.save([kept])
+    storage.record_add(deleted, [kept, deleted]); storage.close()
+    storage.journal_path.rename(storage.compacting_path)
+    storage.record_delete([deleted], [kept]); storage.record_add(later, [kept, later]); storage.close()
+    reloaded = app.JournalStorage(storage.journal_path.parent)
+    assert ids(reloaded.load()) == {kept.id, later.id}
+    eager, remainder = reloaded.load_streaming(date(2024, 1, 1))
+    assert ids(eager + [t for batch, _ in remainder for t in batch]) == {kept.id, later.id}
+    # 次の圧縮は中断していた分も含めてスナップショットにまとめる
+    reloaded.compact([kept, later], background=False)
+    assert not reloaded.compacting_path.exists() and not reloaded.journal_path.exists()
+    assert ids(app.JournalStorage(storage.journal_path.parent).load()) == {kept.id, later.id}
+
+def write_transactions_file(path, transactions, checksum: bool = True, corrupt_last: bool = False):
+    data = [t.to_dict() for t in sorted(transactions, key=app._tx_sort_key)]
+    if corrupt_last: data[-1]["amount"] = 0  # チェックサムは合っているが、最も古い取引が不正な値
+    path.write_bytes(app._dump_checksummed_json(data, indent=4) if checksum else app.json.dumps(data, indent=4).encode("utf-8"))
+
+def test_failed_streaming_load_leaves_file_untouched(data_dir):
+    """古い取引の途中で読み込みに失敗したら台帳は読み取り専用になり、追加してもファイルは書き換わらない"""
+    path = data_dir / "transactions.json"
+    transactions = [app.Transaction(100, "食費", date.today(), "expense")] + [tx(amount, day=amount % 28 + 1) for amount in range(1, 50)]
+    write_transactions_file(path, transactions, corrupt_last=True)
+    before = path.read_bytes()
+    ledger = app.Ledger(app.JsonFileStorage(path, save_delay=0), streaming=True)
+    while ledger.merge_pending_batches(): pass
+    assert isinstance(ledger.load_error, ValueError)
+    with pytest.raises(app.LedgerLoadError): ledger.add_transaction(tx(500))
+    with pytest.raises(app.LedgerLoadError): ledger.delete_transactions_for_day(date.today())
+    ledger.close()
+    assert path.read_bytes() == before and not app._backup_path(path, 1).exists()
+
+def test_truncated_legacy_json_is_not_streamed(data_dir):
+    """チェックサムのない以前の形式でも、途中で途切れたファイルは読める分だけで使わずに退避する"""
+    path = data_dir / "transactions.json"
+    write_transactions_file(path, [tx(amount) for amount in range(1, 20)], checksum=False)
+    truncated = path.read_bytes()[:-40]; path.write_bytes(truncated)
+    with pytest.raises(ValueError): app._verify_transactions_json_file(path)
+    ledger = app.Ledger(app.JsonFileStorage(path, save_delay=0), streaming=True)
+    ledger.add_transaction(tx(500)); ledger.close()
+    quarantined = list(data_dir.glob("transactions.json.corrupt-*"))
+    assert len(quarantined) == 1 and quarantined[0].read_bytes() == truncated
+
+def ledger_fields(transactions) -> list: return [(t.id, t.amount, t.category, t.transaction_date, t.type) for t in transactions]
+
+def test_ledger_snapshot_round_trip(tmp_path):
+    """UUIDのIDは16バイトで、UUID形式でないIDとカテゴリは文字列テーブルで保存し、並び順もそのまま読み戻す"""
+    transactions = [app.Transaction(1500, "食費", date(2024, 5, 31), "expense"), app.Transaction(250000, "給与", date(2024, 5, 25), "income", id="legacy-id-1"),
+                    app.Transaction(2**40, "交際費🍻", date(1999, 1, 1), "expense"), app.Transaction(1, "食費", date(1999, 1, 1), "income")]
+    path = tmp_path / "ledger.bin"; app._write_ledger_snapshot(path, transactions)
+    assert ledger_fields(app._read_ledger_snapshot(path)) == ledger_fields(transactions)
+    app._write_ledger_snapshot(path, [])
+    assert app._read_ledger_snapshot(path) == []
+
+def test_todo_snapshot_round_trip(tmp_path):
+    todos = [app.TodoItem("家賃の振込", date(2024, 6, 25)), app.TodoItem("領収書の整理", date(2024, 6, 1), is_completed=True, id="old-todo"), app.TodoItem("カード🎴の引き落とし", date(2024, 6, 1))]
+    path = tmp_path / "todos.bin"; app._write_todo_snapshot(path, todos)
+    assert [(t.id, t.content, t.due_date, t.is_completed) for t in app._read_todo_snapshot(path)] == [(t.id, t.content, t.due_date, t.is_completed) for t in todos]
+
+def test_version_1_snapshot_is_still_readable(tmp_path):
+    """チェックサムのない版1のヘッダのファイルも読める"""
+    transactions = [app.Transaction(100 * i, "食費", date(2024, 5, i), "expense") for i in range(1, 6)]
+    path = tmp_path / "ledger.bin"; app._write_ledger_snapshot(path, transactions); raw = path.read_bytes()
+    _, _, kind, count, string_count, _, _ = app._SNAPSHOT_HEADER.unpack_from(raw)
+    header = app._SNAPSHOT_HEADER_V1.pack(app.SNAPSHOT_MAGIC, 1, kind, count, string_count, app._SNAPSHOT_HEADER_V1.size + count * app._LEDGER_RECORD.size)
+    path.write_bytes(header + raw[app._SNAPSHOT_HEADER.size:])
+    assert ledger_fields(app._read_ledger_snapshot(path)) == ledger_fields(transactions)
+
+def corrupt_header(raw: bytes, field: str) -> bytes:
+    magic, version, kind, count, string_count, strings_offset, checksum = app._SNAPSHOT_HEADER.unpack_from(raw)
+    values = {"magic": (b"XXXX", version, kind, count, string_count, strings_offset, checksum), "version": (magic, app.SNAPSHOT_VERSION + 1, kind, count, string_count, strings_offset, checksum),
+              "kind": (magic, version, app.SNAPSHOT_KIND_TODO, count, string_count, strings_offset, checksum), "count": (magic, version, kind, count + 1, string_count, strings_offset, checksum),
+              "checksum": (magic, version, kind, count, string_count, strings_offset, checksum ^ 1)}[field]
+    return app._SNAPSHOT_HEADER.pack(*values) + raw[app._SNAPSHOT_HEADER.size:]
+
+@pytest.mark.parametrize("field, message", [("magic", "形式が異なります"), ("version", "未対応のスナップショットの版です"), ("kind", "形式が異なります"),
+                                            ("count", "レコード領域の長さが一致しません"), ("checksum", "チェックサムが一致しません")])
+def test_corrupted_snapshot_header_is_rejected(tmp_path, field, message):
+    path = tmp_path / "ledger.bin"; app._write_ledger_snapshot(path, [tx(100), tx(200, category="交通費")])
+    path.write_bytes(corrupt_header(path.read_bytes(), field))
+    with pytest.raises(app.BinarySnapshotError, match=message): app._read_ledger_snapshot(path)
+
+@pytest.mark.parametrize("length", [0, 3, app._SNAPSHOT_HEADER.size - 1, app._SNAPSHOT_HEADER.size + 10])
+def test_truncated_snapshot_is_rejected(tmp_path, length):
+    path = tmp_path / "ledger.bin"; app._write_ledger_snapshot(path, [tx(100), tx(200)]); path.write_bytes(path.read_bytes()[:length])
+    with pytest.raises(app.BinarySnapshotError): app._read_ledger_snapshot(path)
+
+def test_todo_snapshot_with_corrupted_header_falls_back_to_previous_generation(home, capsys):
+    manager = app.TodoManager(save_delay=60); kept = manager.add_todo("家賃の振込", date(2024, 6, 25)); manager.close()
+    manager.add_todo("領収書の整理", date(2024, 6, 30)); manager.close()
+    manager.filepath.write_bytes(corrupt_header(manager.filepath.read_bytes(), "count"))
+    assert [t.id for t in app.TodoManager().todos] == [kept.id] and "bak1" in capsys.readouterr().out
+
+def test_on_close_keeps_pending_edits(home, scheduler):
+    """保存待ちの取引・Todo・設定は、終了処理(_on_close)で書き込まれ、次の起動で読み込める"""
+    ledger = app.create_ledger("json", save_delay=60); todo_manager = app.TodoManager(save_delay=60); settings = app.SettingsManager(save_delay=60)
+    tx = app.Transaction(1200, "食費", date(2024, 6, 1), "expense"); ledger.add_transaction(tx)
+    done = todo_manager.add_todo("家賃の振込", date(2024, 6, 25)); kept = todo_manager.add_todo("領収書の整理", date(2024, 6, 30)); removed = todo_manager.add_todo("消すTodo", date(2024, 6, 30))
+    todo_manager.update_todo_status(done.id, True); todo_manager.delete_todo(removed.id)
+    settings.set("app_theme", "dark")
+    runner = app.TaskRunner(scheduler); release = threading.Event(); runner.submit_io(release.wait)
+    destroyed = threading.Event()
+    gui = types.SimpleNamespace(task_runner=runner, ledger=ledger, todo_manager=todo_manager, settings_manager=settings, root=types.SimpleNamespace(destroy=destroyed.set))
+    runner.CLOSE_TIMEOUT = 0.2
+    try:
+        started = time.monotonic(); app.HouseholdAppGUI._on_close(gui)
+        assert time.monotonic() - started < 2.0 and destroyed.is_set()
+    finally: release.set()
+    reloaded_ledger = app.create_ledger("json"); reloaded_todos = app.TodoManager()
+    assert [t.id for t in reloaded_ledger.get_all_transactions()] == [tx.id]
+    assert {(t.id, t.is_completed) for t in reloaded_todos.get_all_todos()} == {(done.id, True), (kept.id, False)}
+    assert app.SettingsManager().get("app_theme") == "dark"
+    reloaded_ledger.close()
@@ -0,0 +1,126 @@
+# coding: utf-8
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import app
+
+def test_close_does_not_wait_for_stuck_task(scheduler):
+    runner = app.TaskRunner(scheduler); release = threading.Event()
+    try:
+        stuck = runner.submit_io(release.wait); queued = runner.submit_io(time.sleep, 0)  # ワーカーが2つなので両方とも実行される
+        started = time.monotonic()
+        assert runner.close(timeout=0.2) is False
+        assert time.monotonic() - started < 1.0 and not stuck.done()
+        with pytest.raises(RuntimeError): runner.submit_io(time.sleep, 0)
+    finally: release.set()
+
+def pump(scheduler, runner: app.TaskRunner, timeout: float = 10.0):
+    """全てのタスクのコールバックが呼ばれるまでafterを処理する"""
+    deadline = time.monotonic() + timeout
+    while runner.pending:
+        assert time.monotonic() < deadline, "タスクが終わりません"
+        scheduler.update(); time.sleep(0.005)
+
+@pytest.mark.parametrize("cpu_workers", [0, 1])
+def test_chart_prefetch_runs_on_worker_and_drops_stale_months(data_dir, scheduler, cpu_workers):
+    ledger = app.Ledger(app.JournalStorage(data_dir))
+    ledger.add_transactions([app.Transaction(100 * day, "食費", date(2024, month, day), "expense") for month in range(1, 13) for day in (1, 15)])
+    cache = app.ChartDataCache(ledger); runner = app.TaskRunner(scheduler, cpu_workers=cpu_workers)
+    try:
+        center = date(2024, 6, 10); start, end = cache.prefetch_window(center)
+        cache.prefetch(center, runner)
+        ledger.add_transaction(app.Transaction(999, "娯楽", date(2024, 3, 3), "expense"))  # 集計中に変わった月は捨てる
+        pump(scheduler, runner)
+        months = app._month_keys_between(start, end)
+        assert cache.stats["prefetches"] == len(months) - 1 and cache.stats["entries"] == len(months) - 1
+        assert cache.get(2024, 5) == cache._compute(2024, 5) and cache.stats["hits"] == 1
+        assert cache.get(2024, 3)["expense"]["娯楽"] == 999 and cache.stats["misses"] == 1
+    finally: runner.close(); ledger.close()
+
+def test_replaced_chart_prefetch_is_dropped_silently(data_dir, scheduler, capsys):
+    """月を続けて切り替えて取り消された先読みは、警告を出さずに捨てる"""
+    ledger = app.Ledger(app.JournalStorage(data_dir))
+    ledger.add_transactions([app.Transaction(100, "食費", date(2024, month, 1), "expense") for month in range(1, 13)])
+    cache = app.ChartDataCache(ledger); runner = app.TaskRunner(scheduler, io_workers=1); release = threading.Event()
+    try:
+        runner.submit_io(release.wait)  # ワーカーを塞いで、最初の先読みが始まる前に次の先読みで取り消されるようにする
+        cache.prefetch(date(2024, 6, 1), runner); first = cache._prefetch_future
+        cache.prefetch(date(2024, 7, 1), runner)
+        assert first.cancelled()
+        release.set(); pump(scheduler, runner)
+        assert "WARN" not in capsys.readouterr().out and cache.stats["prefetches"] == 12
+    finally: release.set(); runner.close(); ledger.close()
+
+def square(value: int) -> int: return value * value
+
+def fail(message: str): raise ValueError(message)
+
+@pytest.mark.parametrize("cpu_workers", [0, 1])
+def test_results_and_errors_are_delivered_on_poll(scheduler, cpu_workers):
+    """完了したタスクの結果とエラーは、ワーカーではなくafterで呼ばれるpollからコールバックに渡される"""
+    runner = app.TaskRunner(scheduler, cpu_workers=cpu_workers); results, errors, threads = [], [], []
+    try:
+        runner.submit_io(square, 3, on_done=lambda result: (results.append(("io", result)), threads.append(threading.current_thread())))
+        runner.submit_cpu(square, 4, on_done=lambda result: (results.append(("cpu", result)), threads.append(threading.current_thread())))
+        runner.submit_cpu(fail, "計算に失敗", on_done=results.append, on_error=errors.append)
+        runner.submit_io(fail, "読み込みに失敗", on_error=errors.append)
+        assert runner.pending == 4 and not results and not errors
+        pump(scheduler, runner)
+        assert sorted(results) == [("cpu", 16), ("io", 9)]
+        assert sorted(str(e) for e in errors) == ["計算に失敗", "読み込みに失敗"] and all(isinstance(e, ValueError) for e in errors)
+        assert threads == [threading.main_thread()] * 2
+        assert (runner._cpu_pool is not None) == (cpu_workers > 0)
+    finally: runner.close()
+
+def test_error_without_handler_is_logged(scheduler, capsys):
+    runner = app.TaskRunner(scheduler); done = []
+    try:
+        runner.submit_io(fail, "ハンドラなし"); runner.submit_io(square, 2, on_done=done.append)
+        pump(scheduler, runner)
+        assert done == [4] and "ハンドラなし" in capsys.readouterr().out
+    finally: runner.close()
+
+def test_close_cancels_queued_tasks_and_drops_callbacks(scheduler):
+    runner = app.TaskRunner(scheduler, io_workers=1); release = threading.Event(); called = []
+    running = runner.submit_io(release.wait, on_done=called.append)
+    queued = runner.submit_io(square, 5, on_done=called.append)
+    threading.Timer(0.05, release.set).start()
+    assert runner.close(timeout=5.0) is True
+    assert running.done() and queued.cancelled()
+    scheduler.update(); runner.poll()
+    assert called == [] and runner.pending == 0
+
+def produce(count: int, emit):
+    for i in range(count): emit(i)
+    return count
+
+def test_stream_delivers_items_in_order_with_bounded_pending(scheduler):
+    """途中結果はTkのスレッドで順に渡され、受け取られていない途中結果がmax_pending個あるとワーカーは待つ"""
+    runner = app.TaskRunner(scheduler); items, done = [], []
+    try:
+        future = runner.submit_io_stream(produce, 10, on_item=items.append, on_done=done.append, max_pending=2)
+        time.sleep(0.2)
+        assert runner._results.qsize() == 2 and not future.done()
+        pump(scheduler, runner)
+        assert items == list(range(10)) and done == [10] and not runner._streams
+    finally: runner.close()
+
+def test_stream_stops_when_item_handler_fails(scheduler):
+    runner = app.TaskRunner(scheduler); errors = []
+    def on_item(item):
+        if item == 3: raise ValueError("追加に失敗")
+    try:
+        runner.submit_io_stream(produce, 100, on_item=on_item, on_done=errors.append, on_error=errors.append)
+        pump(scheduler, runner)
+        assert len(errors) == 1 and str(errors[0]) == "追加に失敗"
+    finally: runner.close()
+
+def test_close_stops_waiting_stream(scheduler):
+    runner = app.TaskRunner(scheduler); items = []
+    future = runner.submit_io_stream(produce, 100, on_item=items.append, max_pending=1)
+    time.sleep(0.1)
+    assert runner.close(timeout=2.0) is True
+    assert isinstance(future.exception(), app.CancelledError) and items == []
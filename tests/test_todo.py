@@ -0,0 +1,49 @@
+# coding: utf-8
+import random
+from datetime import date, timedelta
+
+import app
+
+def brute_force_uncompleted(manager: app.TodoManager, start: date, end: date) -> dict:
+    result = {}
+    for todo in manager.todos:
+        if start <= todo.due_date <= end and not todo.is_completed: result.setdefault(todo.due_date, []).append(todo)
+    return result
+
+def assert_indexes_match(manager: app.TodoManager):
+    assert manager._by_id == {todo.id: todo for todo in manager.todos}
+    assert [t.due_date for t in manager.todos] == sorted((t.due_date for t in manager.todos), reverse=True)
+    assert {day: [t.id for t in todos] for day, todos in manager._uncompleted_by_date.items()} == {day: [t.id for t in todos] for day, todos in brute_force_uncompleted(manager, date.min, date.max).items()}
+    assert [t.id for t in manager.get_all_todos()] == [t.id for t in sorted(manager.todos, key=lambda t: (t.due_date, t.is_completed))]
+
+def test_indexes_and_month_range_follow_changes():
+    """IDと期日のインデックス、月の範囲の問い合わせは、追加・完了の切り替え・削除の後も全件の走査と一致する"""
+    manager = app.TodoManager(save_delay=60); rng = random.Random(5); start = date(2024, 1, 1)
+    for i in range(300): manager.add_todo(f"タスク{i}", start + timedelta(days=rng.randint(0, 120)))
+    assert_indexes_match(manager)
+    for todo in rng.sample(manager.todos, 100): manager.update_todo_status(todo.id, not todo.is_completed)
+    assert_indexes_match(manager)
+    for todo in rng.sample(manager.todos, 80): manager.delete_todo(todo.id)
+    assert_indexes_match(manager)
+    for year, month in [(2024, 1), (2024, 2), (2024, 3), (2024, 4), (2024, 5)]:
+        first = date(year, month, 1); last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        assert [t.id for t in manager.get_todos_between(first, last)] == [t.id for t in manager.todos if first <= t.due_date <= last]
+        assert [t.id for t in manager.iter_todos_between(first, last)] == [t.id for t in manager.get_todos_between(first, last)]
+        by_day = manager.get_uncompleted_todos_by_day(first, last)
+        assert {day: [t.id for t in todos] for day, todos in by_day.items()} == {day: [t.id for t in todos] for day, todos in brute_force_uncompleted(manager, first, last).items()}
+        for day, todos in by_day.items(): assert manager.get_uncompleted_todos_for_day(day) == todos
+    manager.close()
+    reloaded = app.TodoManager()
+    assert {(t.id, t.is_completed) for t in reloaded.todos} == {(t.id, t.is_completed) for t in manager.todos}
+    assert_indexes_match(reloaded)
+
+def test_get_todo_and_missing_ids():
+    manager = app.TodoManager(save_delay=60)
+    todo = manager.add_todo("家賃の振込", date(2024, 6, 25))
+    assert manager.get_todo(todo.id) is todo and manager.get_todo("missing") is None
+    manager.update_todo_status("missing", True); manager.delete_todo("missing")  # 存在しないIDは何もしない
+    manager.update_todo_status(todo.id, True)
+    assert manager.get_uncompleted_todos_for_day(date(2024, 6, 25)) == [] and manager.get_todos_between(date(2024, 6, 1), date(2024, 6, 30)) == [todo]
+    manager.delete_todo(todo.id)
+    assert manager.get_todo(todo.id) is None and manager.get_todos_between(date(2024, 6, 1), date(2024, 6, 30)) == []
+    manager.close()
@@ -0,0 +1,72 @@
+# coding: utf-8
+import random
+from tkinter import ttk
+from datetime import date, timedelta
+
+import app
+
+def count_widgets(widget) -> int: return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+def follow_changes(manager: app.TodoManager, order: app._TodoCardOrder):
+    """TodoViewと同じく、変更通知の種類ごとに並びを更新する"""
+    def on_change(event: app.ChangeEvent):
+        if event.kind == app.ChangeEvent.ADDED:
+            for todo in event.items: order.add(todo)
+        elif event.kind == app.ChangeEvent.TOGGLED:
+            for todo in event.items: order.toggle(todo)
+        elif event.kind == app.ChangeEvent.DELETED:
+            for todo in event.items: order.remove(todo.id)
+        else: order.reset(manager.todos)
+    manager.subscribe(on_change)
+
+def test_card_order_follows_todo_manager():
+    """数千回の完了の切り替えと追加・削除の後も、カードの並びはget_all_todosと一致する(画面がなくても実行する)"""
+    manager = app.TodoManager(save_delay=60); rng = random.Random(1)
+    def add(i): manager.add_todo(f"タスク{i}", date(2024, 6, 1) + timedelta(days=rng.randint(0, 29)))
+    for i in range(300): add(i)
+    for todo in rng.sample(manager.todos, 100): manager.update_todo_status(todo.id, True)
+    order = app._TodoCardOrder(); order.reset(manager.todos); follow_changes(manager, order)
+    for batch in range(20):
+        for todo in rng.choices(manager.todos, k=200): manager.update_todo_status(todo.id, not todo.is_completed)
+        for todo in rng.sample(manager.todos, 5): manager.delete_todo(todo.id)
+        for i in range(5): add(1000 + batch * 5 + i)
+        expected = [todo.id for todo in manager.get_all_todos()]
+        assert len(order) == len(manager.todos) and order.ids() == expected, f"{batch}回目のバッチで並びがずれました"
+        assert all(order.has_day(todo.due_date.toordinal()) for todo in manager.todos)
+    fresh = app._TodoCardOrder(); fresh.reset(manager.todos)
+    assert fresh.ids() == order.ids()
+    manager.close()
+
+def test_todo_view_patches_cards_in_order(tk_root):
+    """完了の切り替えと削除では該当するカードだけを差し替え、ウィジェットと名前付きフォントの数は増えず、並びはget_all_todosと一致する"""
+    manager = app.TodoManager(save_delay=60); rng = random.Random(0)
+    for i in range(60): manager.add_todo(f"タスク{i}", date(2024, 6, 1) + timedelta(days=rng.randint(0, 9)))
+    for todo in rng.sample(manager.todos, 20): manager.update_todo_status(todo.id, True)  # 一覧を作る前から完了済みのTodoも混ぜる
+    view = app.TodoView(tk_root, manager); view.update_list(); tk_root.update_idletasks()
+    def card_order(): return [todo_id for frame in view.list_frame.pack_slaves() for todo_id, card in view._cards.items() if card["frame"] is frame]
+    def header_days(): return [day for frame in view.list_frame.pack_slaves() for day, header in view._day_headers.items() if header is frame]
+    widgets, fonts = count_widgets(view), len(tk_root.tk.call("font", "names"))
+    for batch in range(10):
+        for todo in rng.choices(manager.todos, k=200): manager.update_todo_status(todo.id, not todo.is_completed)
+        tk_root.update_idletasks()
+        assert (count_widgets(view), len(tk_root.tk.call("font", "names"))) == (widgets, fonts)
+        assert len(view._cards) == len(manager.todos) and card_order() == [todo.id for todo in manager.get_all_todos()], f"{batch}回目のバッチで並びがずれました"
+    for todo in rng.sample(manager.todos, 40): manager.delete_todo(todo.id)
+    tk_root.update_idletasks()
+    assert card_order() == [todo.id for todo in manager.get_all_todos()]
+    assert header_days() == sorted({todo.due_date for todo in manager.get_all_todos()})
+    view.destroy(); manager.close()
+
+def test_day_cell_drops_tooltips_when_hidden(tk_root, data_dir):
+    """前月・翌月の空きとして隠したセルを、予定のない日付で再び使っても、前の日付のツールチップを表示しない"""
+    ledger = app.Ledger(app.JournalStorage(data_dir)); manager = app.TodoManager(save_delay=60)
+    busy, empty = date(2024, 6, 3), date(2024, 7, 3)
+    ledger.add_transaction(app.Transaction(1500, "食費", busy, "expense")); manager.add_todo("家賃の振込", busy)
+    view = app.CalendarView(tk_root, style=ttk.Style(tk_root), ledger=ledger, todo_manager=manager, on_date_click_callback=lambda day: None, on_month_change_callback=lambda day: None)
+    cell = app._DayCell(view, 1, 0)
+    def show(day): cell.update(day, view._build_day_model(day, 100.0, "#ffffff", "#007aff"))
+    show(busy)
+    assert "食費" in cell.tooltip._current_text() and "家賃の振込" in cell.todo_tooltip._current_text()
+    cell.update(None, None); show(empty)
+    assert cell.tooltip._current_text() == "" and cell.todo_tooltip._current_text() == ""
+    view.destroy(); ledger.close(); manager.close()